@@ -1,5 +1,20 @@
 from django.contrib import admin
-from .models import Category, Source, Article, UserPreference, ReadingContext
+from .models import Category, Source, Article, UserPreference, ReadingContext, FeedbackEvent, PreferenceCounter, CurationTask, MediaMetadata, ArticleInteraction, Counter
+from .search import search, search_enabled
+from . import counters
+
+# Best full-text matches the article changelist shows
+ADMIN_SEARCH_LIMIT = 1000
+
+class ReconcileCountersMixin:
+    """
+    Admin edits can move articles between sources or flip read/saved flags
+    without the views that count them: recompute the counters afterwards.
+    """
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        counters.reconcile()
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -8,14 +23,21 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
-    list_display = ('name', 'source_type', 'category', 'url')
+    list_display = ('name', 'source_type', 'category', 'url', 'last_success_at', 'last_fetch_latency_ms', 'consecutive_failures')
     list_filter = ('source_type', 'category')
     search_fields = ('name', 'url')
+    readonly_fields = ('last_fetch_at', 'last_success_at', 'last_fetch_latency_ms', 'consecutive_failures', 'last_error')
+
+class ArticleInteractionInline(admin.TabularInline):
+    model = ArticleInteraction
+    extra = 0
+    fields = ('user', 'is_read', 'is_saved', 'feedback_score', 'updated_at')
+    readonly_fields = ('updated_at',)
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'source', 'pub_date', 'relevance_score', 'personalization_score', 'is_read', 'is_saved', 'feedback_score')
-    list_filter = ('is_read', 'is_saved', 'source__category', 'source__source_type', 'content_depth', 'pub_date')
+class ArticleAdmin(ReconcileCountersMixin, admin.ModelAdmin):
+    list_display = ('title', 'source', 'pub_date', 'relevance_score', 'personalization_score')
+    list_filter = ('source__category', 'source__source_type', 'content_depth', 'pub_date')
     search_fields = ('title', 'description', 'author')
     readonly_fields = ('created_at', 'relevance_score', 'personalization_score', 'trend_score', 'serendipity_score')
 
@@ -27,13 +49,38 @@ class ArticleAdmin(admin.ModelAdmin):
             'fields': ('ai_summary', 'relevance_score', 'personalization_score', 'trend_score', 'serendipity_score', 'content_depth')
         }),
         ('Media Metadata', {
-            'fields': ('duration_seconds', 'author', 'view_count'),
+            'fields': ('duration_seconds', 'author', 'view_count', 'enclosure_url'),
             'classes': ('collapse',),
         }),
         ('User Interaction', {
-            'fields': ('is_read', 'is_saved', 'feedback_score', 'created_at')
+            'fields': ('created_at',)
         }),
     )
+    inlines = [ArticleInteractionInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Full-text index instead of LIKE '%...%' scans over three columns
+        if search_term and search_enabled():
+            ids = [article_id for article_id, _, _ in search(search_term, limit=ADMIN_SEARCH_LIMIT)]
+            return queryset.filter(pk__in=ids), False
+        return super().get_search_results(request, queryset, search_term)
+
+@admin.register(ArticleInteraction)
+class ArticleInteractionAdmin(ReconcileCountersMixin, admin.ModelAdmin):
+    list_display = ('article', 'user', 'is_read', 'is_saved', 'feedback_score', 'updated_at')
+    list_filter = ('is_read', 'is_saved', 'feedback_score', 'user')
+    raw_id_fields = ('article',)
+
+@admin.register(CurationTask)
+class CurationTaskAdmin(admin.ModelAdmin):
+    list_display = ('article', 'stage', 'status', 'attempts', 'updated_at')
+    list_filter = ('stage', 'status')
+    readonly_fields = ('updated_at',)
+
+@admin.register(MediaMetadata)
+class MediaMetadataAdmin(admin.ModelAdmin):
+    list_display = ('media_id', 'title', 'author', 'duration_seconds', 'view_count', 'fetched_at')
+    search_fields = ('media_id', 'title', 'author')
 
 @admin.register(UserPreference)
 class UserPreferenceAdmin(admin.ModelAdmin):
@@ -46,13 +93,30 @@ class UserPreferenceAdmin(admin.ModelAdmin):
         }),
         ('Learned Preferences (Read-only)', {
             'fields': ('interest_keywords', 'preferred_categories', 'preferred_sources', 'total_feedback_count', 'last_updated'),
-            'description': 'These are automatically learned from user feedback. Run curate_content --update-preferences to refresh.'
+            'description': 'These are learned from each like/dislike as it happens. Run curate_content --update-preferences to rebuild them from the full feedback history.'
         }),
         ('Manual Settings', {
             'fields': ('preferred_content_depth', 'current_mood')
         }),
     )
 
+@admin.register(FeedbackEvent)
+class FeedbackEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'article', 'previous_score', 'new_score', 'weight', 'created_at')
+    list_filter = ('user', 'new_score')
+    readonly_fields = ('user', 'article', 'previous_score', 'new_score', 'weight', 'created_at')
+
+@admin.register(PreferenceCounter)
+class PreferenceCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'key', 'likes', 'dislikes')
+    list_filter = ('user', 'kind')
+    search_fields = ('key',)
+
+@admin.register(Counter)
+class CounterAdmin(admin.ModelAdmin):
+    list_display = ('key', 'value')
+    search_fields = ('key',)
+
 @admin.register(ReadingContext)
 class ReadingContextAdmin(admin.ModelAdmin):
     list_display = ('user', 'name', 'content_depth', 'is_active')
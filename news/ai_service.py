@@ -4,6 +4,8 @@ import google.generativeai as genai
 from django.conf import settings
 import json
 from collections import Counter
+from news.models import DEFAULT_SCORING_WEIGHTS
+from news.keyword_matcher import get_keyword_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -96,11 +98,9 @@ def calculate_personalization_score(article, user_preferences):
         score += source_weights[source_id] * 15
 
     # Keyword matching boost
-    keywords = user_preferences.interest_keywords
-    if keywords:
-        title_lower = article.title.lower()
-        desc_lower = (article.description or '').lower()
-        matches = sum(1 for kw in keywords if kw.lower() in title_lower or kw.lower() in desc_lower)
+    if user_preferences.interest_keywords:
+        matcher = get_keyword_matcher(user_preferences)
+        matches = matcher.count(article.title, article.description)
         score += min(matches * 5, 20)  # Cap at +20
 
     # Content depth matching
@@ -172,10 +172,9 @@ def calculate_serendipity_score(article, user_preferences):
             score -= 20  # Familiar territory
 
     # Articles with no keyword matches are more serendipitous
-    keywords = user_preferences.interest_keywords
-    if keywords:
-        title_lower = article.title.lower()
-        matches = sum(1 for kw in keywords if kw.lower() in title_lower)
+    if user_preferences.interest_keywords:
+        matcher = get_keyword_matcher(user_preferences)
+        matches = matcher.count(article.title)
         score -= matches * 5  # Fewer matches = more serendipitous
 
     return max(0, min(100, score))
@@ -184,10 +183,19 @@ def calculate_serendipity_score(article, user_preferences):
 def classify_content_depth(article):
     """
     Classify article content depth using AI.
-    Returns: 'light', 'medium', or 'heavy'
+    Returns: 'light', 'medium', or 'heavy', or None if classification failed
     """
-    text_length = len(article.description or '')
+    description = article.description or ''
+    return classify_text_depth(article.title, description[:500], len(description))
 
+
+def classify_text_depth(title, snippet, text_length):
+    """
+    Classify content depth from the title, the first 500 characters of the
+    description and its full length, so callers need not load whole descriptions.
+    Returns: 'light', 'medium', or 'heavy', or None if the API call failed or
+    its reply wasn't a depth (so callers can retry rather than store a guess)
+    """
     # Simple heuristic first (saves API calls)
     if text_length < 500:
         return 'light'
@@ -199,8 +207,8 @@ def classify_content_depth(article):
         prompt = f"""
         Classify this article as 'light', 'medium', or 'heavy' based on content depth:
 
-        Title: {article.title}
-        Snippet: {article.description[:500]}
+        Title: {title}
+        Snippet: {snippet[:500]}
 
         Light: Quick news, short updates, breaking news
         Medium: Standard news article with some detail
@@ -214,17 +222,19 @@ def classify_content_depth(article):
 
         if classification in ['light', 'medium', 'heavy']:
             return classification
+        logger.warning(f"Unexpected content depth classification: {classification[:50]!r}")
     except Exception as e:
         logger.error(f"Content depth classification failed: {e}")
-        pass
 
-    return 'medium'  # Default
+    return None
 
 
-def score_article_comprehensive(article, user_preferences=None, reading_context=None, recent_articles=None):
+def score_article_comprehensive(article, user_preferences=None, reading_context=None, recent_articles=None,
+                                classify_depth=True):
     """
     Comprehensive scoring that combines all factors.
     Updates article with all score fields.
+    Pass classify_depth=False when rescoring, to skip the depth classification API call.
     """
     # Calculate individual scores
     personalization = calculate_personalization_score(article, user_preferences)
@@ -237,24 +247,17 @@ def score_article_comprehensive(article, user_preferences=None, reading_context=
     article.serendipity_score = serendipity
 
     # Classify content depth if not set
-    if not article.content_depth or article.content_depth == 'medium':
-        article.content_depth = classify_content_depth(article)
+    if classify_depth and (not article.content_depth or article.content_depth == 'medium'):
+        article.content_depth = classify_content_depth(article) or 'medium'  # Default
 
     # Calculate final score based on reading context weights
-    if reading_context:
-        final_score = (
-            article.relevance_score * reading_context.relevance_weight +
-            personalization * reading_context.personalization_weight +
-            serendipity * reading_context.serendipity_weight +
-            trend * reading_context.trend_weight
-        )
-    else:
-        # Default weights if no context
-        final_score = (
-            article.relevance_score * 0.4 +
-            personalization * 0.3 +
-            serendipity * 0.1 +
-            trend * 0.2
-        )
+    # (same weighting the dashboard applies via final_score_expression)
+    weights = reading_context.scoring_weights() if reading_context else DEFAULT_SCORING_WEIGHTS
+    final_score = (
+        article.relevance_score * weights['relevance'] +
+        personalization * weights['personalization'] +
+        serendipity * weights['serendipity'] +
+        trend * weights['trend']
+    )
 
     return final_score
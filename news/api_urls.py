@@ -11,7 +11,11 @@ urlpatterns = [
     # AI curation
     path('curate/', api_views.trigger_ai_curation, name='trigger_curation'),
 
+    # Reading
+    path('articles/', api_views.list_articles, name='list_articles'),
+
     # Info endpoints
     path('stats/', api_views.api_stats, name='stats'),
     path('sources/', api_views.list_sources, name='list_sources'),
+    path('search/', api_views.api_search, name='search'),
 ]
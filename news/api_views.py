@@ -4,13 +4,42 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from django.conf import settings
-from .models import Article, Source
-from .serializers import ArticleIngestSerializer, ArticleSerializer, SourceSerializer
+from django.db.models import Count, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+from . import counters
+from .conditional import conditional_view
+from .models import Article, ArticleInteraction, Source, user_state_annotations
+from .pagination import decode_token, encode_token
+from .search import search_articles
+from .serializers import ArticleIngestSerializer, ArticleSerializer, SourceStatsSerializer
 from .throttles import IngestThrottle, CurationThrottle
 import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_SEARCH_RESULTS = 100
+
+# Window for each source's average items per day
+ITEMS_PER_DAY_WINDOW_DAYS = 30
+
+ARTICLES_PAGE_SIZE = 100
+MAX_ARTICLES_PAGE_SIZE = 500
+
+# Sync tokens reach back this far before the sync that issued them, so a
+# write committed late with an earlier updated_at is still picked up next
+# time (clients upsert by id, so seeing an article twice is harmless)
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# ArticleSerializer fields backed by Article columns (the rest are the
+# nested source and the per-user annotations)
+ARTICLE_COLUMNS = {
+    'id', 'title', 'link', 'description', 'pub_date', 'image_url', 'ai_summary',
+    'relevance_score', 'created_at', 'updated_at',
+}
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([IngestThrottle])
@@ -131,18 +160,14 @@ def ingest_articles_batch(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_view
 def api_stats(request):
     """
     Get API statistics.
 
     GET /api/stats/
     """
-    return Response({
-        'total_articles': Article.objects.count(),
-        'unread_articles': Article.objects.filter(is_read=False).count(),
-        'saved_articles': Article.objects.filter(is_saved=True).count(),
-        'total_sources': Source.objects.count(),
-    })
+    return Response(counters.user_stats(request.user))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -175,16 +200,171 @@ def trigger_ai_curation(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_view
 def list_sources(request):
     """
-    List all sources.
+    List all sources with their article and unread counts, average items
+    per day over the last ITEMS_PER_DAY_WINDOW_DAYS, and fetch health
+    (last success, latency, consecutive failures). One query.
 
     GET /api/sources/
     """
-    sources = Source.objects.all()
-    serializer = SourceSerializer(sources, many=True)
+    window_start = timezone.now() - timedelta(days=ITEMS_PER_DAY_WINDOW_DAYS)
+    recent = Article.objects.filter(source=OuterRef('pk'), pub_date__gte=window_start).order_by().values('source')
+    sources = list(
+        Source.objects.select_related('category')
+        .annotate(**counters.source_count_annotations(request.user))
+        .annotate(items_per_day=Coalesce(
+            Cast(Subquery(recent.annotate(count=Count('*')).values('count')), FloatField()), 0.0
+        ) / ITEMS_PER_DAY_WINDOW_DAYS)
+        .order_by('name')
+    )
+    serializer = SourceStatsSerializer(sources, many=True)
     return Response({
         'status': 'success',
-        'count': sources.count(),
+        'count': len(sources),
         'sources': serializer.data
     })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_view
+def api_search(request):
+    """
+    Full-text article search, best BM25 matches first.
+
+    GET /api/search/?q=...&category=<slug>&source=<id>&since=<date>&until=<date>&limit=20&offset=0
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'status': 'error',
+            'message': 'Missing search query (q)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_SEARCH_RESULTS)
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+        articles = search_articles(
+            Article.objects.annotate(**user_state_annotations(request.user)).select_related('source', 'source__category'),
+            query,
+            limit=limit,
+            offset=offset,
+            **{name: request.query_params.get(name) or None for name in ('category', 'source', 'since', 'until')}
+        )
+    except ValueError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    results = ArticleSerializer(articles, many=True).data
+    for result, article in zip(results, articles):
+        result['snippet'] = article.search_snippet
+        result['rank'] = article.search_rank
+    return Response({
+        'status': 'success',
+        'count': len(results),
+        'results': results
+    })
+
+def _sync_position(params):
+    """
+    (since, synced_at, after_id) for a list_articles request: from `cursor`
+    when continuing a listing, else from the `since` sync token.
+    Raises ValueError for a malformed token.
+    """
+    if params.get('cursor'):
+        since, synced_at, after_id = decode_token(params['cursor'])
+        since = parse_datetime(since) if since is not None else None
+        synced_at = parse_datetime(synced_at)
+        if synced_at is None:
+            raise ValueError("Invalid cursor")
+        return since, synced_at, int(after_id)
+
+    since = None
+    if params.get('since'):
+        since = parse_datetime(decode_token(params['since']))
+        if since is None:
+            raise ValueError("Invalid since token")
+    return since, timezone.now() - SYNC_OVERLAP, 0
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_view
+def list_articles(request):
+    """
+    Read articles with the user's state, for clients that keep a local copy.
+
+    GET /api/articles/?since=<sync_token>&cursor=<next_cursor>&fields=id,title,...
+        &category=<slug>&source=<id>&read=true|false&saved=true|false&min_score=<n>&limit=100
+
+    Pages are in id order; follow next_cursor until it is null, then keep
+    sync_token and pass it as since= next time to get only the articles
+    that changed (content, or this user's read/saved/feedback state) after
+    the listing started. Deleted articles are not reported. On such delta
+    syncs, articles whose state changed are returned even if they no longer
+    match read=/saved=, so clients learn they were read or unsaved.
+    """
+    params = request.query_params
+    try:
+        since, synced_at, after_id = _sync_position(params)
+        limit = min(max(int(params.get('limit', ARTICLES_PAGE_SIZE)), 1), MAX_ARTICLES_PAGE_SIZE)
+        min_score = float(params['min_score']) if params.get('min_score') else None
+    except (ValueError, TypeError):
+        return Response({
+            'status': 'error',
+            'message': 'Invalid cursor, since, limit or min_score'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = [name for name in params.get('fields', '').split(',') if name] or list(ArticleSerializer.Meta.fields)
+    unknown = set(fields) - set(ArticleSerializer.Meta.fields)
+    if unknown:
+        return Response({
+            'status': 'error',
+            'message': f"Unknown fields: {', '.join(sorted(unknown))}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    articles = Article.objects.annotate(**user_state_annotations(request.user)).filter(pk__gt=after_id)
+    if since:
+        state_changed = ArticleInteraction.objects.filter(user=request.user, updated_at__gt=since).order_by()
+        # A UNION of two index range scans; an OR here would walk every article by id
+        changed = Article.objects.filter(updated_at__gt=since).order_by().values('pk').union(
+            state_changed.values('article_id')
+        )
+        articles = articles.filter(pk__in=changed)
+    if params.get('category'):
+        articles = articles.filter(source__category__slug=params['category'])
+    if params.get('source', '').isdigit():
+        articles = articles.filter(source_id=params['source'])
+    state_filter = Q()
+    for flag in ('read', 'saved'):
+        if params.get(flag) in ('true', 'false'):
+            state_filter &= Q(**{f'is_{flag}': params[flag] == 'true'})
+    if state_filter and since:
+        # Already limited to changed articles, so this OR only sees those
+        state_filter |= Q(pk__in=state_changed.values('article_id'))
+    articles = articles.filter(state_filter)
+    if min_score is not None:
+        articles = articles.filter(relevance_score__gte=min_score)
+
+    # Load only the requested columns, and the source only when it is shown
+    columns = ARTICLE_COLUMNS.intersection(fields) | {'id'}
+    if 'source' in fields:
+        articles = articles.select_related('source', 'source__category').only(*columns, 'source')
+    else:
+        articles = articles.only(*columns)
+
+    rows = list(articles.order_by('id')[:limit + 1])
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_token([since.isoformat() if since else None, synced_at.isoformat(), page[-1].pk])
+
+    return Response({
+        'status': 'success',
+        'count': len(page),
+        'results': ArticleSerializer(page, many=True, fields=fields).data,
+        'next_cursor': next_cursor,
+        'sync_token': encode_token(synced_at.isoformat()),
+    })
@@ -0,0 +1,256 @@
+"""
+Exact podcast durations without downloading the episode.
+
+Fetches only the first (and if needed the last) few KB of an audio enclosure
+with HTTP Range requests and reads the duration from the container headers:
+MP3 Xing/Info or VBRI frame counts, the ID3v2 TLEN frame, the MP4 `mvhd` box,
+or - for constant bitrate MP3 - the file size and bitrate.
+"""
+import re
+import struct
+import logging
+from urllib.parse import urlparse
+
+import requests
+
+from news.safe_http import public_session
+
+logger = logging.getLogger(__name__)
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+PROBE_TIMEOUT = 10
+
+# Bitrates in kbps, indexed by the 4-bit header index
+MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates by MPEG version (1, 2, 2.5)
+MP3_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+def _fetch_range(session, url, range_header, limit):
+    """
+    GET a byte range. Returns (data, total_size). Servers that ignore Range
+    are read only up to `limit` bytes before the connection is dropped.
+    """
+    response = session.get(
+        url,
+        headers={'Range': range_header},
+        stream=True,
+        timeout=PROBE_TIMEOUT,
+        allow_redirects=True
+    )
+    try:
+        response.raise_for_status()
+        total_size = None
+        content_range = response.headers.get('Content-Range', '')
+        match = re.search(r'/(\d+)$', content_range)
+        if match:
+            total_size = int(match.group(1))
+        elif response.status_code == 200 and response.headers.get('Content-Length', '').isdigit():
+            total_size = int(response.headers['Content-Length'])
+
+        data = b''
+        for block in response.iter_content(chunk_size=8192):
+            data += block
+            if len(data) >= limit:
+                break
+        return data[:limit], total_size, response.status_code == 206
+    finally:
+        response.close()
+
+
+def parse_id3v2(data):
+    """
+    Parse an ID3v2 header at the start of data.
+    Returns (tag_size_including_header, tlen_seconds_or_None); (0, None) without a tag.
+    """
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0, None
+
+    major = data[3]
+    flags = data[5]
+    size = _syncsafe(data[6:10])
+    tag_end = 10 + size + (10 if flags & 0x10 else 0)  # Optional footer
+
+    offset = 10
+    if flags & 0x40 and len(data) >= 14:  # Extended header
+        ext_size = _syncsafe(data[10:14]) if major == 4 else struct.unpack('>I', data[10:14])[0] + 4
+        offset += ext_size
+
+    tlen = None
+    limit = min(10 + size, len(data))
+    while major in (3, 4) and offset + 10 <= limit:
+        frame_id = data[offset:offset + 4]
+        if not frame_id.strip(b'\x00'):
+            break  # Padding
+        frame_size = _syncsafe(data[offset + 4:offset + 8]) if major == 4 else struct.unpack('>I', data[offset + 4:offset + 8])[0]
+        body = data[offset + 10:offset + 10 + frame_size]
+        if frame_id == b'TLEN' and len(body) == frame_size and body:
+            text = body[1:].decode('latin-1', errors='ignore').strip('\x00 ')
+            if text.isdigit() and int(text) > 0:
+                tlen = int(text) / 1000
+            break
+        offset += 10 + frame_size
+
+    return tag_end, tlen
+
+
+def _syncsafe(raw):
+    return (raw[0] << 21) | (raw[1] << 14) | (raw[2] << 7) | raw[3]
+
+
+def parse_mp3_frame_header(data, offset):
+    """Decode the MPEG audio frame header at offset, or None if it isn't one"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (data[offset + 1] >> 3) & 0x03
+    layer_bits = (data[offset + 1] >> 1) & 0x03
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0x03
+    channel_mode = data[offset + 3] >> 6
+
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = {3: 1, 2: 2, 0: 2.5}[version_bits]
+    layer = 4 - layer_bits
+    table_version = 1 if version == 1 else 2
+
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and version != 1:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': MP3_BITRATES[(table_version, layer)][bitrate_index] * 1000,
+        'sample_rate': MP3_SAMPLE_RATES[version][sample_rate_index],
+        'mono': channel_mode == 3,
+        'samples_per_frame': samples_per_frame,
+    }
+
+
+def find_mp3_frame(data, start=0, max_scan=8192):
+    """Offset and header of the first valid frame at or after start"""
+    end = min(len(data) - 4, start + max_scan)
+    for offset in range(start, max(start, end)):
+        header = parse_mp3_frame_header(data, offset)
+        if header:
+            return offset, header
+    return None, None
+
+
+def mp3_vbr_frame_count(data, offset, header):
+    """Total frame count from a Xing/Info or VBRI header in the first frame"""
+    if header['version'] == 1:
+        side_info = 17 if header['mono'] else 32
+    else:
+        side_info = 9 if header['mono'] else 17
+
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info') and len(data) >= xing + 12:
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            return struct.unpack('>I', data[xing + 8:xing + 12])[0]
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI' and len(data) >= vbri + 18:
+        return struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+
+    return None
+
+
+def parse_mp4_mvhd(data):
+    """Duration in seconds from an `mvhd` box anywhere in data, or None"""
+    position = data.find(b'mvhd')
+    while position != -1:
+        body = position + 4
+        if body + 1 <= len(data):
+            version = data[body]
+            try:
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', data[body + 20:body + 32])
+                else:
+                    timescale, duration = struct.unpack('>II', data[body + 12:body + 20])
+            except struct.error:
+                timescale = duration = 0
+            if timescale and duration:
+                return duration / timescale
+        position = data.find(b'mvhd', position + 4)
+    return None
+
+
+def probe_audio_duration(url, session=None):
+    """
+    Exact duration (seconds, int) of a remote MP3/M4A file, or None.
+    Reads at most HEAD_BYTES from the start plus a small tail or post-tag range.
+    Without a session, one restricted to public addresses is used (and closed).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return None
+
+    own_session = session is None
+    session = session or public_session()
+    try:
+        head, total_size, ranged = _fetch_range(session, url, f'bytes=0-{HEAD_BYTES - 1}', HEAD_BYTES)
+        seconds = _duration_from_head(session, url, head, total_size, ranged)
+    except requests.RequestException as e:
+        logger.warning(f"Could not probe audio duration for {url}: {e}")
+        return None
+    finally:
+        if own_session:
+            session.close()
+
+    return int(round(seconds)) if seconds else None
+
+
+def _duration_from_head(session, url, head, total_size, ranged):
+    # MP4/M4A: mvhd sits in moov, at the start for streaming-friendly files, else at the end
+    if head[4:8] == b'ftyp':
+        duration = parse_mp4_mvhd(head)
+        if duration is None and ranged and total_size and total_size > len(head):
+            tail, _, _ = _fetch_range(session, url, f'bytes=-{TAIL_BYTES}', TAIL_BYTES)
+            duration = parse_mp4_mvhd(tail)
+        return duration
+
+    # MP3: skip the ID3v2 tag (which may hold large cover art) to the first frame
+    audio_start, tlen = parse_id3v2(head)
+    frame_data, frame_base = head, 0
+    if audio_start + 4096 > len(head):
+        if not ranged:
+            return tlen
+        frame_data, _, _ = _fetch_range(session, url, f'bytes={audio_start}-{audio_start + 8191}', 8192)
+        frame_base = audio_start
+
+    offset, header = find_mp3_frame(frame_data, audio_start - frame_base)
+    if header is None:
+        return tlen
+
+    frames = mp3_vbr_frame_count(frame_data, offset, header)
+    if frames:
+        return frames * header['samples_per_frame'] / header['sample_rate']
+    if tlen:
+        return tlen
+
+    # Constant bitrate: audio bytes / byte rate
+    if total_size and header['bitrate']:
+        audio_bytes = total_size - (frame_base + offset)
+        return audio_bytes * 8 / header['bitrate']
+    return None
@@ -0,0 +1,47 @@
+"""
+Conditional GET (ETag / 304) for pages and API reads.
+
+ETags are built from the version counters in news.counters rather than by
+hashing the rendered body: an unchanged page costs one indexed lookup and
+the 304 goes out before any queryset is evaluated.
+"""
+import time
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from news import counters
+
+# Pages show relative times ("5 minutes ago"), so ETags also roll over on a
+# coarse clock; cards are fragment-cached, so the re-render is cheap
+ETAG_TIME_BUCKET_SECONDS = 600
+
+
+def version_etag(request, *args, **kwargs):
+    content_version, user_version = counters.versions(request.user)
+    bucket = int(time.time() // ETAG_TIME_BUCKET_SECONDS)
+    # Pages embed the CSRF token, so a new session must not revalidate an old page
+    csrf = hashlib.sha256(request.COOKIES.get(settings.CSRF_COOKIE_NAME, '').encode()).hexdigest()[:8]
+    return f'{content_version}-{user_version}-{bucket}-{csrf}'
+
+
+def conditional_view(view):
+    """
+    Answer If-None-Match with 304 when neither the content nor the user's
+    state changed. Responses must be revalidated on every use (no-cache)
+    and vary by HX-Request, as the same URL serves full pages and fragments.
+    Apply inside login_required / api_view, so request.user is resolved.
+    """
+    conditional = condition(etag_func=version_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['HX-Request'])
+        return response
+
+    return wrapper
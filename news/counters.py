@@ -0,0 +1,318 @@
+"""
+Materialized counters for stats and the sidebar's unread badges.
+
+Article totals are kept overall, per category and per source; each user has
+read counts in the same three scopes plus a saved total. Unread is derived
+as total minus read, so ingesting an article never touches per-user rows,
+and every count is a lookup by key instead of a COUNT(*).
+
+Article creation/deletion and interaction deletion are counted by signal
+handlers (connected in NewsConfig.ready); read and saved changes are
+recorded by the views that make them. Deleting a source or category settles
+its articles and their interactions in one adjustment per source rather than
+one per row. reconcile() recomputes everything from the source tables, and
+the admin runs it after edits that bypass the views.
+
+Two version counters ride along: a global content version, bumped by any
+article/source/category write, and a per-user state version, bumped by the
+user's reads, bookmarks, feedback and reading contexts. Together they
+version every page, so news.conditional can answer 304s from one lookup.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import CharField, Count, F, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from news.models import Article, ArticleInteraction, Category, Counter, ReadingContext, Source
+
+logger = logging.getLogger(__name__)
+
+ARTICLES = 'articles'
+SOURCES = 'sources'
+CONTENT_VERSION = 'version:content'
+
+
+def read_prefix(user_id):
+    return f'user:{user_id}:read'
+
+
+def saved_key(user_id):
+    return f'user:{user_id}:saved'
+
+
+def user_version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def is_version_key(key):
+    return key == CONTENT_VERSION or key.endswith(':version')
+
+
+def scope_keys(prefix, article):
+    """The overall, per-category and per-source keys an article counts towards"""
+    return _scope_keys(prefix, article.source_id, article.source.category_id)
+
+
+def _scope_keys(prefix, source_id, category_id):
+    return [prefix, f'{prefix}:category:{category_id}', f'{prefix}:source:{source_id}']
+
+
+def adjust(deltas):
+    """Add {key: delta} to the counters, creating missing ones at zero"""
+    by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(key)
+    if not by_delta:
+        return
+
+    with transaction.atomic():
+        Counter.objects.bulk_create(
+            [Counter(key=key) for keys in by_delta.values() for key in keys],
+            ignore_conflicts=True
+        )
+        for delta, keys in by_delta.items():
+            Counter.objects.filter(key__in=keys).update(value=F('value') + delta)
+
+
+def get_counts(keys):
+    """{key: value} for the given keys; missing counters read as zero"""
+    counts = dict.fromkeys(keys, 0)
+    counts.update(Counter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return counts
+
+
+def record_read(user, article, delta=1):
+    deltas = dict.fromkeys(scope_keys(read_prefix(user.pk), article), delta)
+    adjust({**deltas, user_version_key(user.pk): 1})
+
+
+def record_reads(user, scopes):
+    """record_read for many articles, given as (source_id, category_id) pairs"""
+    deltas = defaultdict(int)
+    for source_id, category_id in scopes:
+        for key in _scope_keys(read_prefix(user.pk), source_id, category_id):
+            deltas[key] += 1
+    adjust({**deltas, user_version_key(user.pk): 1})
+
+
+def record_saved(user, delta):
+    adjust({saved_key(user.pk): delta, user_version_key(user.pk): 1})
+
+
+def bump_content_version():
+    """For article writes that bypass save() signals (bulk and queryset updates)"""
+    adjust({CONTENT_VERSION: 1})
+
+
+def bump_user_version(user_id):
+    adjust({user_version_key(user_id): 1})
+
+
+def versions(user):
+    """(content version, user state version) in one query"""
+    key = user_version_key(user.pk)
+    counts = get_counts([CONTENT_VERSION, key])
+    return counts[CONTENT_VERSION], counts[key]
+
+
+def user_stats(user):
+    """Totals for api_stats in one query"""
+    read = read_prefix(user.pk)
+    counts = get_counts([ARTICLES, SOURCES, read, saved_key(user.pk)])
+    return {
+        'total_articles': counts[ARTICLES],
+        'unread_articles': max(0, counts[ARTICLES] - counts[read]),
+        'saved_articles': counts[saved_key(user.pk)],
+        'total_sources': counts[SOURCES],
+    }
+
+
+def unread_by_category(user, categories):
+    """{category_id: unread count} for the sidebar, in one query"""
+    read = read_prefix(user.pk)
+    keys = {
+        category.pk: (f'{ARTICLES}:category:{category.pk}', f'{read}:category:{category.pk}')
+        for category in categories
+    }
+    counts = get_counts([key for pair in keys.values() for key in pair])
+    return {
+        category_id: max(0, counts[total] - counts[read_count])
+        for category_id, (total, read_count) in keys.items()
+    }
+
+
+def source_count_annotations(user):
+    """
+    Annotations giving Source querysets article_count and unread_count (for
+    the user) from the per-source counters: two key lookups per source.
+    """
+    def per_source(prefix):
+        key = Concat(Value(f'{prefix}:source:'), Cast(OuterRef('pk'), CharField()))
+        return Coalesce(Subquery(Counter.objects.filter(key=key).values('value')[:1]), 0)
+
+    return {
+        'article_count': per_source(ARTICLES),
+        'unread_count': per_source(ARTICLES) - per_source(read_prefix(user.pk)),
+    }
+
+
+def expected_counts():
+    """Every counter's true value, computed from the source tables"""
+    expected = defaultdict(int)
+    expected[SOURCES] = Source.objects.count()
+
+    for row in Article.objects.values('source_id', 'source__category_id').annotate(count=Count('id')):
+        expected[ARTICLES] += row['count']
+        expected[f"{ARTICLES}:category:{row['source__category_id']}"] += row['count']
+        expected[f"{ARTICLES}:source:{row['source_id']}"] += row['count']
+
+    read_rows = ArticleInteraction.objects.filter(is_read=True).values(
+        'user_id', 'article__source_id', 'article__source__category_id'
+    ).annotate(count=Count('id'))
+    for row in read_rows:
+        prefix = read_prefix(row['user_id'])
+        expected[prefix] += row['count']
+        expected[f"{prefix}:category:{row['article__source__category_id']}"] += row['count']
+        expected[f"{prefix}:source:{row['article__source_id']}"] += row['count']
+
+    saved_rows = ArticleInteraction.objects.filter(is_saved=True).values('user_id').annotate(count=Count('id'))
+    for row in saved_rows:
+        expected[saved_key(row['user_id'])] = row['count']
+
+    return expected
+
+
+def reconcile():
+    """
+    Rewrite counters that drifted from the source tables and drop stale ones.
+    Version counters have no source of truth and are left alone.
+    Returns {key: (stored, actual)} for every counter that was repaired.
+    """
+    with transaction.atomic():
+        expected = expected_counts()
+        stored = {
+            key: value for key, value in Counter.objects.values_list('key', 'value')
+            if not is_version_key(key)
+        }
+
+        drifted = {
+            key: (stored.get(key, 0), value)
+            for key, value in expected.items()
+            if stored.get(key, 0) != value
+        }
+        stale = [key for key in stored if key not in expected]
+        drifted.update({key: (stored[key], 0) for key in stale if stored[key]})
+
+        Counter.objects.bulk_create(
+            [Counter(key=key, value=value) for key, (_, value) in drifted.items() if key in expected],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['value']
+        )
+        Counter.objects.filter(key__in=stale).delete()
+
+    if drifted:
+        logger.warning(f"Reconciled {len(drifted)} drifted counters")
+    return drifted
+
+
+def _deleted_with(origin, *models):
+    """True when a cascading delete started from one of `models` (an instance or a queryset of them)"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(post_save, sender=Article)
+def count_saved_article(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        deltas = dict.fromkeys(scope_keys(ARTICLES, instance), 1) if created else {}
+        adjust({**deltas, CONTENT_VERSION: 1})
+
+
+@receiver(post_delete, sender=Article)
+def count_deleted_article(sender, instance, origin=None, **kwargs):
+    # Articles deleted with their source are counted by count_deleted_source
+    if not _deleted_with(origin, Source, Category):
+        adjust({**dict.fromkeys(scope_keys(ARTICLES, instance), -1), CONTENT_VERSION: 1})
+
+
+@receiver(post_save, sender=ArticleInteraction)
+def version_saved_interaction(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_delete, sender=ArticleInteraction)
+def count_deleted_interaction(sender, instance, origin=None, **kwargs):
+    # Settled per source (count_deleted_source) or dropped with the user's counters (drop_user_counters)
+    if _deleted_with(origin, Source, Category, get_user_model()):
+        return
+    deltas = {user_version_key(instance.user_id): 1}
+    # Cascades delete interactions before their article, so it can still be loaded
+    if instance.is_read:
+        article = Article.objects.select_related('source').filter(pk=instance.article_id).first()
+        if article:
+            deltas.update(dict.fromkeys(scope_keys(read_prefix(instance.user_id), article), -1))
+    if instance.is_saved:
+        deltas[saved_key(instance.user_id)] = -1
+    adjust(deltas)
+
+
+@receiver(post_save, sender=Source)
+def count_saved_source(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        adjust({SOURCES: 1, CONTENT_VERSION: 1} if created else {CONTENT_VERSION: 1})
+
+
+@receiver(pre_delete, sender=Source)
+def collect_source_counts(sender, instance, **kwargs):
+    """
+    Work out, while they still exist, what the source's articles and their
+    interactions count towards: two aggregate queries however many there are.
+    """
+    deltas = defaultdict(int)
+    deltas.update(dict.fromkeys(
+        _scope_keys(ARTICLES, instance.pk, instance.category_id), -instance.articles.count()
+    ))
+    rows = ArticleInteraction.objects.filter(article__source=instance).values('user_id').annotate(
+        read=Count('id', filter=Q(is_read=True)), saved=Count('id', filter=Q(is_saved=True))
+    )
+    for row in rows:
+        for key in _scope_keys(read_prefix(row['user_id']), instance.pk, instance.category_id):
+            deltas[key] -= row['read']
+        deltas[saved_key(row['user_id'])] -= row['saved']
+        deltas[user_version_key(row['user_id'])] += 1
+    instance._counter_deltas = deltas
+
+
+@receiver(post_delete, sender=Source)
+def count_deleted_source(sender, instance, **kwargs):
+    deltas = getattr(instance, '_counter_deltas', {})
+    adjust({**deltas, SOURCES: -1, CONTENT_VERSION: 1})
+    # The source's own keys are all zero now
+    Counter.objects.filter(key__endswith=f':source:{instance.pk}').delete()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_user_counters(sender, instance, **kwargs):
+    Counter.objects.filter(key__startswith=f'user:{instance.pk}:').delete()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def version_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_content_version()
+
+
+@receiver([post_save, post_delete], sender=ReadingContext)
+def version_reading_context(sender, instance, raw=False, **kwargs):
+    # Contexts change the ranking and the context switcher on every page
+    if not raw:
+        bump_user_version(instance.user_id)
@@ -0,0 +1,353 @@
+"""
+Staged AI curation pipeline used by the curate_content command.
+
+Stages record per-article status in CurationTask rows, committed together with
+the article writes, so an interrupted run resumes exactly where it stopped.
+Independent lanes (summarization vs. relevance scoring) run concurrently.
+"""
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Length, Substr
+
+from news.models import Article, ArticleInteraction, CurationTask, bulk_update_articles
+from news.ai_service import (
+    summarize_article,
+    score_relevance_batch,
+    score_article_comprehensive,
+    classify_text_depth
+)
+
+logger = logging.getLogger(__name__)
+
+STAGES = ['summarize', 'score', 'classify', 'personalize']
+
+# Stages within a lane run in order; lanes run concurrently
+LANES = [
+    ['summarize'],
+    ['score', 'classify', 'personalize'],
+]
+
+# Per-run article limits used unless streaming the whole backlog
+DEFAULT_LIMITS = {
+    'summarize': 20,
+    'score': 50,
+    'classify': 50,
+    'personalize': 100,
+}
+
+# Failed articles are retried on later runs up to this many attempts
+MAX_ATTEMPTS = 3
+
+
+def iter_chunks(queryset, chunk_size, limit=None):
+    """
+    Yield lists of at most chunk_size articles from queryset, newest id first.
+    Uses keyset pagination on the primary key, so only one chunk is held in
+    memory and each fetch costs the same however deep into the backlog it is.
+    """
+    last_id = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = list(chunk_page(queryset, size, last_id))
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].pk
+        if remaining is not None:
+            remaining -= len(chunk)
+
+
+def chunk_page(queryset, size, last_id=None):
+    """The iter_chunks query for the `size` newest articles below last_id"""
+    page = queryset.order_by('-pk')
+    if last_id is not None:
+        page = page.filter(pk__lt=last_id)
+    return page[:size]
+
+
+def personalize_backlog(target_version, user_id=None):
+    """
+    Articles run_personalize still has to score under target_version: never
+    scored or scored under an older preference version, once relevance scoring
+    and depth classification are done. Annotated with is_read for user_id.
+    """
+    scored = CurationTask.objects.filter(article=OuterRef('pk'), stage='score', status=CurationTask.DONE)
+    classified = CurationTask.objects.filter(article=OuterRef('pk'), stage='classify', status=CurationTask.DONE)
+    read = ArticleInteraction.objects.filter(article=OuterRef('pk'), is_read=True)
+    if user_id is not None:
+        read = read.filter(user=user_id)
+    return Article.objects.annotate(is_read=Exists(read)).filter(
+        scored_preference_version__lt=target_version
+    ).filter(
+        # Wait for relevance scoring; an AI score of 0 still counts as scored
+        Q(relevance_score__gt=0) | Exists(scored)
+    ).filter(
+        ~Q(content_depth='medium') | Exists(classified)  # Wait for depth classification
+    ).select_related('source__category').only(
+        'id', 'title', 'description', 'content_depth', 'relevance_score',
+        'personalization_score', 'trend_score', 'serendipity_score', 'scored_preference_version',
+        'source__id', 'source__category__slug'
+    )
+
+
+def personalize_slices(articles, target_version):
+    """
+    A personalize_backlog queryset split into the slices run_personalize walks
+    in turn: unread before read, never scored before older preference versions.
+    With one version per slice, every iter_chunks page is a seek on the
+    article_scored_version index rather than a scan down the primary key.
+    """
+    versions = list(
+        Article.objects.filter(scored_preference_version__lt=target_version)
+        .order_by('scored_preference_version')
+        .values_list('scored_preference_version', flat=True)
+        .distinct()
+    )
+    return [
+        articles.filter(is_read=is_read, scored_preference_version=version)
+        for is_read in (False, True) for version in versions
+    ]
+
+
+def pending_for(queryset, stage):
+    """Exclude articles that finished a stage, or failed it too often"""
+    finished = CurationTask.objects.filter(article=OuterRef('pk'), stage=stage).filter(
+        Q(status=CurationTask.DONE) | Q(status=CurationTask.FAILED, attempts__gte=MAX_ATTEMPTS)
+    )
+    return queryset.filter(~Exists(finished))
+
+
+def record_stage(articles, stage, status, error=''):
+    """Checkpoint the stage status of a set of articles (one upsert)"""
+    if not articles:
+        return
+    ids = [article.pk for article in articles]
+    attempts = dict(
+        CurationTask.objects.filter(article_id__in=ids, stage=stage).values_list('article_id', 'attempts')
+    )
+    CurationTask.objects.bulk_create(
+        [
+            CurationTask(
+                article_id=article_id,
+                stage=stage,
+                status=status,
+                attempts=attempts.get(article_id, 0) + 1,
+                last_error=error[:500]
+            )
+            for article_id in ids
+        ],
+        update_conflicts=True,
+        unique_fields=['article', 'stage'],
+        update_fields=['status', 'attempts', 'last_error', 'updated_at']
+    )
+
+
+class CurationPipeline:
+    """
+    Runs the curation stages for one user's preferences and reading context.
+    `log` receives progress lines; `limits` maps stage -> max articles per run
+    (None for the whole backlog).
+    """
+
+    def __init__(self, user_prefs=None, reading_context=None, chunk_size=50, limits=None,
+                 summary_delay=4, log=None):
+        self.user_prefs = user_prefs
+        self.reading_context = reading_context
+        self.chunk_size = chunk_size
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.summary_delay = summary_delay
+        self.log = log or logger.info
+
+    def run(self, stages=STAGES, parallel=True):
+        """
+        Run the selected stages. Returns dict of stage -> articles processed,
+        or the error message for a stage that failed (later stages in its lane are skipped).
+        """
+        lanes = [[stage for stage in lane if stage in stages] for lane in LANES]
+        lanes = [lane for lane in lanes if lane]
+
+        results = {}
+        if parallel and len(lanes) > 1:
+            with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+                for lane_results in executor.map(self._run_lane_in_thread, lanes):
+                    results.update(lane_results)
+        else:
+            for lane in lanes:
+                results.update(self._run_lane(lane))
+        return results
+
+    def _run_lane_in_thread(self, lane):
+        try:
+            return self._run_lane(lane)
+        finally:
+            # Each worker thread has its own connection; don't leak it
+            connection.close()
+
+    def _run_lane(self, lane):
+        results = {}
+        for stage in lane:
+            try:
+                results[stage] = getattr(self, f'run_{stage}')(self.limits.get(stage))
+            except Exception as e:
+                logger.error(f"Curation stage '{stage}' failed: {e}", exc_info=True)
+                results[stage] = f"error: {e}"
+                break
+        return results
+
+    def _planned(self, queryset, limit):
+        count = queryset.count()
+        return count if limit is None else min(count, limit)
+
+    def _write(self, articles, fields, stage):
+        """Write only the changed fields and the stage checkpoint in one transaction"""
+        with transaction.atomic():
+            if articles and fields:
+                bulk_update_articles(articles, fields)
+            record_stage(articles, stage, CurationTask.DONE)
+
+    def run_summarize(self, limit):
+        """Summarize substantive articles without a summary"""
+        articles = pending_for(Article.objects.filter(ai_summary__isnull=True), 'summarize').annotate(
+            description_length=Length('description')
+        ).filter(description_length__gt=500).only('id', 'title', 'description')
+        self.log(f"[summarize] Summarizing {self._planned(articles, limit)} articles...")
+
+        processed = 0
+        for chunk in iter_chunks(articles, self.chunk_size, limit):
+            for article in chunk:
+                summary = summarize_article(article.description)
+                if summary:
+                    article.ai_summary = summary
+                    # One API call per article, so checkpoint per article
+                    self._write([article], ['ai_summary'], 'summarize')
+                    self.log(f"  ✓ Summarized: {article.title[:50]}...")
+                else:
+                    record_stage([article], 'summarize', CurationTask.FAILED, 'No summary returned')
+                processed += 1
+                if self.summary_delay:
+                    time.sleep(self.summary_delay)  # Rate limit protection
+        return processed
+
+    def run_score(self, limit):
+        """AI relevance scoring, one API call per chunk"""
+        articles = pending_for(Article.objects.filter(relevance_score=0), 'score').select_related(
+            'source__category'
+        ).annotate(
+            snippet=Substr('description', 1, 200)
+        ).only('id', 'title', 'relevance_score', 'source__id', 'source__category__name')
+        self.log(f"[score] AI scoring {self._planned(articles, limit)} articles...")
+
+        processed = 0
+        for chunk in iter_chunks(articles, self.chunk_size, limit):
+            batch_data = [
+                {
+                    'id': a.id,
+                    'title': a.title,
+                    'description': a.snippet,
+                    'category': a.source.category.name if a.source and a.source.category else 'general'
+                }
+                for a in chunk
+            ]
+
+            scores = score_relevance_batch(batch_data, self.user_prefs)
+            if not scores:
+                # Whole batch failed (API error); retry these on a later run
+                record_stage(chunk, 'score', CurationTask.FAILED, 'No scores returned')
+                continue
+
+            for article in chunk:
+                article.relevance_score = scores.get(str(article.id), 50)  # Default if AI misses it
+            self._write(chunk, ['relevance_score'], 'score')
+            processed += len(chunk)
+        return processed
+
+    def run_classify(self, limit):
+        """Classify content depth for articles still at the default depth"""
+        articles = pending_for(Article.objects.filter(content_depth='medium'), 'classify').annotate(
+            description_length=Length('description'),
+            snippet=Substr('description', 1, 500)
+        ).only('id', 'title', 'content_depth')
+        self.log(f"[classify] Classifying content depth for {self._planned(articles, limit)} articles...")
+
+        processed = 0
+        for chunk in iter_chunks(articles, self.chunk_size, limit):
+            classified, changed, failed = [], [], []
+            for article in chunk:
+                depth = classify_text_depth(article.title, article.snippet, article.description_length)
+                if depth is None:
+                    # API error or unusable reply; retry these on a later run
+                    failed.append(article)
+                    continue
+                classified.append(article)
+                if depth != article.content_depth:
+                    article.content_depth = depth
+                    changed.append(article)
+            with transaction.atomic():
+                if changed:
+                    bulk_update_articles(changed, ['content_depth'])
+                record_stage(classified, 'classify', CurationTask.DONE)
+                record_stage(failed, 'classify', CurationTask.FAILED, 'No depth classification returned')
+            processed += len(classified)
+        return processed
+
+    def run_personalize(self, limit):
+        """
+        Personalization, trend and serendipity scores for never-scored articles
+        and those scored under an older preference version, unread first, then
+        by version and newest first (see personalize_slices). The stored
+        preference version is this stage's checkpoint.
+        """
+        recent_articles = list(Article.objects.only('id', 'title')[:200])  # For trend analysis
+        target_version = self.user_prefs.version if self.user_prefs else 1
+        stale_articles = personalize_backlog(target_version, self.user_prefs.user_id if self.user_prefs else None)
+
+        stale_count = stale_articles.count()
+        self.log(
+            f"[personalize] Calculating personalized scores for "
+            f"{stale_count if limit is None else min(stale_count, limit)} of {stale_count} new or stale articles..."
+        )
+
+        processed = 0
+        for chunk in self._chunks_in_turn(personalize_slices(stale_articles, target_version), limit):
+            for article in chunk:
+                final_score = score_article_comprehensive(
+                    article,
+                    self.user_prefs,
+                    self.reading_context,
+                    recent_articles,
+                    classify_depth=False
+                )
+                article.scored_preference_version = target_version
+
+                # Show sample for first 5
+                if processed < 5:
+                    self.log(
+                        f"  • {article.title[:40]}... "
+                        f"[P:{article.personalization_score:.0f} "
+                        f"T:{article.trend_score:.0f} "
+                        f"S:{article.serendipity_score:.0f} "
+                        f"→ Final:{final_score:.0f}]"
+                    )
+                processed += 1
+
+            with transaction.atomic():
+                bulk_update_articles(chunk, [
+                    'personalization_score', 'trend_score', 'serendipity_score', 'scored_preference_version'
+                ])
+        return processed
+
+    def _chunks_in_turn(self, querysets, limit):
+        """Chunks of each queryset in turn, walked with the iter_chunks keyset cursor, at most limit articles"""
+        remaining = limit
+        for queryset in querysets:
+            for chunk in iter_chunks(queryset, self.chunk_size, remaining):
+                yield chunk
+                if remaining is not None:
+                    remaining -= len(chunk)
+            if remaining == 0:
+                return
@@ -0,0 +1,210 @@
+"""
+Benchmark for the curation pipeline (curate_content --benchmark).
+
+Runs every stage against a synthetic article set in a throwaway test database,
+with the Gemini model replaced by a simulated one that sleeps according to a
+latency profile. Reports per-stage throughput, API calls, estimated tokens,
+DB queries and peak memory as a JSON-serializable dict.
+"""
+import re
+import json
+import time
+import random
+import threading
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from news import ai_service
+from news.curation import CurationPipeline, STAGES
+from news.models import Article, Category, Source, UserPreference
+
+WORDS = (
+    'market model policy energy climate startup research chip robotics health '
+    'election school housing privacy security vaccine battery transport league '
+    'budget science quantum network regulation analysis'
+).split()
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class SimulatedModel:
+    """
+    Stand-in for the Gemini GenerativeModel.
+    Sleeps for a normally distributed latency per call and returns plausible
+    responses for the summarize, score and classify prompts.
+    """
+
+    def __init__(self, latency_ms=800, jitter_ms=200, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        with self.lock:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+        if generation_config and generation_config.get('response_mime_type') == 'application/json':
+            ids = re.findall(r'ID: (\d+)', prompt)
+            text = json.dumps({article_id: self.random.randint(10, 95) for article_id in ids})
+        elif 'Return ONLY one word' in prompt:
+            text = self.random.choice(['light', 'medium', 'heavy'])
+        else:
+            text = '\n'.join(f"- {' '.join(self.random.choices(WORDS, k=12))}" for _ in range(4))
+
+        time.sleep(delay)
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+            self.output_tokens += estimate_tokens(text)
+        return _Response(text)
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook counting executed queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def create_synthetic_articles(count, seed=0):
+    """Create a user with preferences and `count` articles of varied length"""
+    rng = random.Random(seed)
+    user = User.objects.create_user('benchmark')
+    prefs = UserPreference.objects.create(
+        user=user,
+        interest_keywords=rng.sample(WORDS, 10),
+        preferred_categories={'bench-0': 0.5, 'bench-1': -0.5},
+    )
+    sources = []
+    for i in range(4):
+        category = Category.objects.create(name=f'Bench {i}', slug=f'bench-{i}')
+        sources.append(Source.objects.create(name=f'Bench Source {i}', url=f'https://example.com/{i}/feed', category=category))
+
+    now = timezone.now()
+    Article.objects.bulk_create([
+        Article(
+            source=sources[i % len(sources)],
+            title=' '.join(rng.choices(WORDS, k=8)).capitalize(),
+            link=f'https://example.com/article/{i}',
+            guid=f'bench-{i}',
+            description=' '.join(rng.choices(WORDS, k=rng.choice([40, 150, 400, 800]))),
+            pub_date=now - timedelta(minutes=i),
+        )
+        for i in range(count)
+    ], batch_size=500)
+    return prefs
+
+
+def run_benchmark(articles=200, latency_ms=800, jitter_ms=200, chunk_size=50, seed=0):
+    """
+    Run all pipeline stages against a fresh test database and return the report.
+    Stages run sequentially so each one's metrics are attributable.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    original_model = ai_service.model
+    simulated = SimulatedModel(latency_ms, jitter_ms, seed)
+    ai_service.model = simulated
+
+    try:
+        prefs = create_synthetic_articles(articles, seed)
+        pipeline = CurationPipeline(
+            prefs,
+            chunk_size=chunk_size,
+            limits={stage: None for stage in STAGES},
+            summary_delay=0,
+            log=lambda message: None
+        )
+
+        report = {
+            'articles': articles,
+            'latency_ms': latency_ms,
+            'jitter_ms': jitter_ms,
+            'chunk_size': chunk_size,
+            'stages': {},
+        }
+        totals = {'seconds': 0.0, 'api_calls': 0, 'prompt_tokens': 0, 'output_tokens': 0, 'db_queries': 0}
+        overall_peak = 0
+
+        tracemalloc.start()
+        for stage in STAGES:
+            simulated.reset()
+            queries = QueryCounter()
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            with connection.execute_wrapper(queries):
+                processed = getattr(pipeline, f'run_{stage}')(None)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            overall_peak = max(overall_peak, peak)
+
+            report['stages'][stage] = {
+                'articles': processed,
+                'seconds': round(elapsed, 3),
+                'articles_per_second': round(processed / elapsed, 2) if elapsed else None,
+                'api_calls': simulated.calls,
+                'prompt_tokens': simulated.prompt_tokens,
+                'output_tokens': simulated.output_tokens,
+                'db_queries': queries.count,
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+            totals['seconds'] += elapsed
+            totals['api_calls'] += simulated.calls
+            totals['prompt_tokens'] += simulated.prompt_tokens
+            totals['output_tokens'] += simulated.output_tokens
+            totals['db_queries'] += queries.count
+        tracemalloc.stop()
+
+        totals['seconds'] = round(totals['seconds'], 3)
+        totals['peak_memory_kb'] = round(overall_peak / 1024, 1)
+        report['total'] = totals
+        return report
+    finally:
+        ai_service.model = original_model
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def compare_to_baseline(report, baseline):
+    """
+    Per-stage relative change against a stored report:
+    throughput ratio (>1 is faster) and query/API call differences.
+    """
+    comparison = {}
+    for stage, metrics in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        old_rate = previous.get('articles_per_second')
+        new_rate = metrics.get('articles_per_second')
+        comparison[stage] = {
+            'throughput_ratio': round(new_rate / old_rate, 2) if old_rate and new_rate else None,
+            'api_calls_delta': metrics['api_calls'] - previous.get('api_calls', 0),
+            'db_queries_delta': metrics['db_queries'] - previous.get('db_queries', 0),
+            'peak_memory_kb_delta': round(metrics['peak_memory_kb'] - previous.get('peak_memory_kb', 0), 1),
+        }
+    return comparison
@@ -0,0 +1,101 @@
+"""
+New-article notifications for open dashboards, over server-sent events.
+
+Every article created by ingest or fetch_feeds appends an IngestEvent in the
+same transaction. Each open dashboard holds one EventSource on
+article_events, which tails that table by id and publishes "N new articles
+in <category>" as an HTML fragment for the htmx sse extension. The
+fragment's button then fetches just the new cards (views.new_articles).
+
+The stream is an async generator, so it only holds a connection (not a
+worker thread) when served through asgi.py. Streams end after
+STREAM_SECONDS; the browser reconnects and resumes from Last-Event-ID.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from django.db.models import Count, Max
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from news.models import Article, IngestEvent
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 3
+HEARTBEAT_SECONDS = 20
+STREAM_SECONDS = 300
+RECONNECT_MILLISECONDS = 5000
+EVENT_RETENTION = timedelta(days=2)
+
+
+def latest_event_id():
+    return IngestEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def new_article_events(since, until=None, category_id=None):
+    """IngestEvents after `since` (up to `until`), optionally in one category"""
+    events = IngestEvent.objects.filter(id__gt=since)
+    if until is not None:
+        events = events.filter(id__lte=until)
+    if category_id is not None:
+        events = events.filter(category_id=category_id)
+    return events
+
+
+def prune_events(retention=EVENT_RETENTION):
+    """Drop events older than any dashboard could still be waiting on"""
+    deleted, _ = IngestEvent.objects.filter(created_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def format_event(name, event_id, html):
+    """One SSE message; every line of the HTML becomes a data line"""
+    data = '\n'.join(f'data: {line}' for line in html.splitlines() or [''])
+    return f'id: {event_id}\nevent: {name}\n{data}\n\n'
+
+
+async def event_stream(since, last_event_id, category=None):
+    """
+    Yield a new-articles message whenever events arrive after last_event_id.
+    Each message summarises everything since `since` (when the page was
+    rendered), so it replaces the previous banner rather than adding to it.
+    """
+    category_id = category.pk if category else None
+    started = last_sent = time.monotonic()
+    yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+
+    while time.monotonic() - started < STREAM_SECONDS:
+        latest = await new_article_events(last_event_id, category_id=category_id).aaggregate(latest=Max('id'))
+        if latest['latest']:
+            last_event_id = latest['latest']
+            counts = [
+                row async for row in new_article_events(since, last_event_id, category_id)
+                .values('category__name').annotate(count=Count('article_id', distinct=True)).order_by('-count')
+            ]
+            yield format_event('new-articles', last_event_id, render_to_string(
+                'components/new_articles_banner.html',
+                {
+                    'counts': counts,
+                    'total': sum(row['count'] for row in counts),
+                    'since': since,
+                    'until': last_event_id,
+                    'category': category,
+                }
+            ))
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            # Comment line: keeps proxies from closing an idle connection
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        await asyncio.sleep(POLL_SECONDS)
+
+
+@receiver(post_save, sender=Article)
+def record_ingest_event(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        IngestEvent.objects.create(article=instance, category_id=instance.source.category_id)
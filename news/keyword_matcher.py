@@ -0,0 +1,122 @@
+"""
+Multi-keyword matching for interest keyword scoring.
+Compiles a user's interest keywords into a single Aho-Corasick automaton,
+so matching an article costs one pass over its text regardless of how
+many keywords the user has.
+"""
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+# Words, keeping a "++" or "#" suffix so "C++" and "C#" stay distinct from "C"
+_WORD = re.compile(r'[^\W_]+(?:\+\+|#)?')
+
+
+def normalize_text(text):
+    """
+    Normalize text for matching: casefold, strip accents and collapse
+    punctuation/whitespace to single spaces, padded so every word is
+    surrounded by boundaries.
+    """
+    if not text:
+        return ' '
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' ' + ' '.join(_WORD.findall(text)) + ' '
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over normalized keywords.
+    Patterns are stored with surrounding spaces, which makes every match
+    word-boundary aware against normalize_text() output.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for keyword in keywords:
+            normalized = normalize_text(keyword).strip()
+            if not normalized or normalized in self.keywords:
+                continue
+            self._add(' ' + normalized + ' ', len(self.keywords))
+            self.keywords.append(normalized)
+
+        self._build_failure_links()
+
+    def _add(self, pattern, index):
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(index)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        """
+        Return the set of keyword indexes that occur in text.
+        A single pass over the normalized text.
+        """
+        found = set()
+        if not self.keywords:
+            return found
+
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for ch in normalize_text(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def count(self, *texts):
+        """Number of distinct keywords found across the given texts."""
+        found = set()
+        for text in texts:
+            found |= self.find(text)
+        return len(found)
+
+
+@lru_cache(maxsize=32)
+def _compile(keywords):
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(user_preferences):
+    """
+    Return the compiled matcher for a UserPreference's interest keywords.
+    Cached on the instance per preference version, and across instances
+    by keyword set, so it is built once rather than per article.
+    """
+    version = (user_preferences.pk, user_preferences.version)
+    cached = getattr(user_preferences, '_keyword_matcher', None)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    matcher = _compile(tuple(user_preferences.interest_keywords or ()))
+    user_preferences._keyword_matcher = (version, matcher)
+    return matcher
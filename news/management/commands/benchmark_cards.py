@@ -0,0 +1,66 @@
+import time
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from news.views import _rank_articles, _user_articles
+
+
+class Command(BaseCommand):
+    help = 'Measure dashboard card rendering with a cold and a warm card fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username whose read/saved/feedback state is rendered (default: first user)',
+        )
+        parser.add_argument(
+            '--per-page',
+            type=int,
+            default=20,
+            help='Cards per rendered page (default: 20)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed renders per run (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        user = users.filter(username=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError("No such user")
+
+        articles = list(
+            _rank_articles(_user_articles(user).filter(is_read=False).select_related('source', 'source__category'), None)
+            [:options['per_page']]
+        )
+        if not articles:
+            raise CommandError("No unread articles to render")
+
+        cache = caches['cards']
+        repeat = options['repeat']
+        self.stdout.write(f"Rendering {len(articles)} cards for {user.username}, {repeat} times per run")
+
+        # Cold: every render misses, i.e. the cost without the fragment cache
+        cold = 0.0
+        for _ in range(repeat):
+            cache.clear()
+            cold += self._render(articles)
+
+        # Warm: fragments come from the cache, only the keys are computed
+        self._render(articles)
+        warm = sum(self._render(articles) for _ in range(repeat))
+
+        cold_ms = cold / repeat * 1000
+        warm_ms = warm / repeat * 1000
+        self.stdout.write(f"  Cold cache: {cold_ms:.1f} ms/page ({cold_ms / len(articles):.2f} ms/card)")
+        self.stdout.write(f"  Warm cache: {warm_ms:.1f} ms/page ({warm_ms / len(articles):.2f} ms/card)")
+        self.stdout.write(self.style.SUCCESS(f"✓ {cold / warm:.1f}x faster with warm card fragments"))
+
+    def _render(self, articles):
+        started = time.perf_counter()
+        render_to_string('news/partials/article_list.html', {'articles': articles})
+        return time.perf_counter() - started
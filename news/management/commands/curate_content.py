@@ -1,16 +1,12 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
-import time
-from news.models import Article, UserPreference, ReadingContext
-from news.ai_service import (
-    summarize_article,
-    score_relevance_batch,
-    score_article_comprehensive,
-    classify_content_depth
-)
+from news.models import UserPreference, ReadingContext
+from news.curation import CurationPipeline, STAGES, DEFAULT_LIMITS
+from news.curation_benchmark import run_benchmark, compare_to_baseline
+import json
 
 class Command(BaseCommand):
-    help = 'Curates content using AI: scores relevance, personalizes, and summarizes articles.'
+    help = 'Curates content using AI: scores relevance, personalizes, and summarizes articles. Resumes interrupted runs.'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -18,8 +14,69 @@ class Command(BaseCommand):
             action='store_true',
             help='Update user preferences from feedback history',
         )
+        parser.add_argument(
+            '--rescore-limit',
+            type=int,
+            default=100,
+            help='Maximum number of new or stale articles to (re)score per run (default: 100)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Number of articles loaded and written back per transaction (default: 50)',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Process the whole backlog in chunks instead of the per-run stage limits',
+        )
+        parser.add_argument(
+            '--stages',
+            default=','.join(STAGES),
+            help=f"Comma-separated subset of stages to run (default: {','.join(STAGES)})",
+        )
+        parser.add_argument(
+            '--sequential',
+            action='store_true',
+            help='Run stages one after another instead of summarization and scoring concurrently',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Benchmark all stages on synthetic articles with a simulated LLM and print JSON metrics',
+        )
+        parser.add_argument(
+            '--benchmark-articles',
+            type=int,
+            default=200,
+            help='Number of synthetic articles for --benchmark (default: 200)',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=800,
+            help='Mean simulated LLM latency per call for --benchmark (default: 800)',
+        )
+        parser.add_argument(
+            '--jitter-ms',
+            type=float,
+            default=200,
+            help='Standard deviation of the simulated LLM latency (default: 200)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Stored --benchmark JSON report to compare against',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the --benchmark JSON report to this file',
+        )
 
     def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.handle_benchmark(options)
+
         # Get or create user preferences (assuming single user for now)
         try:
             user = User.objects.first()
@@ -51,83 +108,32 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"Could not load reading context: {e}"))
             reading_context = None
 
-        # 1. Summarize Long Articles without summary
-        long_articles = Article.objects.filter(ai_summary__isnull=True).exclude(description='')[:20]
-        self.stdout.write(f"\n[1/4] Summarizing {long_articles.count()} articles...")
-
-        for article in long_articles:
-            if len(article.description) > 500:  # Only summarize substantive ones
-                summary = summarize_article(article.description)
-                if summary:
-                    article.ai_summary = summary
-                    article.save()
-                    self.stdout.write(f"  ✓ Summarized: {article.title[:50]}...")
-                    time.sleep(4)  # Rate limit protection
-
-        # 2. Score Relevance for unscored articles (AI scoring)
-        unscored = Article.objects.filter(relevance_score=0)[:50]  # Batch of 50
-        if unscored.exists():
-            self.stdout.write(f"\n[2/4] AI scoring {unscored.count()} articles...")
-            batch_data = [
-                {
-                    'id': a.id,
-                    'title': a.title,
-                    'description': a.description,
-                    'category': a.source.category.name if a.source and a.source.category else 'general'
-                }
-                for a in unscored
-            ]
-
-            scores = score_relevance_batch(batch_data, user_prefs)
-
-            for article in unscored:
-                if str(article.id) in scores:
-                    article.relevance_score = scores[str(article.id)]
-                else:
-                    article.relevance_score = 50  # Default if AI misses it
-                article.save()
-
-            self.stdout.write(self.style.SUCCESS("  ✓ AI scoring complete"))
-
-        # 3. Classify content depth for articles
-        unclassified = Article.objects.filter(content_depth='medium')[:50]
-        if unclassified.exists():
-            self.stdout.write(f"\n[3/4] Classifying content depth for {unclassified.count()} articles...")
-            for article in unclassified:
-                article.content_depth = classify_content_depth(article)
-                article.save()
-            self.stdout.write(self.style.SUCCESS("  ✓ Content classification complete"))
-
-        # 4. Calculate comprehensive scores (personalization, trend, serendipity)
-        recent_articles = Article.objects.all()[:200]  # For trend analysis
-        articles_to_score = Article.objects.filter(
-            relevance_score__gt=0,
-            personalization_score=0  # Haven't been personalized yet
-        )[:100]
-
-        if articles_to_score.exists():
-            self.stdout.write(f"\n[4/4] Calculating personalized scores for {articles_to_score.count()} articles...")
-
-            for article in articles_to_score:
-                final_score = score_article_comprehensive(
-                    article,
-                    user_prefs,
-                    reading_context,
-                    recent_articles
-                )
-                article.save()
-
-                # Show sample for first 5
-                if article.id <= 5:
-                    self.stdout.write(
-                        f"  • {article.title[:40]}... "
-                        f"[P:{article.personalization_score:.0f} "
-                        f"T:{article.trend_score:.0f} "
-                        f"S:{article.serendipity_score:.0f} "
-                        f"→ Final:{final_score:.0f}]"
-                    )
-
-            self.stdout.write(self.style.SUCCESS("  ✓ Personalization complete"))
+        stages = [stage.strip() for stage in options['stages'].split(',') if stage.strip()]
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(sorted(unknown))}. Choose from: {', '.join(STAGES)}")
+
+        limits = dict(DEFAULT_LIMITS, personalize=options['rescore_limit'])
+        if options['stream']:
+            limits = {stage: None for stage in STAGES}
+
+        pipeline = CurationPipeline(
+            user_prefs,
+            reading_context,
+            chunk_size=options['chunk_size'],
+            limits=limits,
+            log=self.stdout.write
+        )
+        self.stdout.write(f"\nRunning stages: {', '.join(stages)}")
+        results = pipeline.run(stages, parallel=not options['sequential'])
+
+        for stage in stages:
+            if stage not in results:
+                self.stdout.write(self.style.WARNING(f"  - {stage}: skipped (an earlier stage failed)"))
+            elif isinstance(results[stage], str):
+                self.stdout.write(self.style.ERROR(f"  ✗ {stage}: {results[stage]} (resume with --stages {stage})"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  ✓ {stage}: {results[stage]} articles"))
 
         # Summary
         self.stdout.write(self.style.SUCCESS("\n" + "=" * 60))
@@ -138,4 +144,23 @@ class Command(BaseCommand):
             self.stdout.write(f"User: {user.username}")
             self.stdout.write(f"Total feedback: {user_prefs.total_feedback_count}")
             self.stdout.write(f"Top interests: {', '.join(user_prefs.interest_keywords[:5])}")
-            self.stdout.write("\nRun with --update-preferences to refresh user learning.")
+            self.stdout.write("\nRun with --update-preferences to rebuild learning from the full feedback history.")
+
+    def handle_benchmark(self, options):
+        """Run the synthetic benchmark; never touches the real database"""
+        report = run_benchmark(
+            articles=options['benchmark_articles'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            chunk_size=options['chunk_size']
+        )
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                report['baseline'] = compare_to_baseline(report, json.load(f))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -1,6 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 from django.core.management.base import BaseCommand
-from news.models import Article
-from news.media_service import enrich_article_with_metadata, format_duration
+from django.db import transaction
+from news.models import Article, bulk_update_articles
+from news.media_service import (
+    fetch_article_metadata,
+    extract_youtube_metadata_batch,
+    youtube_watch_url,
+    apply_article_metadata,
+    article_media_id,
+    get_cached_metadata,
+    store_cached_metadata,
+    format_duration,
+    HostThrottle
+)
+
+# Columns apply_article_metadata may set
+METADATA_FIELDS = ['duration_seconds', 'author', 'view_count', 'description', 'image_url', 'title']
 
 
 class Command(BaseCommand):
@@ -18,6 +34,30 @@ class Command(BaseCommand):
             action='store_true',
             help='Process all articles (ignores --limit)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of concurrent metadata lookups (default: 1)',
+        )
+        parser.add_argument(
+            '--per-host',
+            type=int,
+            default=2,
+            help='Maximum concurrent lookups per host (default: 2)',
+        )
+        parser.add_argument(
+            '--host-delay',
+            type=float,
+            default=0.5,
+            help='Minimum seconds between lookups starting on the same host (default: 0.5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of enriched articles written back per transaction (default: 50)',
+        )
 
     def handle(self, *args, **options):
         # Find articles that need metadata enrichment
@@ -25,7 +65,7 @@ class Command(BaseCommand):
         articles_query = Article.objects.filter(
             source__source_type__in=['yt', 'podcast'],
             duration_seconds__isnull=True
-        )
+        ).select_related('source')
 
         if not options['all']:
             articles_query = articles_query[:options['limit']]
@@ -36,42 +76,125 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("No articles need metadata enrichment."))
             return
 
-        self.stdout.write(f"\nEnriching {len(articles)} articles with metadata...")
+        workers = max(1, options['workers'])
+        self.stdout.write(f"\nEnriching {len(articles)} articles with metadata ({workers} workers)...")
         self.stdout.write("=" * 60)
 
-        success_count = 0
+        # Group URL variants of the same video/episode; fresh cache entries need no lookup
+        by_media = {}
         for article in articles:
-            self.stdout.write(f"\n• {article.title[:50]}...")
+            by_media.setdefault(article_media_id(article) or f'article:{article.pk}', []).append(article)
+        # Items whose cached view count expired are looked up again, falling back on the cached fields
+        cached = get_cached_metadata(by_media)
+        to_fetch = [key for key in by_media if key not in cached or cached[key]['view_count_expired']]
+        fresh = {key: metadata for key, metadata in cached.items() if not metadata['view_count_expired']}
+        self.stdout.write(
+            f"{len(by_media)} distinct media items, {len(fresh)} served from cache, {len(to_fetch)} to look up"
+        )
+
+        throttle = HostThrottle(options['per_host'], options['host_delay'])
+
+        def lookup(key):
+            article = by_media[key][0]
+            with throttle.slot(article.enclosure_url or article.link):
+                return {key: fetch_article_metadata(article)}
+
+        def lookup_videos(keys):
+            urls = {youtube_watch_url(key[len('yt:'):]): key for key in keys}
+            results = extract_youtube_metadata_batch(urls, workers=workers, throttle=throttle)
+            return {urls[url]: metadata for url, metadata in results.items()}
 
-            try:
-                if enrich_article_with_metadata(article):
-                    success_count += 1
+        # Videos resolve a write batch at a time; everything else one lookup per item
+        videos = [key for key in to_fetch if key.startswith('yt:')]
+        video_batches = [videos[i:i + options['batch_size']] for i in range(0, len(videos), options['batch_size'])]
+        others = [key for key in to_fetch if not key.startswith('yt:')]
 
-                    # Display enriched data
-                    if article.duration_seconds:
-                        duration_str = format_duration(article.duration_seconds)
-                        self.stdout.write(f"  Duration: {duration_str}")
-                    if article.author:
-                        self.stdout.write(f"  Author: {article.author}")
-                    if article.view_count:
-                        self.stdout.write(f"  Views: {article.view_count:,}")
+        self.success_count = 0
+        self.done_count = 0
+        self.pending_writes = []
+        self.pending_cache = {}
+        started = time.monotonic()
 
-                    self.stdout.write(self.style.SUCCESS("  ✓ Enriched"))
-                else:
-                    self.stdout.write(self.style.WARNING("  ⚠ Could not extract metadata"))
+        for media_id, metadata in fresh.items():
+            for article in by_media[media_id]:
+                self._apply(article, metadata, options, cached=True)
+            self._progress(self.done_count, len(articles), started)
 
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"  ✗ Error: {e}"))
+        # Workers only do network lookups; results are applied and written here
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(lookup_videos, keys): keys for keys in video_batches}
+            futures.update({executor.submit(lookup, key): [key] for key in others})
+            for future in as_completed(futures):
+                keys = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = {}
+                    self.stdout.write(self.style.ERROR(f"\n✗ Error looking up {', '.join(keys)}: {e}"))
+
+                for key in keys:
+                    metadata = results.get(key)
+                    if metadata and not key.startswith('article:'):
+                        self.pending_cache[key] = metadata
+                    metadata = metadata or cached.get(key)
+                    for article in by_media[key]:
+                        self._apply(article, metadata, options)
+                self._progress(self.done_count, len(articles), started)
+
+        self._write(self.pending_writes, self.pending_cache)
 
         self.stdout.write("\n" + "=" * 60)
         self.stdout.write(self.style.SUCCESS(
-            f"\nCompleted! Successfully enriched {success_count}/{len(articles)} articles."
+            f"\nCompleted! Successfully enriched {self.success_count}/{len(articles)} articles "
+            f"in {time.monotonic() - started:.1f}s."
         ))
 
-        if success_count < len(articles):
+        if self.success_count < len(articles):
             self.stdout.write(self.style.WARNING(
                 "\nNote: Some articles could not be enriched. This is normal for:"
                 "\n  - Videos that have been deleted"
                 "\n  - Podcasts without duration info in RSS"
                 "\n  - Rate-limited requests (try again later)"
             ))
+
+    def _apply(self, article, metadata, options, cached=False):
+        """Apply metadata to one article, report it and flush writes in batches"""
+        self.done_count += 1
+        self.stdout.write(f"\n• {article.title[:50]}...")
+
+        fields = apply_article_metadata(article, metadata)
+        if fields:
+            self.success_count += 1
+            self.pending_writes.append(article)
+
+            # Display enriched data
+            if article.duration_seconds:
+                duration_str = format_duration(article.duration_seconds)
+                self.stdout.write(f"  Duration: {duration_str}")
+            if article.author:
+                self.stdout.write(f"  Author: {article.author}")
+            if article.view_count:
+                self.stdout.write(f"  Views: {article.view_count:,}")
+
+            self.stdout.write(self.style.SUCCESS("  ✓ Enriched (cached)" if cached else "  ✓ Enriched"))
+        else:
+            self.stdout.write(self.style.WARNING("  ⚠ Could not extract metadata"))
+
+        if len(self.pending_writes) >= options['batch_size']:
+            self._write(self.pending_writes, self.pending_cache)
+            self.pending_writes = []
+            self.pending_cache = {}
+
+    def _write(self, articles, cache_entries):
+        """Bulk write enriched articles and new cache entries in one transaction"""
+        if articles or cache_entries:
+            with transaction.atomic():
+                if articles:
+                    bulk_update_articles(articles, METADATA_FIELDS)
+                store_cached_metadata(cache_entries)
+
+    def _progress(self, done, total, started):
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0
+        eta = (total - done) / rate if rate else 0
+        self.stdout.write(f"  [{done}/{total}] {rate:.1f} articles/s, ETA {eta:.0f}s")
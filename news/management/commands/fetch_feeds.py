@@ -5,8 +5,12 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 from time import mktime
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
+from news.counters import bump_content_version
+from news.events import prune_events
 from news.models import Source, Article
+from news.media_service import extract_feed_entry_metadata
 
 class Command(BaseCommand):
     help = 'Fetches new articles from all sources'
@@ -19,11 +23,22 @@ class Command(BaseCommand):
 
         for source in sources:
             self.stdout.write(f'Checking {source.name}...')
+            started = time.monotonic()
+            latency_ms = None
+            error = ''
             try:
                 feed = feedparser.parse(source.url)
-                
+                latency_ms = int((time.monotonic() - started) * 1000)
+
+                # feedparser reports unreachable feeds and HTTP errors instead of raising
+                if feed.get('status', 200) >= 400:
+                    error = f"HTTP {feed.status}"
+                elif feed.bozo and not feed.entries:
+                    error = str(feed.bozo_exception)
+                if error:
+                    self.stdout.write(self.style.ERROR(f'  Failed to fetch {source.url}: {error}'))
                 # Check for bozo error (malformed XML)
-                if feed.bozo:
+                elif feed.bozo:
                     self.stdout.write(self.style.WARNING(f'  Feed Error: {feed.bozo_exception}'))
                     # Continue anyway as feedparser often salvages partial content
 
@@ -62,6 +77,13 @@ class Command(BaseCommand):
                         # YouTube often puts it here
                         image_url = entry.media_thumbnail[0]['url']
                     
+                    # Duration, author, views and artwork straight from the feed
+                    # extensions (media:*, itunes:*), so enrichment is rarely needed
+                    media_metadata = extract_feed_entry_metadata(entry, feed.feed)
+
+                    if not image_url and media_metadata.get('image_url'):
+                        image_url = media_metadata['image_url']
+
                     if not image_url and 'links' in entry:
                         # Look for enclosures
                         for link in entry.links:
@@ -83,18 +105,34 @@ class Command(BaseCommand):
                             if img:
                                 image_url = img.get('src')
 
-                    # Create Article
-                    Article.objects.create(
-                        source=source,
-                        title=entry.title,
-                        link=entry.link,
-                        description=entry.get('summary', '')[:5000], # Trucate just in case
-                        pub_date=published,
-                        guid=guid,
-                        image_url=image_url
-                    )
+                    # Create Article (atomically with its counter updates)
+                    with transaction.atomic():
+                        Article.objects.create(
+                            source=source,
+                            title=entry.title,
+                            link=entry.link,
+                            description=entry.get('summary', '')[:5000], # Trucate just in case
+                            pub_date=published,
+                            guid=guid,
+                            image_url=image_url,
+                            duration_seconds=media_metadata.get('duration_seconds'),
+                            author=media_metadata.get('author', ''),
+                            view_count=media_metadata.get('view_count'),
+                            enclosure_url=media_metadata.get('enclosure_url')
+                        )
                     total_new += 1
             except Exception as e:
+                error = str(e) or e.__class__.__name__
                 self.stdout.write(self.style.ERROR(f'  Failed to parse {source.url}: {e}'))
 
+            if latency_ms is None:
+                latency_ms = int((time.monotonic() - started) * 1000)
+            source.record_fetch(latency_ms, error)
+
         self.stdout.write(self.style.SUCCESS(f'Successfully added {total_new} new articles.'))
+
+        # Source health changed: revalidate list_sources (and pages) once per run
+        bump_content_version()
+
+        # Old ingest events can no longer be waited on by any dashboard
+        prune_events()
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from news.search import rebuild_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from all articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of articles indexed per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError("Full-text search needs SQLite with FTS5")
+
+        started = time.monotonic()
+        total = rebuild_index(
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"  Indexed {done} articles...")
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Indexed {total} articles in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from news.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized article/read/saved counters and repair any drift'
+
+    def handle(self, *args, **options):
+        drifted = reconcile()
+        for key, (stored, actual) in sorted(drifted.items()):
+            self.stdout.write(f"  {key}: {stored} → {actual}")
+
+        if drifted:
+            self.stdout.write(self.style.WARNING(f"⚠ Repaired {len(drifted)} drifted counters"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✓ All counters are accurate"))
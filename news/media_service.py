@@ -6,7 +6,18 @@ import subprocess
 import json
 import re
 import logging
-from urllib.parse import urlparse, parse_qs
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode, urlunparse
+
+from django.conf import settings
+from django.utils import timezone
+
+from news.audio_probe import probe_audio_duration
+from news.models import MediaMetadata
 
 logger = logging.getLogger(__name__)
 
@@ -19,58 +30,216 @@ def is_youtube_url(url):
     return any(domain == d or domain.endswith('.' + d) for d in youtube_domains)
 
 
-def extract_youtube_metadata(url):
-    """
-    Extract metadata from YouTube video using yt-dlp.
-    Returns dict with: duration_seconds, author, view_count, description, thumbnail
+YOUTUBE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r'^(utm_.*|fbclid|gclid|mc_[a-z]+|ref|si|feature|source)$', re.IGNORECASE)
+
+# Podcast analytics redirects wrapped around the real enclosure URL
+TRACKING_PREFIXES = re.compile(
+    r'^https?://(?:dts\.podtrac\.com/redirect\.[a-z0-9]+|chtbl\.com/track/[^/]+|pdst\.fm/e|op3\.dev/e)/',
+    re.IGNORECASE
+)
+
+
+def youtube_video_id(url):
+    """The 11-character video ID of any YouTube URL form, or None (e.g. channel pages)."""
+    if not url or not is_youtube_url(url):
+        return None
+    parsed = urlparse(url)
+    if parsed.netloc.lower().endswith('youtu.be'):
+        candidate = parsed.path.strip('/').split('/')[0]
+    elif parsed.path.rstrip('/') == '/watch':
+        candidate = parse_qs(parsed.query).get('v', [''])[0]
+    else:
+        match = re.match(r'^/(?:shorts|embed|live|v)/([^/]+)', parsed.path)
+        candidate = match.group(1) if match else ''
+    return candidate if YOUTUBE_ID_PATTERN.match(candidate) else None
+
+
+def youtube_watch_url(video_id):
+    """Canonical watch page URL of a video ID."""
+    return f'https://www.youtube.com/watch?v={video_id}'
 
-    Note: Requires yt-dlp to be installed: pip install yt-dlp
+
+def canonical_media_id(url):
     """
-    if not is_youtube_url(url):
+    Stable cache key for a video or episode, whatever URL form it arrived under:
+    'yt:<video id>' for YouTube, otherwise 'url:<normalized url>' with the
+    scheme, host case, fragment, tracking parameters and analytics redirects removed.
+    """
+    if not url:
+        return None
+    video_id = youtube_video_id(url)
+    if video_id:
+        return f'yt:{video_id}'
+    if is_youtube_url(url):
+        return None
+
+    while TRACKING_PREFIXES.match(url):
+        url = TRACKING_PREFIXES.sub('', url, count=1)
+        if not re.match(r'^https?://', url, re.IGNORECASE):
+            url = f'https://{url}'
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
         return None
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    )
+    normalized = urlunparse(('', parsed.netloc.lower(), parsed.path or '/', '', urlencode(query), ''))
+    return f'url:{normalized.lstrip("/")}'
+
+
+# Per-video limit for metadata extraction (seconds)
+YTDLP_TIMEOUT = 15
+
+YTDLP_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'noplaylist': True,
+    'socket_timeout': YTDLP_TIMEOUT,
+    'logger': logging.getLogger(__name__ + '.yt_dlp'),  # Route yt-dlp output through logging
+}
+
+# Extraction threads; a timed-out extraction keeps its thread until yt-dlp's
+# own socket timeouts end it, so callers wait for a free one (see extract_youtube_metadata)
+YTDLP_WORKERS = 16
+
+# yt-dlp instances are not thread-safe, so each extraction thread keeps its own
+_ydl_local = threading.local()
+_extract_executor = ThreadPoolExecutor(max_workers=YTDLP_WORKERS, thread_name_prefix='yt-dlp')
+_extract_slots = threading.BoundedSemaphore(YTDLP_WORKERS)
+
+
+def _get_ydl():
+    """Return this thread's configured YoutubeDL, created once and reused across URLs."""
+    ydl = getattr(_ydl_local, 'ydl', None)
+    if ydl is None:
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(YTDLP_OPTIONS)
+        _ydl_local.ydl = ydl
+    return ydl
+
+
+def _is_safe_youtube_url(url):
+    """YouTube URL with an http(s) scheme (never pass anything else to yt-dlp)."""
+    if not is_youtube_url(url):
+        return False
 
-    # Validate URL scheme for security (prevent command injection)
+    # Validate URL scheme for security (prevent command injection / local file access)
     parsed = urlparse(url)
     if parsed.scheme not in ('http', 'https'):
         logger.warning(f"Invalid URL scheme for YouTube metadata: {parsed.scheme}")
-        return None
+        return False
+    return True
 
+
+def _youtube_metadata_from_info(data):
+    return {
+        'duration_seconds': data.get('duration'),
+        'author': data.get('uploader') or data.get('channel'),
+        'view_count': data.get('view_count'),
+        'description': (data.get('description') or '')[:1000],  # Limit description
+        'thumbnail': data.get('thumbnail'),
+        'title': data.get('title'),  # In case FreshRSS title is truncated
+    }
+
+
+def _extract_with_cli(url):
+    """Fallback when the yt_dlp package can't be imported: one yt-dlp process per video."""
     try:
-        # Use yt-dlp to extract metadata (no download, just info)
         result = subprocess.run(
             ['yt-dlp', '--dump-json', '--no-download', '--no-warnings', url],
             capture_output=True,
             text=True,
-            timeout=15
+            timeout=YTDLP_TIMEOUT
         )
-
         if result.returncode == 0:
-            data = json.loads(result.stdout)
-
-            return {
-                'duration_seconds': data.get('duration'),
-                'author': data.get('uploader') or data.get('channel'),
-                'view_count': data.get('view_count'),
-                'description': data.get('description', '')[:1000],  # Limit description
-                'thumbnail': data.get('thumbnail'),
-                'title': data.get('title'),  # In case FreshRSS title is truncated
-            }
+            return json.loads(result.stdout)
     except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError) as e:
         logger.error(f"Error extracting YouTube metadata: {e}")
-
     return None
 
 
+def _extract_info(url):
+    try:
+        ydl = _get_ydl()
+    except ImportError:
+        return _extract_with_cli(url)
+    return ydl.extract_info(url, download=False)
+
+
+def extract_youtube_metadata(url):
+    """
+    Extract metadata from YouTube video using yt-dlp.
+    Returns dict with: duration_seconds, author, view_count, description, thumbnail
+
+    Runs in-process on its thread's reused yt-dlp instance (no interpreter or
+    extractor startup per video) and gives up after YTDLP_TIMEOUT seconds.
+    Work is only submitted when a thread is free, so extractions that hang
+    past the timeout can't queue up further work behind them.
+    """
+    if not _is_safe_youtube_url(url):
+        return None
+
+    if not _extract_slots.acquire(timeout=YTDLP_TIMEOUT):
+        logger.error(f"No free yt-dlp worker for {url}; earlier extractions are still running")
+        return None
+    future = _extract_executor.submit(_extract_info, url)
+    future.add_done_callback(lambda _: _extract_slots.release())
+    try:
+        data = future.result(timeout=YTDLP_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()  # Only stops it if it hasn't started
+        logger.error(f"Timed out extracting YouTube metadata for {url}")
+        return None
+    except Exception as e:
+        # yt-dlp raises DownloadError/ExtractorError for unavailable videos
+        logger.error(f"Error extracting YouTube metadata: {e}")
+        return None
+
+    return _youtube_metadata_from_info(data) if data else None
+
+
+def extract_youtube_metadata_batch(urls, workers=4, throttle=None):
+    """
+    Resolve metadata for many videos, each distinct URL once.
+    Returns dict mapping url -> metadata dict (or None if extraction failed).
+
+    Up to `workers` extractions run at a time on the yt-dlp threads (see
+    extract_youtube_metadata), each within throttle's per-host limits if given.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    def extract(url):
+        if throttle is None:
+            return extract_youtube_metadata(url)
+        with throttle.slot(url):
+            return extract_youtube_metadata(url)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as executor:
+        return dict(zip(urls, executor.map(extract, urls)))
+
+
+def is_audio_url(url):
+    """Check if URL points at an audio file."""
+    audio_extensions = ['.mp3', '.m4a', '.ogg', '.wav', '.aac']
+    path_lower = urlparse(url).path.lower()
+    return any(path_lower.endswith(ext) for ext in audio_extensions)
+
+
 def is_podcast_url(url):
     """Check if URL is likely a podcast (audio file or podcast URL)."""
-    audio_extensions = ['.mp3', '.m4a', '.ogg', '.wav', '.aac']
     podcast_domains = ['podcasts.apple.com', 'spotify.com', 'soundcloud.com', 'pocketcasts.com']
 
     parsed = urlparse(url)
-    path_lower = parsed.path.lower()
 
     # Check for audio file extensions
-    if any(path_lower.endswith(ext) for ext in audio_extensions):
+    if is_audio_url(url):
         return True
 
     # Check for podcast hosting domains
@@ -80,21 +249,24 @@ def is_podcast_url(url):
     return False
 
 
-def extract_podcast_metadata(url, description=''):
+def extract_podcast_metadata(url, description='', enclosure_url=None):
     """
     Extract podcast metadata.
-    For now, uses simple heuristics and RSS data.
+    Reads the exact duration from the audio file's headers using HTTP Range
+    requests (see audio_probe); guesses from the description only as a last resort.
     Returns dict with: duration_seconds, author, description
     """
-    if not is_podcast_url(url):
+    if not is_podcast_url(url) and not enclosure_url:
         return None
 
+    audio_url = enclosure_url or (url if is_audio_url(url) else None)
+    duration_seconds = probe_audio_duration(audio_url) if audio_url else None
+
     # Try to extract duration from description using common patterns
     # Example: "Duration: 45:30" or "Length: 1h 20m"
-    duration_seconds = None
 
     # Pattern: HH:MM:SS or MM:SS
-    time_pattern = re.search(r'(\d{1,2}):(\d{2})(?::(\d{2}))?', description)
+    time_pattern = None if duration_seconds else re.search(r'(\d{1,2}):(\d{2})(?::(\d{2}))?', description)
     if time_pattern:
         hours = 0
         if time_pattern.group(3):  # HH:MM:SS
@@ -121,44 +293,265 @@ def extract_podcast_metadata(url, description=''):
     }
 
 
-def enrich_article_with_metadata(article):
+def media_kind(article):
+    """'yt', 'podcast' or None, from the source type or the link itself."""
+    if not article.source:
+        return None
+    if article.source.source_type == 'yt' or is_youtube_url(article.link):
+        return 'yt'
+    if article.source.source_type == 'podcast' or is_podcast_url(article.link) or article.enclosure_url:
+        return 'podcast'
+    return None
+
+
+def fetch_article_metadata(article):
     """
-    Enrich an article with metadata based on its source type.
-    Modifies the article in-place and saves it.
+    Look up media metadata for an article based on its source type.
+    Network only (no database writes), so it is safe to run in worker threads.
+    Returns metadata dict or None.
     """
-    if not article.source:
-        return False
+    kind = media_kind(article)
 
     # YouTube metadata
-    if article.source.source_type == 'yt' or is_youtube_url(article.link):
-        metadata = extract_youtube_metadata(article.link)
-        if metadata:
-            article.duration_seconds = metadata.get('duration_seconds')
-            article.author = metadata.get('author', '')[:200]  # Limit to field max
-            article.view_count = metadata.get('view_count')
-            if metadata.get('description') and not article.description:
-                article.description = metadata['description']
-            if metadata.get('thumbnail') and not article.image_url:
-                article.image_url = metadata['thumbnail']
-            if metadata.get('title'):
-                article.title = metadata['title']
-
-            article.save()
-            return True
+    if kind == 'yt':
+        video_id = youtube_video_id(article.link)
+        url = youtube_watch_url(video_id) if video_id else article.link
+        return extract_youtube_metadata(url)
 
     # Podcast metadata
-    elif article.source.source_type == 'podcast' or is_podcast_url(article.link):
-        metadata = extract_podcast_metadata(article.link, article.description)
+    elif kind == 'podcast':
+        metadata = extract_podcast_metadata(article.link, article.description, article.enclosure_url)
         if metadata and metadata.get('duration_seconds'):
-            article.duration_seconds = metadata['duration_seconds']
-            if metadata.get('author'):
-                article.author = metadata['author'][:200]
-            article.save()
-            return True
+            return metadata
+
+    return None
+
 
+def apply_article_metadata(article, metadata):
+    """
+    Copy fetched metadata onto the article in-place (without saving).
+    Returns the list of fields that were set.
+    """
+    if not metadata:
+        return []
+
+    fields = []
+    if media_kind(article) == 'yt':
+        # YouTube metadata
+        article.duration_seconds = metadata.get('duration_seconds')
+        article.author = (metadata.get('author') or '')[:200]  # Limit to field max
+        if metadata.get('view_count') is not None:
+            article.view_count = metadata['view_count']  # Left out when the cached count expired
+        fields += ['duration_seconds', 'author', 'view_count']
+        if metadata.get('description') and not article.description:
+            article.description = metadata['description']
+            fields.append('description')
+        if metadata.get('thumbnail') and not article.image_url:
+            article.image_url = metadata['thumbnail']
+            fields.append('image_url')
+        if metadata.get('title'):
+            article.title = metadata['title']
+            fields.append('title')
+    else:
+        # Podcast metadata
+        article.duration_seconds = metadata['duration_seconds']
+        fields.append('duration_seconds')
+        if metadata.get('author'):
+            article.author = metadata['author'][:200]
+            fields.append('author')
+    return fields
+
+
+def article_media_id(article):
+    """Canonical media ID of a YouTube/podcast article (see canonical_media_id), or None."""
+    kind = media_kind(article)
+    if kind == 'yt':
+        return canonical_media_id(article.link)
+    if kind == 'podcast':
+        return canonical_media_id(article.enclosure_url or article.link)
+    return None
+
+
+def get_cached_metadata(media_ids):
+    """
+    Metadata dicts from the cache, keyed by media ID, for entries whose stable
+    fields are within MEDIA_METADATA_TTL_DAYS. A view count older than
+    MEDIA_VIEW_COUNT_TTL_HOURS is returned as None rather than copied onto
+    articles, with 'view_count_expired' set so callers look the item up again.
+    """
+    media_ids = {media_id for media_id in media_ids if media_id}
+    if not media_ids:
+        return {}
+
+    now = timezone.now()
+    stable_cutoff = now - timedelta(days=settings.MEDIA_METADATA_TTL_DAYS)
+    view_cutoff = now - timedelta(hours=settings.MEDIA_VIEW_COUNT_TTL_HOURS)
+
+    cached = {}
+    for entry in MediaMetadata.objects.filter(media_id__in=media_ids, fetched_at__gte=stable_cutoff):
+        expired_views = entry.view_count is not None and not (
+            entry.view_count_fetched_at and entry.view_count_fetched_at >= view_cutoff
+        )
+        cached[entry.media_id] = {
+            'duration_seconds': entry.duration_seconds,
+            'author': entry.author or None,
+            'view_count': None if expired_views else entry.view_count,
+            'view_count_expired': expired_views,
+            'description': entry.description,
+            'thumbnail': entry.thumbnail or None,
+            'title': entry.title or None,
+        }
+    return cached
+
+
+def store_cached_metadata(results):
+    """Upsert freshly extracted metadata (dict of media ID -> metadata) into the cache."""
+    now = timezone.now()
+    entries = [
+        MediaMetadata(
+            media_id=media_id,
+            title=(metadata.get('title') or '')[:500],
+            author=(metadata.get('author') or '')[:200],
+            description=metadata.get('description') or '',
+            thumbnail=(metadata.get('thumbnail') or '')[:1000],
+            duration_seconds=metadata.get('duration_seconds'),
+            view_count=metadata.get('view_count'),
+            fetched_at=now,
+            view_count_fetched_at=now if metadata.get('view_count') is not None else None
+        )
+        for media_id, metadata in results.items()
+        if media_id and metadata
+    ]
+    if entries:
+        MediaMetadata.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['media_id'],
+            update_fields=[
+                'title', 'author', 'description', 'thumbnail', 'duration_seconds',
+                'view_count', 'fetched_at', 'view_count_fetched_at'
+            ]
+        )
+
+
+def enrich_article_with_metadata(article):
+    """
+    Enrich an article with metadata based on its source type.
+    Uses the metadata cache when it has a fresh entry; extracts (and caches) otherwise,
+    falling back on a cached entry whose view count expired if extraction fails.
+    Modifies the article in-place and saves it.
+    """
+    media_id = article_media_id(article)
+    metadata = get_cached_metadata([media_id]).get(media_id)
+    if metadata is None or metadata['view_count_expired']:
+        fetched = fetch_article_metadata(article)
+        store_cached_metadata({media_id: fetched})
+        metadata = fetched or metadata
+
+    fields = apply_article_metadata(article, metadata)
+    if fields:
+        article.save()
+        return True
     return False
 
 
+class HostThrottle:
+    """
+    Politeness limits for concurrent fetching: at most `max_concurrent`
+    requests in flight per host, started at least `min_interval` seconds apart.
+    """
+
+    def __init__(self, max_concurrent=2, min_interval=0.5):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _host(self, url):
+        host = urlparse(url).netloc.lower()
+        # youtu.be / m.youtube.com all hit the same servers
+        return 'youtube.com' if is_youtube_url(url) else host
+
+    @contextmanager
+    def slot(self, url):
+        host = self._host(url)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.max_concurrent))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+def parse_duration(value):
+    """
+    Parse a feed duration into seconds.
+    Accepts plain seconds ("3723", 3723) or clock format ("1:02:03", "62:03").
+    Returns None when the value can't be parsed.
+    """
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+
+    parts = str(value).strip().split(':')
+    if len(parts) > 3:
+        return None
+    try:
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+    return int(seconds) if seconds > 0 else None
+
+
+def extract_feed_entry_metadata(entry, feed=None):
+    """
+    Media metadata carried by the feed itself, so most items need no enrichment.
+    Reads itunes:duration / media:content@duration, itunes:author (or the
+    entry/feed author), media:statistics views and itunes:image / media:thumbnail.
+    `entry` and `feed` are feedparser dicts. Returns dict with the fields found:
+    duration_seconds, author, view_count, image_url, enclosure_url.
+    """
+    metadata = {}
+
+    duration = parse_duration(entry.get('itunes_duration'))
+    if not duration:
+        for media in entry.get('media_content', []):
+            duration = parse_duration(media.get('duration'))
+            if duration:
+                break
+    if duration:
+        metadata['duration_seconds'] = duration
+
+    author = entry.get('author') or (feed.get('author') if feed else None)
+    if author:
+        metadata['author'] = author[:200]
+
+    views = (entry.get('media_statistics') or {}).get('views')
+    if views and str(views).isdigit():
+        metadata['view_count'] = int(views)
+
+    image = entry.get('image') or {}
+    if entry.get('media_thumbnail'):
+        metadata['image_url'] = entry['media_thumbnail'][0].get('url')
+    elif image.get('href'):
+        metadata['image_url'] = image['href']
+
+    for link in entry.get('links', []):
+        if link.get('rel') == 'enclosure' and link.get('type', '').startswith('audio/'):
+            metadata['enclosure_url'] = link.get('href')
+            break
+
+    return metadata
+
+
 def format_duration(seconds):
     """
     Format duration in seconds to human-readable string.
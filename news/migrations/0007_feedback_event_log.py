@@ -0,0 +1,47 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_fix_readingcontext_weights'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_score', models.IntegerField()),
+                ('new_score', models.IntegerField()),
+                ('weight', models.FloatField(default=1.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_events', to='news.article')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'article'], name='feedbackevent_user_article')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PreferenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('category', 'Category'), ('source', 'Source'), ('keyword', 'Keyword')], max_length=10)),
+                ('key', models.CharField(max_length=200)),
+                ('likes', models.FloatField(default=0.0)),
+                ('dislikes', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preference_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', '-likes'], name='prefcounter_top_likes')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind', 'key'), name='unique_preference_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_feedback_event_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='scored_preference_version',
+            field=models.PositiveIntegerField(default=0, help_text='UserPreference version the scores were computed under (0 = never)'),
+        ),
+        migrations.AddField(
+            model_name='userpreference',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Bumped on every change; older article scores are stale'),
+        ),
+    ]
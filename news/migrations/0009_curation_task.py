@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_scored_preference_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurationTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('summarize', 'Summarize'), ('score', 'AI Relevance Score'), ('classify', 'Content Depth')], max_length=20)),
+                ('status', models.CharField(choices=[('done', 'Done'), ('failed', 'Failed')], max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.CharField(blank=True, max_length=500)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='curation_tasks', to='news.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stage', 'status'], name='curationtask_stage_status')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'stage'), name='unique_curation_task')],
+            },
+        ),
+    ]
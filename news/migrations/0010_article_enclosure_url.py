@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_curation_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='enclosure_url',
+            field=models.URLField(blank=True, help_text='Podcast audio file', max_length=1000, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_article_enclosure_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.CharField(help_text='e.g. yt:dQw4w9WgXcQ', max_length=1000, unique=True)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('author', models.CharField(blank=True, max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('thumbnail', models.URLField(blank=True, max_length=1000)),
+                ('duration_seconds', models.IntegerField(blank=True, null=True)),
+                ('view_count', models.IntegerField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(help_text='When title, author and duration were extracted')),
+                ('view_count_fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Media metadata',
+            },
+        ),
+    ]
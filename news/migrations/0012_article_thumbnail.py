@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0011_media_metadata_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='image_hash',
+            field=models.CharField(blank=True, help_text='Content hash of the local thumbnails', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='image_placeholder',
+            field=models.CharField(blank=True, help_text='Average image color, shown while loading', max_length=7),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0012_article_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['source', '-pub_date'], name='article_unread_source'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_saved', True)), fields=['-pub_date', '-id'], name='article_saved_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('ai_summary__isnull', True)), fields=['-id'], name='article_needs_summary'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('relevance_score', 0)), fields=['-id'], name='article_needs_score'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('content_depth', 'medium')), fields=['-id'], name='article_default_depth'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['scored_preference_version', 'relevance_score'], name='article_scored_version'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('duration_seconds__isnull', True)), fields=['source'], name='article_needs_media'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['feedback_score'], name='article_feedback'),
+        ),
+    ]
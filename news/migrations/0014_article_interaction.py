@@ -0,0 +1,114 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_state_to_first_user(apps, schema_editor):
+    """The global read/saved/feedback columns become the first user's interactions"""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Article = apps.get_model('news', 'Article')
+    ArticleInteraction = apps.get_model('news', 'ArticleInteraction')
+
+    user = User.objects.order_by('pk').first()
+    if user is None:
+        return
+
+    touched = Article.objects.filter(
+        models.Q(is_read=True) | models.Q(is_saved=True) | ~models.Q(feedback_score=0)
+    ).values_list('pk', 'is_read', 'is_saved', 'feedback_score')
+    ArticleInteraction.objects.bulk_create(
+        (
+            ArticleInteraction(
+                user=user, article_id=pk, is_read=is_read, is_saved=is_saved, feedback_score=feedback_score
+            )
+            for pk, is_read, is_saved, feedback_score in touched.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+def copy_state_back_to_articles(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Article = apps.get_model('news', 'Article')
+    ArticleInteraction = apps.get_model('news', 'ArticleInteraction')
+
+    user = User.objects.order_by('pk').first()
+    if user is None:
+        return
+
+    for interaction in ArticleInteraction.objects.filter(user=user).iterator():
+        Article.objects.filter(pk=interaction.article_id).update(
+            is_read=interaction.is_read,
+            is_saved=interaction.is_saved,
+            feedback_score=interaction.feedback_score
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0013_article_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_saved', models.BooleanField(default=False)),
+                ('feedback_score', models.SmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='articleinteraction',
+            name='article',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to='news.article'),
+        ),
+        migrations.AddField(
+            model_name='articleinteraction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='articleinteraction',
+            constraint=models.UniqueConstraint(fields=('user', 'article'), name='unique_article_interaction'),
+        ),
+        migrations.RunPython(copy_state_to_first_user, copy_state_back_to_articles),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_unread_source',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_saved_recent',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_feedback',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='feedback_score',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='is_saved',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['source', '-pub_date'], name='article_source_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='articleinteraction',
+            index=models.Index(fields=['user', 'feedback_score'], name='interaction_feedback'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0014_article_interaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Bumped on every content change; versions cached card fragments'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:40
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    """Seed the counters from existing rows (same keys as news.counters)"""
+    Article = apps.get_model('news', 'Article')
+    ArticleInteraction = apps.get_model('news', 'ArticleInteraction')
+    Counter = apps.get_model('news', 'Counter')
+    Source = apps.get_model('news', 'Source')
+
+    counts = defaultdict(int)
+    counts['sources'] = Source.objects.count()
+    for row in Article.objects.values('source_id', 'source__category_id').annotate(count=Count('id')):
+        counts['articles'] += row['count']
+        counts[f"articles:category:{row['source__category_id']}"] += row['count']
+        counts[f"articles:source:{row['source_id']}"] += row['count']
+
+    read_rows = ArticleInteraction.objects.filter(is_read=True).values(
+        'user_id', 'article__source_id', 'article__source__category_id'
+    ).annotate(count=Count('id'))
+    for row in read_rows:
+        prefix = f"user:{row['user_id']}:read"
+        counts[prefix] += row['count']
+        counts[f"{prefix}:category:{row['article__source__category_id']}"] += row['count']
+        counts[f"{prefix}:source:{row['article__source_id']}"] += row['count']
+
+    for row in ArticleInteraction.objects.filter(is_saved=True).values('user_id').annotate(count=Count('id')):
+        counts[f"user:{row['user_id']}:saved"] = row['count']
+
+    Counter.objects.bulk_create([Counter(key=key, value=value) for key, value in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0015_article_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+FIELDS = ('title', 'description', 'ai_summary', 'author')
+
+
+def plain_text(value):
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 index for news.search (SQLite only), populated from existing articles"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Article = apps.get_model('news', 'Article')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS news_article_fts USING fts5("
+            "title, description, ai_summary, author, tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            "INSERT INTO news_article_fts (news_article_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0, 2.0)')"
+        )
+        rows = Article.objects.order_by('id').values_list('id', *FIELDS).iterator(chunk_size=1000)
+        batch = []
+        for article_id, *values in rows:
+            batch.append((article_id, *(plain_text(value) for value in values)))
+            if len(batch) >= 1000:
+                cursor.executemany(
+                    "INSERT INTO news_article_fts (rowid, title, description, ai_summary, author) "
+                    "VALUES (%s, %s, %s, %s, %s)", batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                "INSERT INTO news_article_fts (rowid, title, description, ai_summary, author) "
+                "VALUES (%s, %s, %s, %s, %s)", batch
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS news_article_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0016_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0018_ingest_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['updated_at'], name='article_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='articleinteraction',
+            index=models.Index(fields=['user', 'updated_at'], name='interaction_updated'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0019_article_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_fetch_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_fetch_latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_success_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:09
+
+from datetime import datetime, timezone
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def keep_previous_epoch(apps, schema_editor):
+    """Existing event weights and counters were computed from the former fixed epoch"""
+    UserPreference = apps.get_model('news', 'UserPreference')
+    UserPreference.objects.update(decay_epoch=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0020_source_fetch_telemetry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreference',
+            name='decay_epoch',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Time at which a feedback event weighs 1.0 (see _feedback_weight)'),
+        ),
+        migrations.RunPython(keep_previous_epoch, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0021_userpreference_decay_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='image_retry_after',
+            field=models.DateTimeField(blank=True, help_text='Thumbnail generation failed; not retried before this', null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0022_article_image_retry_after'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_scored_version',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['scored_preference_version', '-id'], name='article_scored_version'),
+        ),
+    ]
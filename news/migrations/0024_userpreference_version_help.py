@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0023_article_scored_version_by_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userpreference',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Bumped when scoring inputs change; older article scores are stale'),
+        ),
+    ]
@@ -1,8 +1,37 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q, Avg
+from django.db.models import Q, Avg, F, Value, ExpressionWrapper, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from collections import defaultdict
 import json
 
+# Component weights used for the final score when no ReadingContext is active
+DEFAULT_SCORING_WEIGHTS = {
+    'relevance': 0.4,
+    'personalization': 0.3,
+    'serendipity': 0.1,
+    'trend': 0.2,
+}
+
+
+def final_score_expression(reading_context=None):
+    """
+    Database expression for an article's weighted final score.
+    Computed from the stored component scores, so switching the active
+    ReadingContext re-ranks articles without any rescoring run.
+    """
+    weights = reading_context.scoring_weights() if reading_context else DEFAULT_SCORING_WEIGHTS
+    return ExpressionWrapper(
+        F('relevance_score') * weights['relevance'] +
+        F('personalization_score') * weights['personalization'] +
+        F('serendipity_score') * weights['serendipity'] +
+        F('trend_score') * weights['trend'],
+        output_field=models.FloatField()
+    )
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -26,9 +55,29 @@ class Source(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sources')
     icon_url = models.URLField(blank=True, null=True)
 
+    # Fetch telemetry, recorded by fetch_feeds
+    last_fetch_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_fetch_latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
     def __str__(self):
         return self.name
 
+    def record_fetch(self, latency_ms, error=''):
+        """
+        Store one fetch attempt: its latency, and either a success or one
+        more consecutive failure with its error. Written with update(), so it
+        isn't a content change for the counters' signal handlers.
+        """
+        now = timezone.now()
+        if error:
+            changes = {'consecutive_failures': F('consecutive_failures') + 1, 'last_error': error[:1000]}
+        else:
+            changes = {'consecutive_failures': 0, 'last_error': '', 'last_success_at': now}
+        Source.objects.filter(pk=self.pk).update(last_fetch_at=now, last_fetch_latency_ms=latency_ms, **changes)
+
 class Article(models.Model):
     source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='articles')
     title = models.CharField(max_length=500)
@@ -37,6 +86,10 @@ class Article(models.Model):
     pub_date = models.DateTimeField()
     guid = models.CharField(max_length=500, unique=True, null=True, blank=True)
     image_url = models.URLField(max_length=1000, blank=True, null=True)
+    enclosure_url = models.URLField(max_length=1000, blank=True, null=True, help_text="Podcast audio file")
+    image_hash = models.CharField(max_length=20, blank=True, help_text="Content hash of the local thumbnails")
+    image_placeholder = models.CharField(max_length=7, blank=True, help_text="Average image color, shown while loading")
+    image_retry_after = models.DateTimeField(null=True, blank=True, help_text="Thumbnail generation failed; not retried before this")
 
     # AI Content
     ai_summary = models.TextField(blank=True, null=True)
@@ -44,12 +97,11 @@ class Article(models.Model):
     personalization_score = models.FloatField(default=0.0, help_text="Personalized score combining AI + user preferences")
     trend_score = models.FloatField(default=0.0, help_text="Market trend/importance score")
     serendipity_score = models.FloatField(default=0.0, help_text="Score for unexpected but potentially interesting content")
+    scored_preference_version = models.PositiveIntegerField(default=0, help_text="UserPreference version the scores were computed under (0 = never)")
 
-    # Status
-    is_read = models.BooleanField(default=False)
-    is_saved = models.BooleanField(default=False)
-    feedback_score = models.IntegerField(default=0) # -1: Dislike, 0: Neutral, 1: Like
+    # Per-user read/saved/feedback state lives in ArticleInteraction
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Bumped on every content change; versions cached card fragments")
 
     # Metadata for YouTube/Podcasts
     duration_seconds = models.IntegerField(null=True, blank=True, help_text="Video/podcast duration")
@@ -65,11 +117,171 @@ class Article(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            # Category lists
+            models.Index(fields=['source', '-pub_date'], name='article_source_recent'),
+            # Curation backlogs, walked newest id first (news.curation.iter_chunks)
+            models.Index(fields=['-id'], condition=Q(ai_summary__isnull=True), name='article_needs_summary'),
+            models.Index(fields=['-id'], condition=Q(relevance_score=0), name='article_needs_score'),
+            models.Index(fields=['-id'], condition=Q(content_depth='medium'), name='article_default_depth'),
+            # Personalize backlog, one preference version at a time (news.curation.personalize_slices)
+            models.Index(fields=['scored_preference_version', '-id'], name='article_scored_version'),
+            # Media enrichment backlog
+            models.Index(fields=['source'], condition=Q(duration_seconds__isnull=True), name='article_needs_media'),
+            # API delta sync: articles changed since a sync token
+            models.Index(fields=['updated_at'], name='article_updated'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+def bulk_update_articles(articles, fields):
+    """
+    bulk_update that also bumps updated_at and the content version and
+    reindexes search, which auto_now and the save() signals skip for bulk writes
+    """
+    from news.counters import bump_content_version
+    from news.search import INDEXED_FIELDS, index_articles
+
+    now = timezone.now()
+    for article in articles:
+        article.updated_at = now
+    Article.objects.bulk_update(articles, [*fields, 'updated_at'])
+    bump_content_version()
+    if set(fields) & set(INDEXED_FIELDS):
+        index_articles([article.pk for article in articles])
+
+
+class ArticleInteraction(models.Model):
+    """
+    One user's read/saved/feedback state for one article.
+    Sparse: rows exist only for articles the user touched, so the table grows
+    with activity rather than users x articles, and the per-article
+    "read by this user?" probes are single lookups on the unique index.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='interactions')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='interactions')
+    is_read = models.BooleanField(default=False)
+    is_saved = models.BooleanField(default=False)
+    feedback_score = models.SmallIntegerField(default=0)  # -1: Dislike, 0: Neutral, 1: Like
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'], name='unique_article_interaction'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'feedback_score'], name='interaction_feedback'),
+            # API delta sync: the user's state changes since a sync token
+            models.Index(fields=['user', 'updated_at'], name='interaction_updated'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.article_id}: read={self.is_read} saved={self.is_saved} feedback={self.feedback_score}"
+
+
+def user_state_annotations(user):
+    """
+    Annotations giving Article querysets the user's is_read, is_saved and
+    feedback_score, so templates and filters read them like plain fields.
+    """
+    interactions = ArticleInteraction.objects.filter(user=user, article=OuterRef('pk'))
+    return {
+        'is_read': Exists(interactions.filter(is_read=True)),
+        'is_saved': Exists(interactions.filter(is_saved=True)),
+        'feedback_score': Coalesce(Subquery(interactions.values('feedback_score')[:1]), 0),
+    }
+
+
+class Counter(models.Model):
+    """
+    A materialized count such as "articles:category:3" or "user:1:read"
+    (see news.counters). Changed in the same transaction as the rows it
+    counts; the reconcile_counters command repairs any drift.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class IngestEvent(models.Model):
+    """
+    One newly ingested article, appended in the ingest transaction.
+    The dashboard's server-sent event stream (news.events) tails this table
+    by id; fetch_feeds prunes old rows.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.pk}: article {self.article_id} in category {self.category_id}"
+
+
+class CurationTask(models.Model):
+    """
+    Per-article status of a curation pipeline stage (see news.curation).
+    Written in the same transaction as the stage's article updates, so it
+    doubles as the checkpoint an interrupted run resumes from.
+    """
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    STAGES = [
+        ('summarize', 'Summarize'),
+        ('score', 'AI Relevance Score'),
+        ('classify', 'Content Depth'),
+    ]
+
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='curation_tasks')
+    stage = models.CharField(max_length=20, choices=STAGES)
+    status = models.CharField(max_length=10, choices=STATUSES)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=500, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'stage'], name='unique_curation_task'),
+        ]
+        indexes = [
+            models.Index(fields=['stage', 'status'], name='curationtask_stage_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} {self.stage}: {self.status}"
+
+
+class MediaMetadata(models.Model):
+    """
+    Extracted YouTube/podcast metadata, keyed by canonical media ID
+    (see media_service.canonical_media_id) so every URL variant of the same
+    video or episode shares one entry. Stable fields and the view count
+    expire separately (MEDIA_METADATA_TTL_DAYS / MEDIA_VIEW_COUNT_TTL_HOURS).
+    """
+    media_id = models.CharField(max_length=1000, unique=True, help_text="e.g. yt:dQw4w9WgXcQ")
+    title = models.CharField(max_length=500, blank=True)
+    author = models.CharField(max_length=200, blank=True)
+    description = models.TextField(blank=True)
+    thumbnail = models.URLField(max_length=1000, blank=True)
+    duration_seconds = models.IntegerField(null=True, blank=True)
+    view_count = models.IntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField(help_text="When title, author and duration were extracted")
+    view_count_fetched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Media metadata"
+
+    def __str__(self):
+        return self.media_id
+
+
 class UserPreference(models.Model):
     """
     Stores learned preferences for a user based on their feedback.
@@ -94,63 +306,314 @@ class UserPreference(models.Model):
     # Learning metadata
     total_feedback_count = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, help_text="Bumped when scoring inputs change; older article scores are stale")
+    decay_epoch = models.DateTimeField(default=timezone.now, help_text="Time at which a feedback event weighs 1.0 (see _feedback_weight)")
 
 
     def update_from_feedback(self):
         """
-        Analyzes user's feedback history and updates preferences.
-        Called periodically or after N feedbacks.
+        Rebuilds the preference counters and weights from this user's current feedback.
+        Not needed in normal operation (record_feedback keeps them current);
+        use it to seed counters from older feedback or to repair drift.
         """
-        from django.db.models import Count, Q
-
-        # Get all user's articles with feedback
-        liked_articles = Article.objects.filter(feedback_score=1)
-        disliked_articles = Article.objects.filter(feedback_score=-1)
-
-        # Update category preferences
-        category_weights = {}
-        for cat in Category.objects.all():
-            liked_count = liked_articles.filter(source__category=cat).count()
-            disliked_count = disliked_articles.filter(source__category=cat).count()
-            total = liked_count + disliked_count
-            if total > 0:
-                # Weight between -1 and 1
-                weight = (liked_count - disliked_count) / total
-                category_weights[cat.slug] = round(weight, 2)
-
-        self.preferred_categories = category_weights
-
-        # Update source preferences
-        source_weights = {}
-        for source in Source.objects.all():
-            liked_count = liked_articles.filter(source=source).count()
-            disliked_count = disliked_articles.filter(source=source).count()
-            total = liked_count + disliked_count
-            if total > 0:
-                weight = (liked_count - disliked_count) / total
-                source_weights[str(source.id)] = round(weight, 2)
-
-        self.preferred_sources = source_weights
-
-        # Extract keywords from liked articles (simple version)
-        # In production, you'd use NLP/TF-IDF
-        from collections import Counter
-        words = Counter()
-        for article in liked_articles[:50]:  # Sample recent likes
-            title_words = article.title.lower().split()
-            words.update([w for w in title_words if len(w) > 4])  # Filter short words
-
-        # Top 20 keywords
-        top_keywords = [word for word, count in words.most_common(20)]
-        self.interest_keywords = top_keywords
-
-        self.total_feedback_count = liked_articles.count() + disliked_articles.count()
-        self.save()
+        # Reuse the weight each article's latest feedback event contributed,
+        # so later toggles subtract exactly what was added
+        event_weights = {}
+        for article_id, weight in (
+            self.user.feedback_events.order_by('id').values_list('article_id', 'weight')
+        ):
+            event_weights[article_id] = weight
+
+        rated = self.user.interactions.filter(feedback_score__in=[-1, 1]).select_related(
+            'article__source__category'
+        ).only(
+            'feedback_score', 'article__id', 'article__title', 'article__source__id',
+            'article__source__category__slug'
+        )
+
+        totals = defaultdict(lambda: [0.0, 0.0])  # (kind, key) -> [likes, dislikes]
+        feedback_count = 0
+        for interaction in rated.iterator():
+            column = 0 if interaction.feedback_score == 1 else 1
+            weight = event_weights.get(interaction.article_id, 1.0)
+            for counter_key in _counter_keys(interaction.article):
+                totals[counter_key][column] += weight
+            feedback_count += 1
+
+        with transaction.atomic():
+            self.user.preference_counters.all().delete()
+            PreferenceCounter.objects.bulk_create([
+                PreferenceCounter(user=self.user, kind=kind, key=key, likes=likes, dislikes=dislikes)
+                for (kind, key), (likes, dislikes) in totals.items()
+                if likes + dislikes >= COUNTER_EPSILON
+            ], batch_size=500)
+
+            category_weights = {}
+            source_weights = {}
+            for (kind, key), (likes, dislikes) in totals.items():
+                weight = _counter_weight(likes, dislikes)
+                if weight is None:
+                    continue
+                if kind == 'category':
+                    category_weights[key] = weight
+                elif kind == 'source':
+                    source_weights[key] = weight
+
+            self.preferred_categories = category_weights
+            self.preferred_sources = source_weights
+            self.interest_keywords = self._top_keywords()
+            self.total_feedback_count = feedback_count
+            self.save()
+
+    def record_feedback(self, article, previous_score, new_score):
+        """
+        Applies a single feedback change (-1/0/1 -> -1/0/1) incrementally.
+        Appends a FeedbackEvent, adjusts the running counters for the
+        article's category, source and title keywords, and refreshes only
+        the affected preference weights - independent of feedback history size.
+        """
+        if previous_score == new_score:
+            return
+
+        with transaction.atomic():
+            weight = self._feedback_weight(timezone.now())
+            if previous_score:
+                # Undo exactly what the previous feedback on this article added
+                last_event = self.user.feedback_events.filter(
+                    article=article, new_score=previous_score
+                ).order_by('-id').first()
+                self._bump_counters(article, previous_score, -(last_event.weight if last_event else 1.0))
+            if new_score:
+                self._bump_counters(article, new_score, weight)
+
+            FeedbackEvent.objects.create(
+                user=self.user,
+                article=article,
+                previous_score=previous_score,
+                new_score=new_score,
+                weight=weight
+            )
+
+            self._refresh_weights(article)
+            self.total_feedback_count = max(
+                0, self.total_feedback_count + bool(new_score) - bool(previous_score)
+            )
+            self.save()
+
+    def _bump_counters(self, article, score, delta):
+        """Add delta to the like/dislike counters an article contributes to"""
+        field = 'likes' if score == 1 else 'dislikes'
+        keys_by_kind = defaultdict(set)
+        for kind, key in _counter_keys(article):
+            keys_by_kind[kind].add(key)
+
+        for kind, keys in keys_by_kind.items():
+            counters = self.user.preference_counters.filter(kind=kind, key__in=keys)
+            existing = set(counters.values_list('key', flat=True))
+            if existing:
+                # Clamp at zero so feedback given before counters existed can't go negative
+                counters.update(**{field: Greatest(F(field) + delta, Value(0.0))})
+            if delta < 0:
+                # Drop counters left without feedback, as a full rebuild wouldn't create them
+                _prune_counters(counters)
+            if delta > 0:
+                PreferenceCounter.objects.bulk_create([
+                    PreferenceCounter(user=self.user, kind=kind, key=key, **{field: delta})
+                    for key in keys - existing
+                ])
+
+    def _feedback_weight(self, now):
+        """
+        Weight for a feedback event at `now`. With PREFERENCE_HALF_LIFE_DAYS
+        set, newer events weigh exponentially more (equivalent to decaying all
+        older counts), so counters needn't be rewritten on every event. Only
+        once the weight would pass 2 ** DECAY_RESCALE_EXPONENT are this user's
+        counters and event weights scaled down and the epoch moved to now,
+        which keeps every value in float range. Call inside a transaction.
+        """
+        half_life_days = getattr(settings, 'PREFERENCE_HALF_LIFE_DAYS', None)
+        if not half_life_days:
+            return 1.0
+        exponent = (now - self.decay_epoch).total_seconds() / (half_life_days * 86400)
+        if exponent > DECAY_RESCALE_EXPONENT:
+            # Underflows to 0.0 (not an error) after a very long gap
+            factor = 2.0 ** -exponent
+            counters = self.user.preference_counters.all()
+            counters.update(likes=F('likes') * factor, dislikes=F('dislikes') * factor)
+            _prune_counters(counters)
+            self.user.feedback_events.update(weight=F('weight') * factor)
+            # Scaling keeps like/dislike ratios, so only weights of pruned counters change
+            remaining = set(counters.filter(kind__in=['category', 'source']).values_list('kind', 'key'))
+            self.preferred_categories = {
+                key: weight for key, weight in self.preferred_categories.items() if ('category', key) in remaining
+            }
+            self.preferred_sources = {
+                key: weight for key, weight in self.preferred_sources.items() if ('source', key) in remaining
+            }
+            self.decay_epoch = now
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def _refresh_weights(self, article):
+        """Recompute the category/source weights and keywords touched by an article"""
+        category_slug = article.source.category.slug if article.source and article.source.category else None
+        source_id = str(article.source_id)
+
+        counters = {
+            (counter.kind, counter.key): counter
+            for counter in self.user.preference_counters.filter(
+                Q(kind='category', key=category_slug) | Q(kind='source', key=source_id)
+            )
+        }
+        for kind, key, weights in (
+            ('category', category_slug, self.preferred_categories),
+            ('source', source_id, self.preferred_sources),
+        ):
+            counter = counters.get((kind, key))
+            weight = _counter_weight(counter.likes, counter.dislikes) if counter else None
+            if weight is None:
+                weights.pop(key, None)
+            else:
+                weights[key] = weight
+
+        self.interest_keywords = self._top_keywords()
+
+    def _top_keywords(self, limit=20):
+        return list(
+            self.user.preference_counters.filter(kind='keyword', likes__gt=0)
+            .order_by('-likes', 'key')
+            .values_list('key', flat=True)[:limit]
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & SCORING_FIELDS:
+            instance._scoring_snapshot = instance._scoring_state()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if not self.get_deferred_fields() & SCORING_FIELDS:
+            self._scoring_snapshot = self._scoring_state()
+
+    def _scoring_state(self):
+        """What article scores depend on, with weights bucketed by PREFERENCE_VERSION_STEP"""
+        return (
+            {key: round(weight / PREFERENCE_VERSION_STEP) for key, weight in self.preferred_categories.items()},
+            {key: round(weight / PREFERENCE_VERSION_STEP) for key, weight in self.preferred_sources.items()},
+            frozenset(self.interest_keywords),
+            self.preferred_content_depth,
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Bump the version when articles scored under the loaded preferences are
+        stale: a weight moved into another PREFERENCE_VERSION_STEP bucket or
+        appeared/disappeared, the keywords or the content depth changed. Other
+        saves (feedback counts, small weight moves) keep existing scores.
+        """
+        state = self._scoring_state()
+        if self.pk and state != getattr(self, '_scoring_snapshot', None):
+            self.version += 1
+        super().save(*args, **kwargs)
+        self._scoring_snapshot = state
 
     def __str__(self):
         return f"Preferences for {self.user.username}"
 
 
+# Fields article scores are computed from (see UserPreference.save)
+SCORING_FIELDS = {'preferred_categories', 'preferred_sources', 'interest_keywords', 'preferred_content_depth'}
+
+# Width of the weight buckets whose crossing makes article scores stale; bucketing
+# (rather than a per-save delta) still catches many small moves adding up
+PREFERENCE_VERSION_STEP = 0.1
+
+# Time-decayed feedback weights are rescaled past 2 ** this (see UserPreference._feedback_weight)
+DECAY_RESCALE_EXPONENT = 20
+
+# Counter totals below this count as no feedback
+COUNTER_EPSILON = 1e-6
+
+
+def _prune_counters(counters):
+    """Delete the counters in a queryset whose likes and dislikes are (about) zero"""
+    counters.alias(total=F('likes') + F('dislikes')).filter(total__lt=COUNTER_EPSILON).delete()
+
+
+def _counter_weight(likes, dislikes):
+    """Preference weight between -1 and 1, or None without (non-negligible) feedback"""
+    total = likes + dislikes
+    if total < COUNTER_EPSILON:
+        return None
+    return round((likes - dislikes) / total, 2)
+
+
+def _counter_keys(article):
+    """(kind, key) pairs of the preference counters an article contributes to"""
+    if article.source_id:
+        yield ('source', str(article.source_id))
+        if article.source.category_id:
+            yield ('category', article.source.category.slug)
+    # Simple keyword extraction from the title
+    # In production, you'd use NLP/TF-IDF
+    for word in set(article.title.lower().split()):
+        if len(word) > 4:  # Filter short words
+            yield ('keyword', word[:200])
+
+
+class FeedbackEvent(models.Model):
+    """
+    Append-only log of feedback changes.
+    Each row records one like/dislike click and the weight it added to the counters.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feedback_events')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='feedback_events')
+    previous_score = models.IntegerField()
+    new_score = models.IntegerField()
+    weight = models.FloatField(default=1.0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'article'], name='feedbackevent_user_article'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.previous_score} -> {self.new_score} on {self.article_id}"
+
+
+class PreferenceCounter(models.Model):
+    """
+    Running like/dislike totals per category, source or keyword for a user.
+    Maintained incrementally by UserPreference.record_feedback.
+    """
+    KINDS = [
+        ('category', 'Category'),
+        ('source', 'Source'),
+        ('keyword', 'Keyword'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='preference_counters')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    key = models.CharField(max_length=200)
+    likes = models.FloatField(default=0.0)
+    dislikes = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'key'], name='unique_preference_counter'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind', '-likes'], name='prefcounter_top_likes'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key} (+{self.likes:g}/-{self.dislikes:g})"
+
+
 class ReadingContext(models.Model):
     """
     Stores different reading contexts/moods that user can switch between.
@@ -196,6 +659,15 @@ class ReadingContext(models.Model):
                 'trend_weight': f'Scoring weights must sum to 1.0 (currently {total_weight:.2f})',
             })
 
+    def scoring_weights(self):
+        """Return this context's weights, keyed like DEFAULT_SCORING_WEIGHTS"""
+        return {
+            'relevance': self.relevance_weight,
+            'personalization': self.personalization_weight,
+            'serendipity': self.serendipity_weight,
+            'trend': self.trend_weight,
+        }
+
     def save(self, *args, **kwargs):
         """Override save to call clean() for validation"""
         self.full_clean()
@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination for ranked article lists.
+
+Pages continue after the last row's (final_score, pub_date, id) sort key
+instead of an OFFSET, and "is there a next page" comes from fetching one extra
+row instead of a COUNT(*), so every page costs the same however deep the
+infinite scroll goes. The API's delta sync (api_views.list_articles) pages
+the same way by id, with its position in an encode_token token.
+"""
+import json
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_token(value):
+    """Opaque URL-safe token for a JSON-serializable value"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """The value in an encode_token token; raises ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid token: {token}") from e
+
+
+def encode_cursor(article):
+    """Opaque cursor for the position just after this (annotated) article"""
+    return encode_token([article.final_score, article.pub_date.isoformat(), article.pk])
+
+
+def decode_cursor(cursor):
+    """(final_score, pub_date, id) from a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        score, pub_date, pk = decode_token(cursor)
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None:
+            return None
+        return float(score), pub_date, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class CursorPage:
+    """
+    One page of a queryset ranked by news.views._rank_articles
+    (final_score, pub_date and id, all descending).
+    Iterates like a Paginator page; `next_cursor` is None on the last page.
+    """
+
+    def __init__(self, queryset, cursor=None, per_page=20):
+        key = decode_cursor(cursor)
+        if key:
+            score, pub_date, pk = key
+            queryset = queryset.filter(
+                Q(final_score__lt=score) |
+                Q(final_score=score, pub_date__lt=pub_date) |
+                Q(final_score=score, pub_date=pub_date, pk__lt=pk)
+            )
+
+        rows = list(queryset[:per_page + 1])
+        self.object_list = rows[:per_page]
+        self.has_next = len(rows) > per_page
+        self.next_cursor = encode_cursor(self.object_list[-1]) if self.has_next else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
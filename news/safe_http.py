@@ -0,0 +1,97 @@
+"""
+HTTP sessions that only connect to public addresses.
+
+Feeds hand us arbitrary URLs (article images, podcast enclosures), so fetching
+them must not reach internal services. The check runs inside the transport,
+when a connection is opened: the host name is resolved once, every address is
+vetted, and the socket connects to the vetted address. Checking with a
+separate lookup beforehand would leave a DNS-rebinding gap, as the connection
+resolves the name again. Every redirect hop opens its connection here too.
+"""
+import socket
+import ipaddress
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+
+def is_public_address(address):
+    """True for globally routable IP addresses (no loopback, private, link-local...)"""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:  # e.g. scoped IPv6 addresses
+        return False
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+def public_address(host, port):
+    """
+    Resolve host and return an address to connect to, or None if any of its
+    addresses isn't public. Raises socket.gaierror if it doesn't resolve.
+    """
+    addresses = [info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        return None
+    return addresses[0]
+
+
+class _PublicAddressMixin:
+    def _new_conn(self):
+        try:
+            address = public_address(self._dns_host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        if address is None:
+            raise NewConnectionError(self, f"Refusing to connect to {self.host}: not a public address")
+
+        # Connect to the vetted address; TLS still verifies against self.host
+        host, self._dns_host = self._dns_host, address
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+
+class PublicHTTPConnection(_PublicAddressMixin, HTTPConnection):
+    pass
+
+
+class PublicHTTPSConnection(_PublicAddressMixin, HTTPSConnection):
+    pass
+
+
+class PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = PublicHTTPConnection
+
+
+class PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = PublicHTTPSConnection
+
+
+class PublicAddressAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': PublicHTTPConnectionPool,
+            'https': PublicHTTPSConnectionPool,
+        }
+
+
+def public_session(max_redirects=5):
+    """
+    A requests session restricted to public addresses. Blocked connections
+    raise requests.ConnectionError. Environment proxies are ignored, as the
+    proxy (not the target) would be the vetted connection.
+    """
+    session = requests.Session()
+    session.trust_env = False
+    session.max_redirects = max_redirects
+    adapter = PublicAddressAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,206 @@
+"""
+Full-text article search on an SQLite FTS5 index.
+
+news_article_fts holds a plain-text copy of each article's title,
+description (HTML stripped), AI summary and author, keyed by article id.
+Triggers can't strip HTML, so the index is kept in sync from Python: on
+Article save/delete (signal handlers connected in NewsConfig.ready) and from
+bulk_update_articles. rebuild_search_index repopulates it from scratch.
+
+Results are ranked with BM25 (title and summary weighted above body text)
+and come with highlighted snippets. Other databases have no FTS5, so search
+is disabled there (search_enabled()).
+"""
+import re
+import html
+import logging
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from news.models import Article
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'news_article_fts'
+INDEXED_FIELDS = ('title', 'description', 'ai_summary', 'author')
+
+# BM25 column weights, in INDEXED_FIELDS order; stored as the table's rank function
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+# Snippet markers: control characters that never occur in indexed text,
+# so snippets can be escaped before the markers become <mark> tags
+MATCH_START, MATCH_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(INDEXED_FIELDS)}, tokenize='porter unicode61 remove_diacritics 2')"
+)
+RANK_SQL = f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25({', '.join(map(str, COLUMN_WEIGHTS))})')"
+
+
+def search_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def plain_text(value):
+    """Indexable text: tags stripped, entities decoded, whitespace collapsed"""
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+def fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, quoted so
+    FTS syntax in the input is inert. No prefix terms: the porter stemmer
+    already matches word variants, and prefix expansion is what makes FTS
+    queries slow on a large index.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def index_articles(article_ids):
+    """(Re)index the given articles from their current rows"""
+    article_ids = list(article_ids)
+    if not search_enabled() or not article_ids:
+        return
+    rows = Article.objects.filter(pk__in=article_ids).values_list('id', *INDEXED_FIELDS)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in article_ids])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) VALUES (%s, %s, %s, %s, %s)",
+            [(pk, *(plain_text(value) for value in values)) for pk, *values in rows]
+        )
+
+
+def unindex_articles(article_ids):
+    if search_enabled():
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in article_ids])
+
+
+def rebuild_index(batch_size=1000, progress=None):
+    """Empty and repopulate the whole index. Returns the number of indexed articles."""
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(RANK_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    ids = Article.objects.order_by('id').values_list('id', flat=True)
+    total = 0
+    batch = []
+    for article_id in ids.iterator(chunk_size=batch_size):
+        batch.append(article_id)
+        if len(batch) >= batch_size:
+            index_articles(batch)
+            total += len(batch)
+            batch = []
+            if progress:
+                progress(total)
+    index_articles(batch)
+    total += len(batch)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _parse_bound(value, end_of_day=False):
+    """A datetime from an ISO date or datetime string (dates cover the whole day)"""
+    if not value or isinstance(value, datetime):
+        return value
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def search(text, category=None, source=None, since=None, until=None, limit=20, offset=0):
+    """
+    Best BM25 matches for free text, optionally filtered by category slug,
+    source id and publication date range (ISO dates or datetimes).
+    Returns [(article_id, rank, snippet_html)], best first; raises ValueError
+    for an invalid source or date bound.
+    """
+    query = fts_query(text)
+    if not query or not search_enabled():
+        return []
+
+    conditions = [f"{FTS_TABLE} MATCH %s"]
+    params = [query]
+    if category:
+        conditions.append("c.slug = %s")
+        params.append(category)
+    if source:
+        if not str(source).isdigit():
+            raise ValueError(f"Invalid source: {source}")
+        conditions.append("a.source_id = %s")
+        params.append(int(source))
+    if since:
+        conditions.append("a.pub_date >= %s")
+        params.append(_parse_bound(since))
+    if until:
+        conditions.append("a.pub_date <= %s")
+        params.append(_parse_bound(until, end_of_day=True))
+
+    sql = f"""
+        SELECT f.rowid, f.rank, snippet({FTS_TABLE}, -1, %s, %s, '…', {SNIPPET_TOKENS})
+        FROM {FTS_TABLE} f
+        JOIN news_article a ON a.id = f.rowid
+        JOIN news_source s ON s.id = a.source_id
+        JOIN news_category c ON c.id = s.category_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY f.rank
+        LIMIT %s OFFSET %s
+    """
+    # SQLite stores datetimes as UTC text
+    params = [connection.ops.adapt_datetimefield_value(param) if isinstance(param, datetime) else param
+              for param in params]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MATCH_START, MATCH_END, *params, limit, offset])
+        return [(article_id, rank, highlight(snippet)) for article_id, rank, snippet in cursor.fetchall()]
+
+
+def highlight(snippet):
+    """Escape a raw FTS snippet and turn its match markers into <mark> tags"""
+    return mark_safe(escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def search_articles(queryset, text, **filters):
+    """
+    The matching articles from a queryset, in rank order, each with
+    search_rank and search_snippet set.
+    """
+    hits = search(text, **filters)
+    articles = queryset.in_bulk([article_id for article_id, _, _ in hits])
+    results = []
+    for article_id, rank, snippet in hits:
+        article = articles.get(article_id)
+        if article is not None:
+            article.search_rank = rank
+            article.search_snippet = snippet
+            results.append(article)
+    return results
+
+
+@receiver(post_save, sender=Article)
+def index_saved_article(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or set(update_fields) & set(INDEXED_FIELDS)):
+        index_articles([instance.pk])
+
+
+@receiver(post_delete, sender=Article)
+def unindex_deleted_article(sender, instance, **kwargs):
+    unindex_articles([instance.pk])
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Article, Source, Category
+from .media_service import parse_duration
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,10 +28,27 @@ class SourceSerializer(serializers.ModelSerializer):
             validated_data['category'] = category
         return super().create(validated_data)
 
+class SourceStatsSerializer(SourceSerializer):
+    """
+    A source with its counts and fetch health, from a queryset annotated by
+    api_views.list_sources.
+    """
+    article_count = serializers.IntegerField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+    items_per_day = serializers.FloatField(read_only=True)
+
+    class Meta(SourceSerializer.Meta):
+        fields = SourceSerializer.Meta.fields + [
+            'article_count', 'unread_count', 'items_per_day',
+            'last_fetch_at', 'last_success_at', 'last_fetch_latency_ms', 'consecutive_failures', 'last_error',
+        ]
+        read_only_fields = ['last_fetch_at', 'last_success_at', 'last_fetch_latency_ms', 'consecutive_failures', 'last_error']
+
 class ArticleIngestSerializer(serializers.Serializer):
     """
     Serializer for ingesting articles from FreshRSS via n8n.
-    Accepts flexible field names from FreshRSS.
+    Accepts flexible field names from FreshRSS, plus optional media metadata
+    (duration, author, view_count) taken from the feed entry.
     """
     # Required fields
     title = serializers.CharField(max_length=500)
@@ -46,6 +64,12 @@ class ArticleIngestSerializer(serializers.Serializer):
     image_url = serializers.URLField(max_length=1000, required=False, allow_blank=True)
     thumbnail = serializers.URLField(max_length=1000, required=False, allow_blank=True)
 
+    # Media metadata from feed extensions (itunes:duration, itunes:author, media:statistics)
+    duration = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    author = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    view_count = serializers.IntegerField(required=False, min_value=0)
+    enclosure_url = serializers.URLField(max_length=1000, required=False, allow_blank=True)
+
     # Source information
     source_name = serializers.CharField(max_length=200, required=False)
     source_url = serializers.URLField(required=False)
@@ -80,6 +104,12 @@ class ArticleIngestSerializer(serializers.Serializer):
         if not data.get('image_url') and data.get('thumbnail'):
             data['image_url'] = data['thumbnail']
 
+        # Accept durations as seconds or HH:MM:SS, like itunes:duration
+        if 'duration' in data:
+            duration_seconds = parse_duration(data.pop('duration'))
+            if duration_seconds:
+                data['duration_seconds'] = duration_seconds
+
         return data
 
     def create(self, validated_data):
@@ -131,8 +161,8 @@ class ArticleIngestSerializer(serializers.Serializer):
             }
         )
 
-        # Auto-enrich YouTube/Podcast articles with metadata
-        if source_type in ['yt', 'podcast'] and created:
+        # Auto-enrich YouTube/Podcast articles the feed didn't give a duration for
+        if source_type in ['yt', 'podcast'] and created and not article.duration_seconds:
             try:
                 enrich_article_with_metadata(article)
             except Exception as e:
@@ -142,12 +172,26 @@ class ArticleIngestSerializer(serializers.Serializer):
         return article
 
 class ArticleSerializer(serializers.ModelSerializer):
+    """
+    Read representation of an article. Pass `fields` to return only those
+    (the API's fields= projection).
+    """
     source = SourceSerializer(read_only=True)
+    # Per-user state, present when the queryset is annotated with user_state_annotations
+    is_read = serializers.BooleanField(read_only=True, default=False)
+    is_saved = serializers.BooleanField(read_only=True, default=False)
+    feedback_score = serializers.IntegerField(read_only=True, default=0)
 
     class Meta:
         model = Article
         fields = [
             'id', 'source', 'title', 'link', 'description',
             'pub_date', 'image_url', 'ai_summary', 'relevance_score',
-            'is_read', 'is_saved', 'feedback_score', 'created_at'
+            'is_read', 'is_saved', 'feedback_score', 'created_at', 'updated_at'
         ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -1,5 +1,8 @@
 from django import template
 from django.contrib.humanize.templatetags.humanize import intcomma
+from django.urls import reverse
+
+from news.thumbnails import thumbnails_enabled
 
 register = template.Library()
 
@@ -44,3 +47,18 @@ def score_bar_width(score):
     Return width percentage for score visualization.
     """
     return f"{max(0, min(100, score))}%"
+
+
+@register.simple_tag
+def thumbnail_url(article, variant='card'):
+    """
+    Local resized thumbnail for an article image (see news.thumbnails).
+    Versioned with the image hash once known, so browsers cache it indefinitely.
+    Falls back to the original image_url when Pillow isn't installed.
+    """
+    if not article.image_url:
+        return ''
+    if not thumbnails_enabled():
+        return article.image_url
+    url = reverse('news:article_thumbnail', args=[article.id, variant])
+    return f'{url}?v={article.image_hash}' if article.image_hash else url
@@ -1,3 +1,1940 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlparse
+
+import feedparser
+import requests
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.functions import Length
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from news import ai_service, audio_probe, counters, events
+from news.audio_probe import probe_audio_duration
+from news.media_service import (
+    canonical_media_id,
+    enrich_article_with_metadata,
+    extract_feed_entry_metadata,
+    extract_podcast_metadata,
+    extract_youtube_metadata,
+    extract_youtube_metadata_batch,
+    get_cached_metadata,
+    parse_duration,
+    store_cached_metadata,
+    HostThrottle
+)
+from news.models import (
+    Article, ArticleInteraction, Category, Counter, CurationTask, FeedbackEvent, IngestEvent, MediaMetadata, PreferenceCounter,
+    ReadingContext, Source, UserPreference, bulk_update_articles
+)
+from news.curation import (
+    CurationPipeline, STAGES, chunk_page, iter_chunks, pending_for, personalize_backlog, personalize_slices
+)
+from news.curation_benchmark import SimulatedModel, compare_to_baseline, create_synthetic_articles
+from news.keyword_matcher import KeywordMatcher, get_keyword_matcher
+from news.safe_http import is_public_address, public_session
+from news.search import rebuild_index, search
+from news.pagination import CursorPage, encode_token
+from news.thumbnails import build_thumbnails, thumbnails_enabled
+from news.views import _mark_read, _rank_articles, _set_feedback, _user_articles
+
+
+# --- Audio fixtures -------------------------------------------------------
+
+def mp3_frame_header(bitrate_index=9, sample_rate_index=0, mono=False):
+    """MPEG-1 Layer III frame header (128 kbps / 44.1 kHz by default)"""
+    return bytes([0xFF, 0xFB, (bitrate_index << 4) | (sample_rate_index << 2), 0xC0 if mono else 0x00])
+
+
+def mp3_frame(payload=b''):
+    """One 128 kbps / 44.1 kHz frame (417 bytes) with optional payload after the header"""
+    frame = mp3_frame_header() + payload
+    return frame + b'\x00' * (417 - len(frame))
+
+
+def mp3_xing(frames, padding_frames=400):
+    side_info = b'\x00' * 32
+    return mp3_frame(side_info + b'Xing' + struct.pack('>II', 0x01, frames)) + mp3_frame() * padding_frames
+
+
+def mp3_vbri(frames, padding_frames=400):
+    vbri = b'VBRI' + struct.pack('>HHHII', 1, 0, 75, 1000000, frames)
+    return mp3_frame(b'\x00' * 32 + vbri) + mp3_frame() * padding_frames
+
+
+def syncsafe(value):
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def id3_tag(tlen_ms=None, cover_art_bytes=0):
+    """ID3v2.4 tag with an optional TLEN frame and a (large) APIC frame"""
+    frames = b''
+    if tlen_ms is not None:
+        body = b'\x00' + str(tlen_ms).encode()
+        frames += b'TLEN' + syncsafe(len(body)) + b'\x00\x00' + body
+    if cover_art_bytes:
+        body = b'\x00image/jpeg\x00\x03\x00' + b'\xAB' * cover_art_bytes
+        frames += b'APIC' + syncsafe(len(body)) + b'\x00\x00' + body
+    return b'ID3\x04\x00\x00' + syncsafe(len(frames)) + frames
+
+
+def mp4_box(box_type, payload):
+    return struct.pack('>I', 8 + len(payload)) + box_type + payload
+
+
+def mp4_file(timescale, duration, moov_at_end=True, mdat_bytes=300000, version=0):
+    if version == 1:
+        mvhd = bytes([1, 0, 0, 0]) + struct.pack('>QQIQ', 0, 0, timescale, duration) + b'\x00' * 80
+    else:
+        mvhd = bytes([0, 0, 0, 0]) + struct.pack('>IIII', 0, 0, timescale, duration) + b'\x00' * 80
+    ftyp = mp4_box(b'ftyp', b'M4A \x00\x00\x00\x00M4A isom')
+    moov = mp4_box(b'moov', mp4_box(b'mvhd', mvhd))
+    mdat = mp4_box(b'mdat', b'\x00' * mdat_bytes)
+    return ftyp + mdat + moov if moov_at_end else ftyp + moov + mdat
+
+
+# --- Local HTTP stand-in ----------------------------------------------------
+
+class AudioHandler(BaseHTTPRequestHandler):
+    """Serves fixture bytes by path, honoring Range unless the path starts with /norange/"""
+
+    def do_GET(self):
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        start, end = 0, len(data) - 1
+        match = re.match(r'bytes=(\d*)-(\d*)$', self.headers.get('Range', ''))
+        if match and not self.path.startswith('/norange/'):
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), end) if last else end
+            else:
+                start = max(0, len(data) - int(last))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            self.send_response(200)
+
+        body = data[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            for offset in range(0, len(body), 8192):
+                self.wfile.write(body[offset:offset + 8192])
+                self.server.bytes_sent += min(8192, len(body) - offset)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client stopped reading, as intended for servers without Range support
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def matches(self, keywords, text):
+        matcher = KeywordMatcher(keywords)
+        return sorted(matcher.keywords[index] for index in matcher.find(text))
+
+    def test_whole_words_and_phrases_only(self):
+        self.assertEqual(self.matches(['ai', 'machine learning'], 'AI: Machine-learning, said the paint maker'),
+                         ['ai', 'machine learning'])
+        self.assertEqual(self.matches(['ai', 'learn'], 'She said machine learning is plain'), [])
+
+    def test_overlapping_patterns(self):
+        self.assertEqual(self.matches(['new york', 'york', 'new york times', 'times square'], 'The New York Times'),
+                         ['new york', 'new york times', 'york'])
+
+    def test_accents_and_case_fold(self):
+        self.assertEqual(self.matches(['café', 'Zürich'], 'CAFE culture in zurich'), ['cafe', 'zurich'])
+
+    def test_language_names_keep_their_symbols(self):
+        self.assertEqual(self.matches(['c', 'c++', 'c#'], 'Rewriting C++ in C#'), ['c#', 'c++'])
+        self.assertEqual(self.matches(['c++'], 'Plain C is fine'), [])
+
+    def test_duplicates_and_blanks_collapse(self):
+        matcher = KeywordMatcher(['AI', ' ai ', 'Ai!', '', '---'])
+        self.assertEqual(matcher.keywords, ['ai'])
+        # Distinct keywords across all texts, not occurrences
+        self.assertEqual(KeywordMatcher(['ai', 'robots']).count('AI and AI', 'ai robots', None), 2)
+
+    def test_matcher_is_compiled_once_per_preference_version(self):
+        prefs = UserPreference(pk=1, interest_keywords=['ai'], version=1)
+        matcher = get_keyword_matcher(prefs)
+        self.assertIs(get_keyword_matcher(prefs), matcher)
+        prefs.interest_keywords, prefs.version = ['robots'], 2
+        self.assertEqual(get_keyword_matcher(prefs).keywords, ['robots'])
+
+
+class LocalServerTestCase(SimpleTestCase):
+    """Runs an AudioHandler server on 127.0.0.1 for the test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), AudioHandler)
+        cls.server.files = {}
+        cls.server.bytes_sent = 0
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+
+class SafeHttpTests(LocalServerTestCase):
+    def test_address_classification(self):
+        self.assertTrue(is_public_address('93.184.216.34'))
+        for address in ['127.0.0.1', '10.1.2.3', '169.254.169.254', '::1', '::ffff:127.0.0.1', 'fe80::1%eth0']:
+            self.assertFalse(is_public_address(address), address)
+
+    def test_private_addresses_are_refused_at_connect_time(self):
+        port = self.server.server_address[1]
+        self.server.files['/secret'] = b'internal'
+        with public_session() as session:
+            with self.assertRaisesRegex(requests.ConnectionError, 'not a public address'):
+                session.get(f'http://127.0.0.1:{port}/secret')
+            # A name that resolves to a private address is refused the same way
+            local = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))]
+            with mock.patch('news.safe_http.socket.getaddrinfo', return_value=local):
+                with self.assertRaisesRegex(requests.ConnectionError, 'not a public address'):
+                    session.get(f'http://feed.test:{port}/secret')
+
+    def test_connects_to_the_vetted_address(self):
+        port = self.server.server_address[1]
+        self.server.files['/image'] = b'data'
+        vetted = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))]
+        # The name is only resolved by the guard: the connection uses its answer
+        with mock.patch('news.safe_http.socket.getaddrinfo', return_value=vetted) as resolve, \
+                mock.patch('news.safe_http.is_public_address', return_value=True), public_session() as session:
+            self.assertEqual(session.get(f'http://feed.test:{port}/image').content, b'data')
+        self.assertEqual(resolve.call_args_list[0].args[:2], ('feed.test', port))
+
+
+class AudioProbeTests(LocalServerTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The fixture server is on loopback, which the probe otherwise refuses
+        cls.allow_loopback = mock.patch('news.safe_http.is_public_address', return_value=True)
+        cls.allow_loopback.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.allow_loopback.stop()
+        super().tearDownClass()
+
+    def serve(self, path, data):
+        self.server.files[path] = data
+        self.server.bytes_sent = 0
+        return f'http://127.0.0.1:{self.server.server_address[1]}{path}'
+
+    def test_mp3_xing_frame_count(self):
+        url = self.serve('/xing.mp3', mp3_xing(frames=10000))
+        # 10000 frames * 1152 samples / 44100 Hz
+        self.assertEqual(probe_audio_duration(url), 261)
+
+    def test_mp3_vbri_frame_count(self):
+        url = self.serve('/vbri.mp3', mp3_vbri(frames=5000))
+        self.assertEqual(probe_audio_duration(url), 131)
+
+    def test_mp3_id3_tlen(self):
+        url = self.serve('/tlen.mp3', id3_tag(tlen_ms=2723500) + mp3_frame() * 400)
+        self.assertEqual(probe_audio_duration(url), 2724)
+
+    def test_xing_after_large_cover_art(self):
+        data = id3_tag(cover_art_bytes=200000) + mp3_xing(frames=20000, padding_frames=100)
+        url = self.serve('/cover.mp3', data)
+        self.assertEqual(probe_audio_duration(url), 522)
+        self.assertLess(self.server.bytes_sent, 100000)
+
+    def test_mp3_cbr_estimate_from_size(self):
+        # 60 seconds at 128 kbps, no VBR header or TLEN
+        audio = mp3_frame() * 2300
+        audio += b'\x00' * (960000 - len(audio))
+        url = self.serve('/cbr.mp3', id3_tag() + audio)
+        self.assertEqual(probe_audio_duration(url), 60)
+
+    def test_mp4_moov_at_start(self):
+        url = self.serve('/start.m4a', mp4_file(44100, 44100 * 1800, moov_at_end=False))
+        self.assertEqual(probe_audio_duration(url), 1800)
+
+    def test_mp4_moov_at_end_reads_only_head_and_tail(self):
+        data = mp4_file(1000, 3725250, moov_at_end=True, mdat_bytes=1000000, version=1)
+        url = self.serve('/end.m4a', data)
+        self.assertEqual(probe_audio_duration(url), 3725)
+        self.assertLessEqual(self.server.bytes_sent, audio_probe.HEAD_BYTES + audio_probe.TAIL_BYTES)
+
+    def test_server_without_range_support_is_not_downloaded(self):
+        audio = mp3_frame() * 2300
+        audio += b'\x00' * (960000 - len(audio))
+        url = self.serve('/norange/cbr.mp3', audio)
+        self.assertEqual(probe_audio_duration(url), 60)
+
+    def test_unparseable_or_missing_audio(self):
+        self.assertIsNone(probe_audio_duration(self.serve('/noise.mp3', b'\x01' * 5000)))
+        self.assertIsNone(probe_audio_duration(self.serve('/noise.mp3', b'').replace('noise', 'missing')))
+        self.assertIsNone(probe_audio_duration('file:///etc/passwd'))
+
+    def test_podcast_metadata_prefers_probed_enclosure(self):
+        url = self.serve('/episode.mp3', mp3_xing(frames=10000))
+        metadata = extract_podcast_metadata('https://example.com/episode/1', 'Runtime 99:00', enclosure_url=url)
+        self.assertEqual(metadata['duration_seconds'], 261)
+
+
+class MediaMetadataCacheTests(TestCase):
+    def test_youtube_url_variants_share_an_id(self):
+        variants = [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://youtu.be/dQw4w9WgXcQ?si=abc123',
+            'https://m.youtube.com/watch?v=dQw4w9WgXcQ&feature=share&t=42',
+            'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+            'https://www.youtube.com/embed/dQw4w9WgXcQ',
+        ]
+        self.assertEqual({canonical_media_id(url) for url in variants}, {'yt:dQw4w9WgXcQ'})
+        self.assertIsNone(canonical_media_id('https://www.youtube.com/@somechannel'))
+
+    def test_episode_urls_drop_tracking(self):
+        self.assertEqual(
+            canonical_media_id('https://dts.podtrac.com/redirect.mp3/Traffic.Libsyn.com/show/ep1.mp3?utm_source=rss&key=1'),
+            canonical_media_id('http://traffic.libsyn.com/show/ep1.mp3?key=1#t=10'),
+        )
+
+    def test_view_count_expires_before_stable_fields(self):
+        store_cached_metadata({'yt:dQw4w9WgXcQ': {'title': 'Video', 'duration_seconds': 212, 'view_count': 1000}})
+        MediaMetadata.objects.update(view_count_fetched_at=timezone.now() - timedelta(days=2))
+        cached = get_cached_metadata(['yt:dQw4w9WgXcQ'])['yt:dQw4w9WgXcQ']
+        self.assertEqual(cached['duration_seconds'], 212)
+        self.assertIsNone(cached['view_count'])
+        self.assertTrue(cached['view_count_expired'])
+
+        MediaMetadata.objects.update(fetched_at=timezone.now() - timedelta(days=365))
+        self.assertEqual(get_cached_metadata(['yt:dQw4w9WgXcQ']), {})
+
+    def test_enrich_uses_cache_before_extracting(self):
+        category = Category.objects.create(name='Video', slug='video')
+        source = Source.objects.create(
+            name='Channel', url='https://example.com/feed', source_type='yt', category=category
+        )
+        first = Article.objects.create(
+            source=source, title='a', link='https://youtu.be/dQw4w9WgXcQ', guid='a', pub_date=timezone.now()
+        )
+        second = Article.objects.create(
+            source=source, title='b', link='https://m.youtube.com/watch?v=dQw4w9WgXcQ&utm_source=x', guid='b',
+            pub_date=timezone.now()
+        )
+        metadata = {'title': 'Video', 'author': 'Rick', 'duration_seconds': 212, 'view_count': 10}
+
+        with mock.patch('news.media_service.extract_youtube_metadata', return_value=metadata) as extract:
+            self.assertTrue(enrich_article_with_metadata(first))
+            self.assertTrue(enrich_article_with_metadata(second))
+
+        extract.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+        second.refresh_from_db()
+        self.assertEqual((second.duration_seconds, second.author, second.view_count), (212, 'Rick', 10))
+
+    def test_expired_view_count_is_looked_up_again(self):
+        category = Category.objects.create(name='Video', slug='video')
+        source = Source.objects.create(
+            name='Channel', url='https://example.com/feed', source_type='yt', category=category
+        )
+        article = Article.objects.create(
+            source=source, title='a', link='https://youtu.be/dQw4w9WgXcQ', guid='a', pub_date=timezone.now(),
+            view_count=500
+        )
+        store_cached_metadata({'yt:dQw4w9WgXcQ': {'title': 'Video', 'duration_seconds': 212, 'view_count': 400}})
+        MediaMetadata.objects.update(view_count_fetched_at=timezone.now() - timedelta(days=2))
+
+        # A failed lookup falls back on the cached fields and leaves the article's count alone
+        with mock.patch('news.media_service._extract_info', return_value=None) as extract_info:
+            call_command('enrich_media', all=True, host_delay=0, stdout=io.StringIO())
+        extract_info.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+        article.refresh_from_db()
+        self.assertEqual((article.duration_seconds, article.view_count), (212, 500))
+
+        article.duration_seconds = None
+        article.save()
+        with mock.patch('news.media_service._extract_info', return_value={'duration': 212, 'view_count': 900}):
+            call_command('enrich_media', all=True, host_delay=0, stdout=io.StringIO())
+        article.refresh_from_db()
+        self.assertEqual(article.view_count, 900)
+        self.assertFalse(get_cached_metadata(['yt:dQw4w9WgXcQ'])['yt:dQw4w9WgXcQ']['view_count_expired'])
+
+
+class YoutubeExtractionTests(SimpleTestCase):
+    URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+    def test_hung_extractions_do_not_queue_more_work(self):
+        release = threading.Event()
+        calls = []
+
+        def extract_info(url):
+            calls.append(url)
+            release.wait(5)
+            return {'duration': 212, 'uploader': 'Rick', 'title': 'Video'}
+
+        with mock.patch('news.media_service._extract_info', side_effect=extract_info), \
+                mock.patch('news.media_service._extract_slots', threading.BoundedSemaphore(1)), \
+                mock.patch('news.media_service.YTDLP_TIMEOUT', 0.2), \
+                self.assertLogs('news.media_service', 'ERROR') as logs:
+            self.assertIsNone(extract_youtube_metadata(self.URL))
+            # The hung extraction still holds the only worker slot
+            self.assertIsNone(extract_youtube_metadata(self.URL))
+            self.assertEqual(len(calls), 1)
+
+            release.set()
+            metadata = extract_youtube_metadata(self.URL)
+
+        self.assertEqual((metadata['duration_seconds'], metadata['author']), (212, 'Rick'))
+        self.assertEqual(len(calls), 2)
+        self.assertIn('Timed out', logs.output[0])
+        self.assertIn('No free yt-dlp worker', logs.output[1])
+
+    def test_batch_extracts_each_video_once(self):
+        with mock.patch('news.media_service._extract_info', return_value={'duration': 212}) as extract_info:
+            results = extract_youtube_metadata_batch([self.URL, 'https://youtu.be/9bZkp7q19f0', self.URL])
+
+        self.assertEqual(extract_info.call_count, 2)
+        self.assertEqual(list(results), [self.URL, 'https://youtu.be/9bZkp7q19f0'])
+        self.assertEqual({metadata['duration_seconds'] for metadata in results.values()}, {212})
+
+    def test_only_youtube_http_urls_reach_yt_dlp(self):
+        with mock.patch('news.media_service._extract_info') as extract_info, \
+                self.assertLogs('news.media_service', 'WARNING'):
+            self.assertIsNone(extract_youtube_metadata('https://example.com/watch?v=dQw4w9WgXcQ'))
+            self.assertIsNone(extract_youtube_metadata('file://youtube.com/etc/passwd'))
+        extract_info.assert_not_called()
+
+
+def png_bytes(size=(1200, 800), color=(200, 40, 40)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@unittest.skipUnless(thumbnails_enabled(), 'Pillow is not installed')
+# Requests are plain http; production settings would redirect them to https
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(THUMBNAIL_ROOT=self.root.name)
+        self.settings_override.enable()
+        category = Category.objects.create(name='News', slug='news')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.article = Article.objects.create(
+            source=source, title='Story', link='https://example.com/story', guid='story',
+            image_url='https://cdn.example.com/huge.png', pub_date=timezone.now()
+        )
+        self.client.force_login(User.objects.create_user('reader'))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.root.cleanup()
+
+    def test_variants_and_placeholder(self):
+        image_hash, placeholder = build_thumbnails(png_bytes())
+        self.assertEqual(placeholder, '#c82828')
+        from PIL import Image
+        with Image.open(f'{self.root.name}/{image_hash[:2]}/{image_hash}-card.webp') as thumbnail:
+            self.assertEqual(thumbnail.size, (576, 384))
+
+    def test_image_fetched_once_and_cached_immutably(self):
+        url = reverse('news:article_thumbnail', args=[self.article.id, 'card'])
+        with mock.patch('news.thumbnails.fetch_image', return_value=png_bytes()) as fetch:
+            response = self.client.get(url, HTTP_ACCEPT='image/avif,image/webp,*/*')
+            self.assertEqual(response['Content-Type'], 'image/webp')
+            self.assertNotIn('immutable', response['Cache-Control'])
+
+            self.article.refresh_from_db()
+            response = self.client.get(f'{url}?v={self.article.image_hash}', HTTP_ACCEPT='image/jpeg')
+            self.assertEqual(response['Content-Type'], 'image/jpeg')
+            self.assertIn('immutable', response['Cache-Control'])
+        fetch.assert_called_once()
+        self.assertEqual(self.article.image_placeholder, '#c82828')
+
+    def test_unusable_source_falls_back_to_original(self):
+        url = reverse('news:article_thumbnail', args=[self.article.id, 'card'])
+        with mock.patch('news.thumbnails.fetch_image', return_value=b'not an image'):
+            response = self.client.get(url)
+        self.assertRedirects(response, self.article.image_url, fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('news:article_thumbnail', args=[self.article.id, 'huge'])).status_code, 404)
+
+    def test_failing_source_is_fetched_once_until_retry_time(self):
+        url = reverse('news:article_thumbnail', args=[self.article.id, 'card'])
+        with mock.patch('news.thumbnails.fetch_image', return_value=None) as fetch:
+            for _ in range(3):
+                self.assertRedirects(self.client.get(url), self.article.image_url, fetch_redirect_response=False)
+            fetch.assert_called_once()
+
+            Article.objects.update(image_retry_after=timezone.now() - timedelta(minutes=1))
+            self.client.get(url)
+            self.assertEqual(fetch.call_count, 2)
+
+        with mock.patch('news.thumbnails.fetch_image', return_value=png_bytes()), \
+                mock.patch('news.thumbnails.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+            self.assertEqual(self.client.get(url)['Content-Type'], 'image/jpeg')
+        self.assertIsNone(Article.objects.get(pk=self.article.pk).image_retry_after)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RankingTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.relevant = Article.objects.create(
+            source=source, title='Relevant', link='https://example.com/r', guid='r',
+            pub_date=timezone.now(), relevance_score=90, personalization_score=10
+        )
+        self.personal = Article.objects.create(
+            source=source, title='Personal', link='https://example.com/p', guid='p',
+            pub_date=timezone.now() - timedelta(hours=1), relevance_score=10, personalization_score=90
+        )
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def dashboard_titles(self):
+        return [article.title for article in self.client.get(reverse('news:dashboard')).context['articles']]
+
+    def test_switching_context_reranks_without_rescoring(self):
+        self.assertEqual(self.dashboard_titles(), ['Relevant', 'Personal'])
+        # 0.4 * 90 + 0.3 * 10
+        self.assertEqual(_rank_articles(Article.objects.all(), None).first().final_score, 39)
+
+        context = ReadingContext.objects.create(
+            user=self.user, name='For me', relevance_weight=0.1, personalization_weight=0.8,
+            serendipity_weight=0.05, trend_weight=0.05
+        )
+        self.client.post(reverse('news:switch_context', args=[context.id]))
+        self.assertEqual(self.dashboard_titles(), ['Personal', 'Relevant'])
+        self.relevant.refresh_from_db()
+        self.assertEqual((self.relevant.relevance_score, self.relevant.personalization_score), (90, 10))
+
+
+class PreferenceLearningTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.first = Article.objects.create(
+            source=source, title='Compilers explained', link='https://example.com/1', guid='1', pub_date=timezone.now()
+        )
+        self.second = Article.objects.create(
+            source=source, title='Quantum networks', link='https://example.com/2', guid='2', pub_date=timezone.now()
+        )
+        self.user = User.objects.create_user('reader')
+        self.start = timezone.now()
+        self.prefs = UserPreference.objects.create(user=self.user, decay_epoch=self.start)
+
+    def feedback(self, article, score, days=0):
+        with mock.patch('news.models.timezone.now', return_value=self.start + timedelta(days=days)):
+            _set_feedback(self.user, article, score)
+        self.prefs.refresh_from_db()
+
+    def counters(self):
+        return {
+            (counter.kind, counter.key): (round(counter.likes, 9), round(counter.dislikes, 9))
+            for counter in PreferenceCounter.objects.filter(user=self.user)
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = (self.counters(), self.prefs.preferred_categories, self.prefs.preferred_sources)
+        self.prefs.update_from_feedback()
+        self.assertEqual(
+            incremental, (self.counters(), self.prefs.preferred_categories, self.prefs.preferred_sources)
+        )
+
+    def test_repeated_clicks_are_learned_once(self):
+        self.feedback(self.first, 1)
+        self.feedback(self.first, 1)
+        self.assertEqual(self.prefs.total_feedback_count, 1)
+        self.assertEqual(FeedbackEvent.objects.filter(user=self.user).count(), 1)
+
+    def test_failed_learning_rolls_back_the_score(self):
+        with mock.patch.object(UserPreference, 'record_feedback', side_effect=RuntimeError('boom')), \
+                self.assertRaises(RuntimeError):
+            _set_feedback(self.user, self.first, 1)
+        self.assertFalse(ArticleInteraction.objects.filter(user=self.user, feedback_score=1).exists())
+
+    def test_version_moves_only_when_scores_would(self):
+        self.feedback(self.first, 1)
+        version = self.prefs.version
+        twin = Article.objects.create(
+            source=self.first.source, title=self.first.title, link='https://example.com/3', guid='3',
+            pub_date=timezone.now()
+        )
+        self.feedback(twin, 1)
+        self.assertEqual(self.prefs.total_feedback_count, 2)
+        self.assertEqual(self.prefs.version, version)
+
+        self.feedback(self.second, -1)
+        self.assertEqual(self.prefs.version, version + 1)
+
+    def test_record_feedback_updates_counters_and_weights(self):
+        self.feedback(self.first, 1)
+        self.feedback(self.second, -1)
+        source_key = str(self.first.source_id)
+        self.assertEqual(self.counters()[('source', source_key)], (1.0, 1.0))
+        self.assertEqual(self.counters()[('keyword', 'compilers')], (1.0, 0.0))
+        self.assertEqual(self.prefs.preferred_categories, {'tech': 0.0})
+        self.assertEqual(self.prefs.interest_keywords, ['compilers', 'explained'])
+        self.assertEqual(self.prefs.total_feedback_count, 2)
+
+        self.feedback(self.second, 1)
+        self.assertEqual(self.prefs.preferred_sources, {source_key: 1.0})
+        self.assertMatchesRebuild()
+
+    def test_withdrawn_feedback_leaves_no_counters(self):
+        self.feedback(self.first, 1)
+        self.feedback(self.first, 0)
+        self.assertEqual(self.counters(), {})
+        self.assertEqual((self.prefs.preferred_categories, self.prefs.preferred_sources), ({}, {}))
+        self.assertEqual(self.prefs.total_feedback_count, 0)
+        self.assertMatchesRebuild()
+
+    @override_settings(PREFERENCE_HALF_LIFE_DAYS=1)
+    def test_decay_weights_newer_feedback_and_rescales(self):
+        self.feedback(self.first, 1, days=15)
+        self.assertEqual(self.counters()[('keyword', 'compilers')], (2.0 ** 15, 0.0))
+
+        # 21 half-lives after the epoch: everything is scaled down and the epoch moves
+        self.feedback(self.second, -1, days=21)
+        self.assertEqual(self.prefs.decay_epoch, self.start + timedelta(days=21))
+        self.assertEqual(self.counters()[('keyword', 'compilers')], (2.0 ** -6, 0.0))
+        self.assertEqual(self.counters()[('keyword', 'quantum')], (0.0, 1.0))
+        self.assertEqual(
+            sorted(FeedbackEvent.objects.filter(user=self.user).values_list('weight', flat=True)), [2.0 ** -6, 1.0]
+        )
+        # (1/64 - 1) / (1/64 + 1)
+        self.assertEqual(self.prefs.preferred_categories, {'tech': -0.97})
+        self.assertMatchesRebuild()
+
+        # Withdrawing the old like subtracts its rescaled weight
+        self.feedback(self.first, 0, days=22)
+        self.assertNotIn(('keyword', 'compilers'), self.counters())
+        self.assertMatchesRebuild()
+
+    @override_settings(PREFERENCE_HALF_LIFE_DAYS=1)
+    def test_decay_survives_long_gaps(self):
+        self.feedback(self.first, 1)
+        self.feedback(self.second, 1, days=3000)
+        self.assertEqual(self.counters()[('keyword', 'quantum')], (1.0, 0.0))
+        # The old like has decayed to nothing
+        self.assertNotIn(('keyword', 'compilers'), self.counters())
+        self.assertEqual(self.prefs.interest_keywords, ['networks', 'quantum'])
+        self.assertMatchesRebuild()
+
+
+class CurationPipelineTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        self.source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.user = User.objects.create_user('reader')
+        self.prefs = UserPreference.objects.create(user=self.user)
+
+    def article(self, guid, **fields):
+        return Article.objects.create(
+            source=self.source, title=f'Article {guid}', link=f'https://example.com/{guid}', guid=guid,
+            pub_date=timezone.now(), **fields
+        )
+
+    def pipeline(self, **kwargs):
+        return CurationPipeline(user_prefs=self.prefs, summary_delay=0, log=lambda message: None, **kwargs)
+
+    def personalize(self, limit=None, chunk_size=2):
+        """Run the personalize stage and return the guids in the order they were scored"""
+        scored = []
+
+        def score(article, *args, **kwargs):
+            scored.append(article.guid)
+            return ai_service.score_article_comprehensive(article, *args, **kwargs)
+
+        with mock.patch('news.curation.score_article_comprehensive', side_effect=score):
+            self.pipeline(chunk_size=chunk_size).run_personalize(limit)
+        return scored
+
+    def test_failed_depth_classification_is_retried(self):
+        article = self.article('a', description='x' * 1000)
+        model = mock.Mock()
+        model.generate_content.side_effect = [
+            Exception('API unavailable'), mock.Mock(text='It is a medium-length piece'), mock.Mock(text=' Heavy\n'),
+        ]
+
+        with mock.patch.object(ai_service, 'model', model):
+            self.assertEqual(self.pipeline().run_classify(None), 0)
+            task = CurationTask.objects.get(article=article, stage='classify')
+            self.assertEqual((task.status, task.attempts), (CurationTask.FAILED, 1))
+
+            self.assertEqual(self.pipeline().run_classify(None), 0)
+            self.assertEqual(self.pipeline().run_classify(None), 1)
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (CurationTask.DONE, 3))
+        article.refresh_from_db()
+        self.assertEqual(article.content_depth, 'heavy')
+
+    def test_depth_classification_gives_up_after_max_attempts(self):
+        self.article('a', description='x' * 1000)
+        model = mock.Mock()
+        model.generate_content.side_effect = Exception('API unavailable')
+
+        with mock.patch.object(ai_service, 'model', model):
+            for _ in range(4):
+                self.pipeline().run_classify(None)
+
+        self.assertEqual(model.generate_content.call_count, 3)
+        self.assertEqual(pending_for(Article.objects.all(), 'classify').count(), 0)
+
+    def test_personalize_waits_for_scoring_but_not_for_a_nonzero_score(self):
+        self.article('liked', relevance_score=70, content_depth='light')
+        zero = self.article('zero', content_depth='light')
+        CurationTask.objects.create(article=zero, stage='score', status=CurationTask.DONE, attempts=1)
+        self.article('unscored', content_depth='light')
+
+        self.assertEqual(sorted(self.personalize()), ['liked', 'zero'])
+        zero.refresh_from_db()
+        self.assertEqual(zero.scored_preference_version, self.prefs.version)
+        self.assertEqual(self.personalize(), [])
+
+    def test_personalize_pages_unread_then_read_newest_first(self):
+        for guid in ['e', 'd', 'c', 'b', 'a']:
+            self.article(guid, relevance_score=50, content_depth='light')
+        ArticleInteraction.objects.create(user=self.user, article=Article.objects.get(guid='b'), is_read=True)
+
+        self.assertEqual(self.personalize(limit=3), ['a', 'c', 'd'])
+        self.assertEqual(self.personalize(), ['e', 'b'])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='News', slug='news')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        now = timezone.now()
+        # Plenty of ties on score and on pub_date to exercise every tie-breaker
+        Article.objects.bulk_create([
+            Article(
+                source=source, title=f'Story {i}', link=f'https://example.com/{i}', guid=str(i),
+                relevance_score=(i % 3) * 10, pub_date=now - timedelta(hours=i % 4)
+            )
+            for i in range(47)
+        ])
+
+    def test_pages_cover_every_article_once_in_rank_order(self):
+        ranked = _rank_articles(Article.objects.all(), None)
+        expected = list(ranked.values_list('id', flat=True))
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = CursorPage(ranked, cursor, per_page=10)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+            self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+            seen += [article.id for article in page]
+            pages += 1
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 5)
+
+    def test_malformed_cursor_starts_at_the_top(self):
+        ranked = _rank_articles(Article.objects.all(), None)
+        self.assertEqual(CursorPage(ranked, 'not-a-cursor!', per_page=5)[0], ranked.first())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(TestCase):
+    """Hot dashboard and curation queries must stay on their indexes"""
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index_name, table='news_article'):
+        plan = self.query_plan(queryset)
+        steps = [step for step in plan if re.search(rf'\b{table}\b', step)]
+        self.assertTrue(steps, plan)
+        for step in steps:
+            self.assertIn(f'INDEX {index_name}', step, plan)
+
+    def test_dashboard_lists(self):
+        user = User.objects.create_user('reader')
+        unread = _user_articles(user).filter(is_read=False)
+        self.assertUsesIndex(
+            _rank_articles(unread.filter(source__category=Category(pk=1)), None)[:21], 'article_source_recent'
+        )
+        # Per-user state is one unique-index probe per article (subquery alias U0)
+        self.assertUsesIndex(
+            _rank_articles(unread, None)[:21], 'sqlite_autoindex_news_articleinteraction_1', table='U0'
+        )
+        self.assertUsesIndex(
+            ArticleInteraction.objects.filter(user=user, feedback_score__in=[-1, 1]),
+            'interaction_feedback', table='news_articleinteraction'
+        )
+
+    def test_curation_backlogs(self):
+        summarize = pending_for(Article.objects.filter(ai_summary__isnull=True), 'summarize').annotate(
+            description_length=Length('description')
+        ).filter(description_length__gt=500)
+        self.assertUsesIndex(summarize.order_by('-pk')[:50], 'article_needs_summary')
+        self.assertUsesIndex(
+            pending_for(Article.objects.filter(relevance_score=0), 'score').order_by('-pk')[:50],
+            'article_needs_score'
+        )
+        self.assertUsesIndex(
+            pending_for(Article.objects.filter(content_depth='medium'), 'classify').order_by('-pk')[:50],
+            'article_default_depth'
+        )
+
+    def test_personalize_backlog_pages(self):
+        user = User.objects.create_user('reader')
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        for version in (0, 1, 2):
+            Article.objects.create(
+                source=source, title=f'Article {version}', link=f'https://example.com/{version}', guid=str(version),
+                pub_date=timezone.now(), relevance_score=50, content_depth='light',
+                scored_preference_version=version
+            )
+
+        # The pages run_personalize fetches: unread/read x never scored/version 1
+        slices = personalize_slices(personalize_backlog(2, user.pk), 2)
+        self.assertEqual(len(slices), 4)
+        for articles in slices:
+            self.assertUsesIndex(chunk_page(articles, 50), 'article_scored_version')
+            self.assertUsesIndex(chunk_page(articles, 50, last_id=100), 'article_scored_version')
+
+    def test_media_enrichment(self):
+        self.assertUsesIndex(
+            Article.objects.filter(source__source_type__in=['yt', 'podcast'], duration_seconds__isnull=True)[:20],
+            'article_needs_media'
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ArticleInteractionTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.article = Article.objects.create(
+            source=source, title='Quantum networking breakthrough', link='https://example.com/q', guid='q',
+            pub_date=timezone.now()
+        )
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+
+    def test_read_and_saved_state_is_per_user(self):
+        self.client.force_login(self.alice)
+        self.client.post(reverse('news:mark_read', args=[self.article.id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.article.id]))
+
+        self.assertFalse(_user_articles(self.alice).filter(is_read=False).exists())
+        self.assertTrue(_user_articles(self.bob).filter(is_read=False).exists())
+        self.assertEqual(list(_user_articles(self.alice).filter(is_saved=True)), [self.article])
+        self.assertFalse(_user_articles(self.bob).filter(is_saved=True).exists())
+
+        response = self.client.get(reverse('news:saved_articles'))
+        self.assertContains(response, 'Quantum networking breakthrough')
+        self.client.force_login(self.bob)
+        self.assertContains(self.client.get(reverse('news:dashboard')), 'Quantum networking breakthrough')
+
+    def test_feedback_is_per_user_and_feeds_the_learner(self):
+        self.client.force_login(self.alice)
+        self.client.post(reverse('news:handle_feedback', args=[self.article.id, 'like']))
+
+        self.assertEqual(_user_articles(self.alice).get().feedback_score, 1)
+        self.assertEqual(_user_articles(self.bob).get().feedback_score, 0)
+
+        prefs = UserPreference.objects.get(user=self.alice)
+        self.assertEqual(prefs.preferred_categories, {'tech': 1.0})
+        prefs.update_from_feedback()
+        self.assertEqual(prefs.preferred_categories, {'tech': 1.0})
+        self.assertEqual(prefs.total_feedback_count, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CardFragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['cards'].clear()
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.article = Article.objects.create(
+            source=source, title='Original title', link='https://example.com/a', guid='a',
+            pub_date=timezone.now() - timedelta(hours=3)
+        )
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def dashboard(self):
+        return self.client.get(reverse('news:dashboard'), HTTP_HX_REQUEST='true')
+
+    def test_unchanged_cards_are_served_from_cache(self):
+        self.assertContains(self.dashboard(), 'Original title')
+        # Bypassing updated_at leaves the cached fragment in place
+        Article.objects.filter(pk=self.article.pk).update(title='Silently changed')
+        self.assertContains(self.dashboard(), 'Original title')
+
+    def test_content_changes_invalidate_the_card(self):
+        self.dashboard()
+        self.article.title = 'Rewritten title'
+        bulk_update_articles([self.article], ['title'])
+        self.assertContains(self.dashboard(), 'Rewritten title')
+
+    def test_source_changes_invalidate_the_card(self):
+        self.assertContains(self.dashboard(), 'Feed')
+        Source.objects.filter(pk=self.article.source_id).update(name='Renamed feed')
+        self.assertContains(self.dashboard(), 'Renamed feed')
+
+    def test_user_state_changes_invalidate_the_card(self):
+        self.assertNotContains(self.dashboard(), 'text-yellow-500 bg-yellow-500/10')
+        self.client.post(reverse('news:toggle_bookmark', args=[self.article.id]))
+        self.client.post(reverse('news:handle_feedback', args=[self.article.id, 'like']))
+        response = self.dashboard()
+        self.assertContains(response, 'text-yellow-500 bg-yellow-500/10')
+        self.assertContains(response, 'text-green-500 bg-green-500/10')
+
+    def test_timesince_stays_current(self):
+        self.assertContains(self.dashboard(), '3\xa0hours ago')
+        Article.objects.filter(pk=self.article.pk).update(pub_date=timezone.now() - timedelta(days=2))
+        self.assertContains(self.dashboard(), '2\xa0days ago')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CounterTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        self.science = Category.objects.create(name='Science', slug='science')
+        tech_feed = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=self.tech)
+        science_feed = Source.objects.create(name='Science feed', url='https://example.com/sci', category=self.science)
+        self.articles = [
+            Article.objects.create(
+                source=source, title=f'Article {i}', link=f'https://example.com/{i}', guid=str(i),
+                pub_date=timezone.now()
+            )
+            for i, source in enumerate([tech_feed, tech_feed, science_feed])
+        ]
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def stats(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(reverse('api:stats')).json()
+
+    def test_ingest_read_and_bookmark_keep_stats_current(self):
+        first = self.articles[0]
+        self.client.post(reverse('news:mark_read', args=[first.id]))
+        self.client.post(reverse('news:mark_read', args=[first.id]))  # counted once
+        self.client.post(reverse('news:toggle_bookmark', args=[first.id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+
+        with self.assertNumQueries(1):
+            counters.user_stats(self.user)
+        self.assertEqual(self.stats(), {
+            'total_articles': 3, 'unread_articles': 2, 'saved_articles': 1, 'total_sources': 2
+        })
+        self.assertEqual(
+            counters.unread_by_category(self.user, [self.tech, self.science]),
+            {self.tech.pk: 1, self.science.pk: 1}
+        )
+        # Another user's counts are untouched
+        self.assertEqual(counters.user_stats(User.objects.create_user('other'))['unread_articles'], 3)
+
+    def test_sidebar_shows_unread_badges(self):
+        self.client.post(reverse('news:mark_read', args=[self.articles[2].id]))
+        response = self.client.get(reverse('news:dashboard'))
+        self.assertEqual(
+            {category.slug: category.unread_count for category in response.context['categories']},
+            {'tech': 2, 'science': 0}
+        )
+
+    def test_deletion_updates_counters(self):
+        article = self.articles[0]
+        self.client.post(reverse('news:mark_read', args=[article.id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[article.id]))
+        article.delete()
+
+        self.assertEqual(self.stats(), {
+            'total_articles': 2, 'unread_articles': 2, 'saved_articles': 0, 'total_sources': 2
+        })
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_reconcile_repairs_drift(self):
+        self.client.post(reverse('news:mark_read', args=[self.articles[0].id]))
+        Counter.objects.filter(key='articles').update(value=99)
+        Counter.objects.create(key='user:999:saved', value=4)
+        Counter.objects.filter(key=f'user:{self.user.pk}:read:category:{self.tech.pk}').delete()
+
+        drifted = counters.reconcile()
+
+        self.assertEqual(drifted, {
+            'articles': (99, 3),
+            'user:999:saved': (4, 0),
+            f'user:{self.user.pk}:read:category:{self.tech.pk}': (0, 1),
+        })
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(self.stats()['unread_articles'], 2)
+
+    def test_deleting_a_source_settles_its_counters_at_once(self):
+        tech_feed = self.articles[0].source
+        for article in self.articles:
+            self.client.post(reverse('news:mark_read', args=[article.id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[2].id]))
+
+        with CaptureQueriesContext(connection) as queries:
+            tech_feed.delete()
+
+        # One UPDATE per distinct delta (-2, -1, +1), not one per article and interaction
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "news_counter"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(self.stats(), {
+            'total_articles': 1, 'unread_articles': 0, 'saved_articles': 1, 'total_sources': 1
+        })
+        self.assertFalse(Counter.objects.filter(key__endswith=f':source:{self.articles[0].source_id}').exists())
+        self.assertEqual(counters.reconcile(), {})
+
+        self.science.delete()
+        self.assertEqual(self.stats(), {
+            'total_articles': 0, 'unread_articles': 0, 'saved_articles': 0, 'total_sources': 0
+        })
+        self.assertEqual(counters.reconcile(), {})
+
+        user_id = self.user.pk
+        self.user.delete()
+        self.assertFalse(Counter.objects.filter(key__startswith=f'user:{user_id}:').exists())
+
+    def test_mark_read_upsert_counts_only_newly_read_articles(self):
+        first, second, third = self.articles
+        self.client.post(reverse('news:toggle_bookmark', args=[first.id]))  # Existing row, still unread
+        self.client.post(reverse('news:mark_read', args=[second.id]))
+
+        self.assertEqual(_mark_read(self.user, Article.objects.all()), 2)
+        self.assertEqual(_mark_read(self.user, Article.objects.all()), 0)
+
+        self.assertEqual(self.stats(), {
+            'total_articles': 3, 'unread_articles': 0, 'saved_articles': 1, 'total_sources': 2
+        })
+        read = counters.read_prefix(self.user.pk)
+        self.assertEqual(
+            counters.get_counts([read, f'{read}:category:{self.tech.pk}', f'{read}:source:{third.source_id}']),
+            {read: 3, f'{read}:category:{self.tech.pk}': 2, f'{read}:source:{third.source_id}': 1}
+        )
+        self.assertTrue(ArticleInteraction.objects.get(user=self.user, article=first).is_saved)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_admin_edits_are_reconciled(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        interaction = ArticleInteraction.objects.create(user=self.user, article=self.articles[0])
+
+        with self.assertLogs('news.counters', 'WARNING'):
+            response = self.client.post(reverse('admin:news_articleinteraction_change', args=[interaction.pk]), {
+                'user': self.user.pk, 'article': self.articles[0].pk, 'is_read': 'on', 'is_saved': 'on',
+                'feedback_score': 0,
+            })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(counters.user_stats(self.user)['unread_articles'], 2)
+        self.assertEqual(counters.user_stats(self.user)['saved_articles'], 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        self.source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.article = Article.objects.create(
+            source=self.source, title='First', link='https://example.com/1', guid='1', pub_date=timezone.now()
+        )
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+        self.client.get(reverse('news:dashboard'))  # sets the CSRF cookie, part of the ETag
+
+    def revalidate(self, url, **headers):
+        etag = self.client.get(url, **headers)['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        response = self.client.get(reverse('news:dashboard'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('HX-Request', response['Vary'])
+
+        etag = response['ETag']
+        # Session, user and one counter lookup: no article queries
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('news:dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            self.client.get(reverse('news:category_detail', args=['tech']), HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_content_and_user_state_change_the_etag(self):
+        url = reverse('news:dashboard')
+        etag, _ = self.revalidate(url)
+        Article.objects.create(
+            source=self.source, title='Second', link='https://example.com/2', guid='2', pub_date=timezone.now()
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag, _ = self.revalidate(url)
+        self.client.post(reverse('news:mark_read', args=[self.article.id]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Another user's reads don't affect this user's pages
+        etag, _ = self.revalidate(url)
+        ArticleInteraction.objects.create(user=User.objects.create_user('other'), article=self.article, is_read=True)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_api_reads_are_conditional(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for name in ['api:stats', 'api:list_sources']:
+            response = client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(1):
+                response = client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkMarkReadTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        science = Category.objects.create(name='Science', slug='science')
+        tech_feed = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=self.tech)
+        science_feed = Source.objects.create(name='Science feed', url='https://example.com/sci', category=science)
+        now = timezone.now()
+        self.articles = [
+            Article.objects.create(
+                source=source, title=f'Article {i}', link=f'https://example.com/{i}', guid=str(i),
+                pub_date=now - timedelta(days=i)
+            )
+            for i, source in enumerate([tech_feed, tech_feed, science_feed, science_feed])
+        ]
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def mark(self, **data):
+        return self.client.post(reverse('news:mark_read_bulk'), data)
+
+    def unread_titles(self):
+        return sorted(_user_articles(self.user).filter(is_read=False).values_list('title', flat=True))
+
+    def test_mark_ids_in_one_transaction(self):
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+        ids = [self.articles[0].id, self.articles[1].id]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.mark(ids=ids)
+        self.assertEqual(response.json(), {'marked': 2})
+        self.assertEqual(sum(query['sql'].startswith('INSERT INTO "news_articleinteraction"') for query in queries), 1)
+
+        self.assertEqual(self.unread_titles(), ['Article 2', 'Article 3'])
+        # Existing state is kept by the upsert
+        self.assertTrue(ArticleInteraction.objects.get(user=self.user, article=self.articles[1]).is_saved)
+        # Already read articles aren't counted twice
+        self.assertEqual(self.mark(ids=ids).json(), {'marked': 0})
+        self.assertEqual(counters.user_stats(self.user)['unread_articles'], 2)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_mark_older_and_category(self):
+        self.assertEqual(self.mark(category='tech').json(), {'marked': 2})
+        self.assertEqual(self.unread_titles(), ['Article 2', 'Article 3'])
+
+        before = (timezone.now() - timedelta(days=2, hours=12)).isoformat()
+        self.assertEqual(self.mark(before=before).json(), {'marked': 1})
+        self.assertEqual(self.unread_titles(), ['Article 2'])
+        self.assertEqual(counters.unread_by_category(self.user, [self.tech])[self.tech.pk], 0)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_rejects_invalid_requests(self):
+        self.assertEqual(self.mark().status_code, 400)
+        self.assertEqual(self.mark(ids=['1', 'x']).status_code, 400)
+        self.assertEqual(self.mark(before='yesterday').status_code, 400)
+        self.assertEqual(self.mark(category='missing').status_code, 404)
+        self.assertEqual(self.unread_titles(), [f'Article {i}' for i in range(4)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SyncActionsTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=category)
+        self.articles = [
+            Article.objects.create(
+                source=source, title=f'Article {i}', link=f'https://example.com/{i}', guid=str(i),
+                pub_date=timezone.now()
+            )
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def sync(self, actions):
+        return self.client.post(reverse('news:sync_actions'), {'actions': actions}, content_type='application/json')
+
+    def interaction(self, article):
+        return ArticleInteraction.objects.get(user=self.user, article=article)
+
+    def test_replays_queued_actions_in_one_request(self):
+        first, second, third = (article.id for article in self.articles)
+        response = self.sync([
+            {'type': 'read', 'article': first},
+            {'type': 'read', 'article': second},
+            {'type': 'saved', 'article': first, 'value': True},
+            {'type': 'feedback', 'article': third, 'value': 1},
+            # Later actions on the same article win
+            {'type': 'saved', 'article': second, 'value': True},
+            {'type': 'saved', 'article': second, 'value': False},
+            {'type': 'feedback', 'article': 999, 'value': 1},
+            {'type': 'saved', 'article': first, 'value': 'yes'},
+        ])
+        self.assertEqual(response.json(), {'marked': 2, 'updated': 3, 'ignored': 2})
+        self.assertTrue(self.interaction(first).is_saved)
+        self.assertFalse(self.interaction(second).is_saved)
+        self.assertEqual(self.interaction(third).feedback_score, 1)
+        self.assertEqual(UserPreference.objects.get(user=self.user).total_feedback_count, 1)
+        self.assertEqual(counters.user_stats(self.user)['unread_articles'], 1)
+        self.assertEqual(counters.reconcile(), {})
+
+        # Replaying the same batch again changes nothing
+        self.sync([{'type': 'saved', 'article': first, 'value': True}])
+        self.assertEqual(counters.user_stats(self.user)['saved_articles'], 1)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_buttons_send_the_resulting_state(self):
+        article = self.articles[0]
+        url = reverse('news:toggle_bookmark', args=[article.id])
+        self.client.post(url, {'saved': 'true'})
+        self.client.post(url, {'saved': 'true'})
+        self.assertTrue(self.interaction(article).is_saved)
+        self.assertEqual(counters.user_stats(self.user)['saved_articles'], 1)
+
+        url = reverse('news:handle_feedback', args=[article.id, 'like'])
+        self.client.post(url, {'score': '1'})
+        self.client.post(url, {'score': '1'})
+        self.assertEqual(self.interaction(article).feedback_score, 1)
+        # Without a score the button still toggles
+        self.client.post(url)
+        self.assertEqual(self.interaction(article).feedback_score, 0)
+
+    def test_rejects_malformed_batches(self):
+        self.assertEqual(
+            self.client.post(reverse('news:sync_actions'), 'nope', content_type='application/json').status_code, 400
+        )
+        self.assertEqual(self.sync({'type': 'read'}).status_code, 400)
+        self.assertEqual(self.sync([{'type': 'read', 'article': 1}] * 501).status_code, 400)
+
+
+# Loads static/sw.js into a bare context with an in-memory action queue and posts one mark-read
+SW_HARNESS = """
+const fs = require('fs');
+const vm = require('vm');
+
+const { replayStatus, online } = JSON.parse(process.env.SW_SCENARIO);
+const context = vm.createContext({
+    URL, Request, Response, Headers, console: { warn() {} },
+    self: { addEventListener() {}, registration: { sync: { register: async () => {} } } }
+});
+vm.runInContext(fs.readFileSync(process.env.SW_PATH, 'utf8'), context);
+const NetworkError = vm.runInContext('TypeError', context);
+
+let queue = [{ id: 1, action: { type: 'read', article: 1 }, csrfToken: 'stale' }];
+let nextId = 2;
+context.withStore = async (name, mode, fn) => {
+    const request = fn({
+        getAll: () => ({ result: queue.slice() }),
+        add: entry => queue.push({ id: nextId++, ...entry }),
+        delete: id => { queue = queue.filter(entry => entry.id !== id); }
+    });
+    return request && request.result;
+};
+const sent = [];
+context.fetch = async input => {
+    const url = typeof input === 'string' ? input : new URL(input.url).pathname;
+    sent.push(url);
+    if (!online) throw new NetworkError('Failed to fetch');
+    return new Response(null, { status: url === '/actions/' ? replayStatus : 200 });
+};
+
+context.action({
+    request: new Request('http://testserver/article/5/read/', {
+        method: 'POST', body: new URLSearchParams(), headers: { 'X-CSRFToken': 'fresh' }
+    }),
+    waitUntil() {}
+}).then(response => console.log(JSON.stringify({
+    status: response.status, sent, queued: queue.map(entry => entry.action.article)
+})));
+"""
+
+
+@unittest.skipUnless(shutil.which('node'), 'Node.js is not installed')
+class ServiceWorkerTests(SimpleTestCase):
+    def post_action(self, replay_status=200, online=True):
+        env = {
+            'PATH': os.environ['PATH'],
+            'SW_PATH': str(settings.BASE_DIR / 'static' / 'sw.js'),
+            'SW_SCENARIO': json.dumps({'replayStatus': replay_status, 'online': online}),
+        }
+        result = subprocess.run(['node', '-e', SW_HARNESS], env=env, capture_output=True, text=True, timeout=30)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_replays_the_queue_before_sending_an_action(self):
+        self.assertEqual(
+            self.post_action(), {'status': 200, 'sent': ['/actions/', '/article/5/read/'], 'queued': []}
+        )
+
+    def test_failed_replay_while_online_still_sends_the_action(self):
+        # A server error keeps the queued batch for a later replay
+        self.assertEqual(
+            self.post_action(replay_status=503),
+            {'status': 200, 'sent': ['/actions/', '/article/5/read/'], 'queued': [1]}
+        )
+        # A stale CSRF token would be rejected forever: the batch is dropped
+        self.assertEqual(
+            self.post_action(replay_status=403),
+            {'status': 200, 'sent': ['/actions/', '/article/5/read/'], 'queued': []}
+        )
+
+    def test_queues_actions_only_when_the_network_is_unreachable(self):
+        response = self.post_action(online=False)
+        self.assertEqual(response['status'], 204)
+        self.assertEqual(response['queued'], [1, 5])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        science = Category.objects.create(name='Science', slug='science')
+        self.tech_feed = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=self.tech)
+        science_feed = Source.objects.create(name='Science feed', url='https://example.com/sci', category=science)
+        now = timezone.now()
+        self.quantum = Article.objects.create(
+            source=self.tech_feed, title='Quantum networking breakthrough', link='https://example.com/1', guid='1',
+            description='<p>Researchers <b>entangled</b> photons across &amp; between cities.</p>',
+            pub_date=now - timedelta(days=1)
+        )
+        self.mention = Article.objects.create(
+            source=science_feed, title='Weekly roundup', link='https://example.com/2', guid='2',
+            description='Also: a quantum sensor, and <script>alert(1)</script> news.', pub_date=now - timedelta(days=10)
+        )
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def ids(self, text, **filters):
+        return [article_id for article_id, _, _ in search(text, **filters)]
+
+    def test_title_matches_rank_first_and_filters_apply(self):
+        self.assertEqual(self.ids('quantum'), [self.quantum.id, self.mention.id])
+        self.assertEqual(self.ids('breakthroughs'), [self.quantum.id])  # stemmed
+        self.assertEqual(self.ids('quantum photons'), [self.quantum.id])
+        self.assertEqual(self.ids('quantum', category='science'), [self.mention.id])
+        self.assertEqual(self.ids('quantum', source=self.tech_feed.id), [self.quantum.id])
+        self.assertEqual(
+            self.ids('quantum', since=(timezone.now() - timedelta(days=3)).date().isoformat()), [self.quantum.id]
+        )
+        # FTS syntax in user input is inert
+        self.assertEqual(self.ids('quantum OR "NEAR('), [])
+        with self.assertRaises(ValueError):
+            search('quantum', until='last week')
+
+    def test_index_follows_ingest_updates_and_deletes(self):
+        self.assertEqual(self.ids('summarized'), [])
+        self.mention.ai_summary = 'Summarized: sensors'
+        bulk_update_articles([self.mention], ['ai_summary'])
+        self.assertEqual(self.ids('summarized'), [self.mention.id])
+
+        self.quantum.delete()
+        self.assertEqual(self.ids('quantum'), [self.mention.id])
+        self.assertEqual(rebuild_index(), 1)
+        self.assertEqual(self.ids('quantum'), [self.mention.id])
+
+    def test_snippets_are_plain_text_and_escaped(self):
+        _, _, snippet = search('quantum sensor')[0]
+        self.assertIn('<mark>quantum</mark>', snippet)
+        self.assertNotIn('<script>', snippet)
+        _, _, snippet = search('entangled')[0]
+        self.assertIn('Researchers <mark>entangled</mark> photons across &amp; between', snippet)
+
+    def test_search_page_and_api(self):
+        response = self.client.get(reverse('news:search'), {'q': 'quantum', 'category': 'tech'})
+        self.assertEqual([article.id for article in response.context['articles']], [self.quantum.id])
+        self.assertContains(response, '<mark>Quantum</mark>')
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(reverse('api:search'), {'q': 'quantum'}).json()
+        self.assertEqual([result['id'] for result in data['results']], [self.quantum.id, self.mention.id])
+        self.assertIn('<mark>', data['results'][0]['snippet'])
+        self.assertEqual(client.get(reverse('api:search')).status_code, 400)
+        self.assertEqual(client.get(reverse('api:search'), {'q': 'quantum', 'since': 'soon'}).status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class IngestEventTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        science = Category.objects.create(name='Science', slug='science')
+        self.tech_feed = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=self.tech)
+        self.science_feed = Source.objects.create(name='Science feed', url='https://example.com/sci', category=science)
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def ingest(self, source, guid):
+        return Article.objects.create(
+            source=source, title=f'Article {guid}', link=f'https://example.com/{guid}', guid=guid,
+            pub_date=timezone.now()
+        )
+
+    def first_messages(self, count, *args):
+        async def collect():
+            stream = events.event_stream(*args)
+            return [await anext(stream) for _ in range(count)]
+        return async_to_sync(collect)()
+
+    def test_stream_announces_articles_since_page_render(self):
+        since = events.latest_event_id()
+        self.ingest(self.tech_feed, 'a')
+        self.ingest(self.tech_feed, 'b')
+        self.ingest(self.science_feed, 'c')
+
+        retry, message = self.first_messages(2, since, since)
+        self.assertEqual(retry, f'retry: {events.RECONNECT_MILLISECONDS}\n\n')
+        self.assertTrue(message.startswith(f'id: {events.latest_event_id()}\nevent: new-articles\ndata: '))
+        self.assertIn('3 new articles', message)
+        self.assertIn('2 in Tech, 1 in Science', message)
+
+        # Category pages only hear about their own category
+        _, message = self.first_messages(2, since, since, self.tech)
+        self.assertIn('2 new articles', message)
+
+    def test_new_cards_and_reconnect(self):
+        since = events.latest_event_id()
+        self.ingest(self.tech_feed, 'a')
+        read = self.ingest(self.science_feed, 'b')
+        ArticleInteraction.objects.create(user=self.user, article=read, is_read=True)
+        until = events.latest_event_id()
+        self.ingest(self.tech_feed, 'later')
+
+        response = self.client.get(reverse('news:new_articles'), {'since': since, 'until': until})
+        self.assertEqual([article.title for article in response.context['articles']], ['Article a'])
+        self.assertContains(response, f'since={until}')
+        self.assertContains(response, 'hx-swap-oob="true"')
+
+    def test_dashboard_connects_from_latest_event(self):
+        self.ingest(self.tech_feed, 'a')
+        response = self.client.get(reverse('news:dashboard'))
+        self.assertContains(response, f'sse-connect="{reverse("news:article_events")}?since={events.latest_event_id()}"')
+        self.assertNotContains(self.client.get(reverse('news:saved_articles')), 'sse-connect')
+
+    def test_old_events_are_pruned(self):
+        self.ingest(self.tech_feed, 'a')
+        IngestEvent.objects.update(created_at=timezone.now() - timedelta(days=3))
+        self.ingest(self.tech_feed, 'b')
+        self.assertEqual(events.prune_events(), 1)
+        self.assertEqual(IngestEvent.objects.count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ArticleSyncTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        science = Category.objects.create(name='Science', slug='science')
+        sources = [
+            Source.objects.create(name='Tech feed', url='https://example.com/tech', category=self.tech),
+            Source.objects.create(name='Science feed', url='https://example.com/sci', category=science),
+        ]
+        self.articles = [
+            Article.objects.create(
+                source=sources[i % 2], title=f'Article {i}', link=f'https://example.com/{i}', guid=str(i),
+                pub_date=timezone.now(), description='<p>Long body</p>', relevance_score=i * 3
+            )
+            for i in range(4)
+        ]
+        # As if the articles were ingested yesterday
+        Article.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def list(self, **params):
+        return self.api.get(reverse('api:list_articles'), params)
+
+    def test_pages_by_cursor_without_extra_queries(self):
+        first = self.list(limit=3).json()
+        self.assertEqual([a['id'] for a in first['results']], [a.id for a in self.articles[:3]])
+        self.assertEqual(first['results'][0]['source']['category']['slug'], 'tech')
+        # Version lookup for the ETag, then one query for the page with its sources
+        with self.assertNumQueries(2):
+            second = self.list(limit=3, cursor=first['next_cursor']).json()
+        self.assertEqual([a['id'] for a in second['results']], [self.articles[3].id])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(second['sync_token'], first['sync_token'])
+
+    def test_since_returns_only_changes(self):
+        token = encode_token((timezone.now() - timedelta(hours=1)).isoformat())
+        self.assertEqual(self.list(since=token).json()['results'], [])
+
+        self.client.post(reverse('news:mark_read_bulk'), {'ids': [self.articles[0].id]})
+        self.articles[2].title = 'Updated'
+        self.articles[2].save()
+        results = self.list(since=token, fields='id,title,is_read').json()['results']
+        self.assertEqual(results, [
+            {'id': self.articles[0].id, 'title': 'Article 0', 'is_read': True},
+            {'id': self.articles[2].id, 'title': 'Updated', 'is_read': False},
+        ])
+
+    def test_since_with_state_filters_reports_articles_leaving_the_filter(self):
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[3].id]))
+        token = self.list(saved='true', fields='id').json()['sync_token']
+
+        self.client.post(reverse('news:toggle_bookmark', args=[self.articles[1].id]))
+        self.articles[2].title = 'Updated'
+        self.articles[2].save()
+        self.articles[3].title = 'Updated'
+        self.articles[3].save()
+        results = self.list(since=token, saved='true', fields='id,is_saved').json()['results']
+        # The unsaved article is reported; the changed article that was never saved is not
+        self.assertEqual(results, [
+            {'id': self.articles[1].id, 'is_saved': False},
+            {'id': self.articles[3].id, 'is_saved': True},
+        ])
+
+    def test_filters_and_projection(self):
+        self.client.post(reverse('news:mark_read_bulk'), {'ids': [self.articles[0].id]})
+        results = self.list(category='tech', read='false', fields='id,title').json()['results']
+        self.assertEqual(results, [{'id': self.articles[2].id, 'title': 'Article 2'}])
+        self.assertEqual(
+            [a['id'] for a in self.list(min_score=6, fields='id').json()['results']],
+            [self.articles[2].id, self.articles[3].id]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.list(fields='id,title')
+        self.assertNotIn('"description"', queries[-1]['sql'])
+        self.assertNotIn('news_source', queries[-1]['sql'])
+
+    def test_rejects_invalid_parameters(self):
+        self.assertEqual(self.list(fields='id,password').status_code, 400)
+        self.assertEqual(self.list(since='not-a-token').status_code, 400)
+        self.assertEqual(self.list(cursor=encode_token(['x'])).status_code, 400)
+        self.assertEqual(self.list(limit='many').status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SourceHealthTests(TestCase):
+    def setUp(self):
+        tech = Category.objects.create(name='Tech', slug='tech')
+        self.feed = Source.objects.create(name='Tech feed', url='https://example.com/tech', category=tech)
+        self.quiet = Source.objects.create(name='Quiet feed', url='https://example.com/quiet', category=tech)
+        now = timezone.now()
+        self.articles = [
+            Article.objects.create(
+                source=self.feed, title=f'Article {i}', link=f'https://example.com/{i}', guid=str(i),
+                pub_date=now - timedelta(days=i * 20)
+            )
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_list_sources_in_one_query(self):
+        self.client.post(reverse('news:mark_read_bulk'), {'ids': [self.articles[0].id]})
+        self.feed.record_fetch(250)
+        # Version lookup for the ETag, then the annotated sources
+        with self.assertNumQueries(2):
+            data = self.api.get(reverse('api:list_sources')).json()
+        self.assertEqual(data['count'], 2)
+        quiet, feed = data['sources']
+        self.assertEqual(feed['category']['slug'], 'tech')
+        self.assertEqual((feed['article_count'], feed['unread_count']), (3, 2))
+        # Two of the three articles are from the last 30 days
+        self.assertAlmostEqual(feed['items_per_day'], 2 / 30)
+        self.assertEqual(feed['last_fetch_latency_ms'], 250)
+        self.assertIsNotNone(feed['last_success_at'])
+        self.assertEqual((quiet['article_count'], quiet['items_per_day'], quiet['last_fetch_at']), (0, 0, None))
+
+    def test_fetch_feeds_records_failures(self):
+        down = feedparser.FeedParserDict(bozo=1, bozo_exception=OSError('Connection refused'), entries=[], feed={})
+        with mock.patch('news.management.commands.fetch_feeds.feedparser.parse', return_value=down):
+            call_command('fetch_feeds', stdout=io.StringIO())
+            call_command('fetch_feeds', stdout=io.StringIO())
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.consecutive_failures, 2)
+        self.assertEqual(self.feed.last_error, 'Connection refused')
+        self.assertIsNone(self.feed.last_success_at)
+        self.assertIsNotNone(self.feed.last_fetch_latency_ms)
+
+        self.feed.record_fetch(100)
+        self.feed.refresh_from_db()
+        self.assertEqual((self.feed.consecutive_failures, self.feed.last_error), (0, ''))
+        self.assertIsNotNone(self.feed.last_success_at)
+
+
+class ChunkedCurationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        self.articles = [
+            Article.objects.create(
+                source=source, title=f'Article {guid}', link=f'https://example.com/{guid}', guid=guid,
+                pub_date=timezone.now(), description='x' * 400
+            )
+            for guid in 'abc'
+        ]
+        self.user = User.objects.create_user('reader')
+
+    def test_iter_chunks_walks_the_backlog_newest_first(self):
+        ids = [article.pk for article in reversed(self.articles)]
+        chunks = [[article.pk for article in chunk] for chunk in iter_chunks(Article.objects.all(), 2)]
+        self.assertEqual(chunks, [ids[:2], ids[2:]])
+        self.assertEqual([len(chunk) for chunk in iter_chunks(Article.objects.all(), 2, limit=1)], [1])
+
+    def test_stages_write_only_changed_fields_per_chunk(self):
+        scores = {str(article.pk): 60 + i for i, article in enumerate(self.articles)}
+        with mock.patch('news.curation.score_relevance_batch', return_value=scores) as batch, \
+                CaptureQueriesContext(connection) as queries:
+            call_command('curate_content', stream=True, sequential=True, chunk_size=2, stdout=io.StringIO())
+
+        # One API call per chunk, sent a 200-character snippet of each description
+        self.assertEqual(batch.call_count, 2)
+        self.assertEqual({len(a['description']) for call in batch.call_args_list for a in call.args[0]}, {200})
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "news_article"')]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn('"description" =', sql)
+            self.assertNotIn('"title" =', sql)
+
+        article = Article.objects.get(guid='a')
+        self.assertEqual((article.relevance_score, article.content_depth), (60, 'light'))
+        self.assertEqual(article.scored_preference_version, UserPreference.objects.get(user=self.user).version)
+
+    def test_score_loads_only_a_snippet_of_the_description(self):
+        scores = {str(article.pk): 50 for article in self.articles}
+        pipeline = CurationPipeline(chunk_size=2, summary_delay=0, log=lambda message: None)
+        with mock.patch('news.curation.score_relevance_batch', return_value=scores), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(pipeline.run_score(None), 3)
+        for query in queries.captured_queries:
+            self.assertNotRegex(query['sql'], r'(?<!SUBSTR\()"news_article"\."description"')
+
+
+class CurationStageTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tech', slug='tech')
+        source = Source.objects.create(name='Feed', url='https://example.com/feed', category=category)
+        Article.objects.create(
+            source=source, title='Article', link='https://example.com/a', guid='a',
+            pub_date=timezone.now(), description='x' * 1000
+        )
+        self.user = User.objects.create_user('reader')
+
+    def test_failed_stage_skips_the_rest_of_its_lane_only(self):
+        pipeline = CurationPipeline(UserPreference.objects.create(user=self.user), summary_delay=0,
+                                    log=lambda message: None)
+        with mock.patch('news.curation.score_relevance_batch', side_effect=RuntimeError('quota')), \
+                mock.patch('news.curation.summarize_article', return_value='- Summary') as summarize, \
+                self.assertLogs('news.curation', 'ERROR'):
+            results = pipeline.run(parallel=False)
+
+        self.assertEqual(results, {'summarize': 1, 'score': 'error: quota'})
+        summarize.assert_called_once()
+        self.assertEqual(Article.objects.get(guid='a').ai_summary, '- Summary')
+
+    def test_finished_stage_is_not_repeated(self):
+        pipeline = CurationPipeline(summary_delay=0, log=lambda message: None)
+        with mock.patch('news.curation.summarize_article', return_value='- Summary'):
+            self.assertEqual(pipeline.run_summarize(None), 1)
+        with mock.patch('news.curation.summarize_article') as summarize:
+            self.assertEqual(pipeline.run_summarize(None), 0)
+        summarize.assert_not_called()
+        self.assertEqual(CurationTask.objects.get(stage='summarize').status, CurationTask.DONE)
+
+    def test_unknown_stages_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown stages: rank'):
+            call_command('curate_content', stages='score,rank', stdout=io.StringIO())
+
+
+class CurationBenchmarkTests(TestCase):
+    def report(self, rate, api_calls=10, db_queries=20, peak_memory_kb=100.0):
+        return {'stages': {'score': {
+            'articles_per_second': rate, 'api_calls': api_calls, 'db_queries': db_queries,
+            'peak_memory_kb': peak_memory_kb,
+        }}}
+
+    def test_simulated_model_answers_each_prompt_and_counts_usage(self):
+        model = SimulatedModel(latency_ms=0, jitter_ms=0)
+        scores = json.loads(model.generate_content(
+            'ID: 7\nTitle: a\n---\nID: 9\nTitle: b', generation_config={'response_mime_type': 'application/json'}
+        ).text)
+        self.assertEqual(sorted(scores), ['7', '9'])
+        self.assertIn(model.generate_content('Return ONLY one word: light, medium, or heavy').text,
+                      ['light', 'medium', 'heavy'])
+        self.assertTrue(model.generate_content('Summarize the following').text.startswith('- '))
+        self.assertEqual(model.calls, 3)
+        self.assertGreater(model.prompt_tokens, 0)
+
+        model.reset()
+        self.assertEqual((model.calls, model.prompt_tokens, model.output_tokens), (0, 0, 0))
+
+    def test_synthetic_articles_run_through_every_stage(self):
+        prefs = create_synthetic_articles(12)
+        pipeline = CurationPipeline(
+            prefs, chunk_size=5, limits={stage: None for stage in STAGES}, summary_delay=0, log=lambda message: None
+        )
+        with mock.patch.object(ai_service, 'model', SimulatedModel(latency_ms=0, jitter_ms=0)):
+            results = pipeline.run(parallel=False)
+
+        self.assertEqual(results['score'], 12)
+        self.assertEqual(results['classify'], 12)
+        self.assertEqual(results['personalize'], 12)
+        self.assertEqual(results['summarize'], Article.objects.filter(ai_summary__isnull=False).count())
+
+    def test_compare_to_baseline(self):
+        comparison = compare_to_baseline(
+            self.report(30.0, api_calls=8, db_queries=12, peak_memory_kb=90.5), self.report(20.0)
+        )
+        self.assertEqual(comparison, {'score': {
+            'throughput_ratio': 1.5, 'api_calls_delta': -2, 'db_queries_delta': -8, 'peak_memory_kb_delta': -9.5,
+        }})
+        # Stages missing from the baseline are left out
+        self.assertEqual(compare_to_baseline(self.report(30.0), {'stages': {}}), {})
+
+    def test_command_prints_and_stores_json_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = f'{directory}/baseline.json'
+            output_path = f'{directory}/report.json'
+            with open(baseline_path, 'w') as f:
+                json.dump(self.report(20.0), f)
+
+            stdout = io.StringIO()
+            with mock.patch('news.management.commands.curate_content.run_benchmark',
+                            return_value=self.report(40.0)) as run:
+                call_command('curate_content', benchmark=True, benchmark_articles=10, latency_ms=0,
+                             baseline=baseline_path, output=output_path, stdout=stdout)
+
+            run.assert_called_once_with(articles=10, latency_ms=0, jitter_ms=200, chunk_size=50)
+            report = json.loads(stdout.getvalue())
+            self.assertEqual(report['baseline']['score']['throughput_ratio'], 2.0)
+            with open(output_path) as f:
+                self.assertEqual(json.load(f), report)
+
+
+class ConcurrentEnrichmentTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        self.source = Source.objects.create(
+            name='Show', url='https://example.com/feed', source_type='podcast', category=category
+        )
+
+    def test_host_throttle_limits_concurrency_and_spaces_starts(self):
+        throttle = HostThrottle(max_concurrent=2, min_interval=0.05)
+        lock = threading.Lock()
+        active, peak, starts = {}, {}, []
+
+        def fetch(url):
+            with throttle.slot(url):
+                host = throttle._host(url)
+                with lock:
+                    starts.append((host, time.monotonic()))
+                    active[host] = active.get(host, 0) + 1
+                    peak[host] = max(peak.get(host, 0), active[host])
+                time.sleep(0.15)
+                with lock:
+                    active[host] -= 1
+
+        urls = ['https://youtu.be/dQw4w9WgXcQ', 'https://m.youtube.com/watch?v=dQw4w9WgXcQ'] * 3
+        urls += ['https://cdn.example.com/ep.mp3'] * 3
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(fetch, urls))
+
+        self.assertEqual(peak, {'youtube.com': 2, 'cdn.example.com': 2})
+        youtube_starts = sorted(started for host, started in starts if host == 'youtube.com')
+        for earlier, later in zip(youtube_starts, youtube_starts[1:]):
+            self.assertGreaterEqual(later - earlier, 0.04)
+
+    def test_enrich_media_looks_up_each_episode_once_and_writes_in_batches(self):
+        for i in range(6):
+            Article.objects.create(
+                source=self.source, title=f'Episode {i}', link=f'https://example.com/ep{i}', guid=f'ep{i}',
+                pub_date=timezone.now(), enclosure_url=f'https://cdn{i % 2}.example.com/ep{i % 4}.mp3'
+            )
+        lock = threading.Lock()
+        looked_up = []
+        active, peak = {}, {}
+
+        def fetch(article):
+            host = urlparse(article.enclosure_url).netloc
+            with lock:
+                looked_up.append(article.enclosure_url)
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+            return {'duration_seconds': 600, 'author': 'Host'}
+
+        with mock.patch('news.management.commands.enrich_media.fetch_article_metadata', side_effect=fetch), \
+                CaptureQueriesContext(connection) as queries:
+            call_command('enrich_media', all=True, workers=4, per_host=1, host_delay=0, batch_size=4,
+                         stdout=io.StringIO())
+
+        # Six articles share four episodes, each fetched once, one at a time per host
+        self.assertEqual(sorted(looked_up), sorted(set(looked_up)))
+        self.assertEqual(len(looked_up), 4)
+        self.assertEqual(peak, {'cdn0.example.com': 1, 'cdn1.example.com': 1})
+        self.assertFalse(Article.objects.filter(duration_seconds__isnull=True).exists())
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "news_article"')]
+        self.assertEqual(len(updates), 2)
+
+    def test_enrich_media_resolves_videos_in_batches(self):
+        channel = Source.objects.create(
+            name='Channel', url='https://example.com/channel', source_type='yt', category=self.source.category
+        )
+        links = [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'https://youtu.be/dQw4w9WgXcQ',
+            'https://www.youtube.com/shorts/9bZkp7q19f0'
+        ]
+        for i, link in enumerate(links):
+            Article.objects.create(source=channel, title=f'Video {i}', link=link, guid=f'v{i}', pub_date=timezone.now())
+
+        with mock.patch('news.media_service._extract_info', return_value={'duration': 212, 'uploader': 'Rick'}) \
+                as extract_info, \
+                mock.patch('news.management.commands.enrich_media.fetch_article_metadata') as fetch:
+            call_command('enrich_media', all=True, workers=2, host_delay=0, stdout=io.StringIO())
+
+        fetch.assert_not_called()
+        self.assertEqual(
+            sorted(call.args[0] for call in extract_info.call_args_list),
+            ['https://www.youtube.com/watch?v=9bZkp7q19f0', 'https://www.youtube.com/watch?v=dQw4w9WgXcQ']
+        )
+        self.assertEqual(set(Article.objects.values_list('duration_seconds', flat=True)), {212})
+        self.assertEqual(MediaMetadata.objects.count(), 2)
+
+
+PODCAST_RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+<channel>
+  <title>Show</title>
+  <itunes:author>Show Host</itunes:author>
+  <item>
+    <title>Episode 1</title>
+    <link>https://example.com/ep1</link>
+    <guid>ep1</guid>
+    <itunes:duration>1:02:03</itunes:duration>
+    <itunes:image href="https://example.com/ep1.jpg"/>
+    <enclosure url="https://cdn.example.com/ep1.mp3" type="audio/mpeg" length="1000"/>
+  </item>
+  <item>
+    <title>Episode 2</title>
+    <link>https://example.com/ep2</link>
+    <guid>ep2</guid>
+    <itunes:author>Guest Host</itunes:author>
+    <itunes:duration>754</itunes:duration>
+    <enclosure url="https://example.com/ep2.jpg" type="image/jpeg" length="1000"/>
+  </item>
+</channel>
+</rss>"""
+
+YOUTUBE_ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">
+  <title>Channel</title>
+  <entry>
+    <id>yt:video:dQw4w9WgXcQ</id>
+    <title>Video</title>
+    <link rel="alternate" href="https://www.youtube.com/watch?v=dQw4w9WgXcQ"/>
+    <author><name>Channel Owner</name></author>
+    <media:group>
+      <media:thumbnail url="https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg" width="480" height="360"/>
+      <media:community>
+        <media:statistics views="12345"/>
+      </media:community>
+    </media:group>
+  </entry>
+</feed>"""
+
+
+class FeedMetadataTests(TestCase):
+    def test_parse_duration(self):
+        cases = {
+            '3723': 3723, 3723: 3723, '1:02:03': 3723, '62:03': 3723, '45': 45, '90.5': 90,
+            '': None, None: None, '0': None, 'n/a': None, '1:2:3:4': None, -5: None,
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(parse_duration(value), expected)
+
+    def test_podcast_entries(self):
+        feed = feedparser.parse(PODCAST_RSS)
+        first, second = (extract_feed_entry_metadata(entry, feed.feed) for entry in feed.entries)
+        self.assertEqual(first, {
+            'duration_seconds': 3723,
+            'author': 'Show Host',
+            'image_url': 'https://example.com/ep1.jpg',
+            'enclosure_url': 'https://cdn.example.com/ep1.mp3',
+        })
+        # Image enclosures aren't audio
+        self.assertEqual(second, {'duration_seconds': 754, 'author': 'Guest Host'})
+
+    def test_youtube_entry(self):
+        feed = feedparser.parse(YOUTUBE_ATOM)
+        self.assertEqual(extract_feed_entry_metadata(feed.entries[0], feed.feed), {
+            'author': 'Channel Owner',
+            'view_count': 12345,
+            'image_url': 'https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg',
+        })
+
+    def test_fetch_feeds_stores_feed_metadata(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        Source.objects.create(name='Show', url='https://example.com/feed', source_type='podcast', category=category)
+        with mock.patch('news.management.commands.fetch_feeds.feedparser.parse',
+                        return_value=feedparser.parse(PODCAST_RSS)):
+            call_command('fetch_feeds', stdout=io.StringIO())
+
+        episode = Article.objects.get(guid='ep1')
+        self.assertEqual(
+            (episode.duration_seconds, episode.author, episode.enclosure_url, episode.image_url),
+            (3723, 'Show Host', 'https://cdn.example.com/ep1.mp3', 'https://example.com/ep1.jpg')
+        )
+        # Nothing left for enrich_media to look up
+        self.assertFalse(Article.objects.filter(duration_seconds__isnull=True).exists())
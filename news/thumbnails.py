@@ -0,0 +1,168 @@
+"""
+Local thumbnail proxy for article images.
+
+Each article image is fetched once, resized into the variants the card template
+needs (WebP and JPEG) and stored under THUMBNAIL_ROOT with content-hash
+filenames. The article records the hash and a placeholder color, so templates
+can link to immutable URLs and paint the card before the image arrives.
+
+Pillow is optional: without it templates keep hotlinking image_url.
+"""
+import io
+import os
+import hashlib
+import tempfile
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from news.counters import bump_content_version
+from news.models import Article
+from news.safe_http import public_session
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow not installed: thumbnails disabled
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> (width, height); 2x the CSS box of the card image slots
+THUMBNAIL_VARIANTS = {
+    'card': (576, 384),   # Desktop: w-72 h-48
+    'wide': (800, 400),   # Mobile: full width, h-48
+}
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+MAX_REDIRECTS = 3
+# How long an image that couldn't be fetched or decoded is left alone
+FAILURE_RETRY_DELAY = timedelta(hours=6)
+
+
+def thumbnails_enabled():
+    return Image is not None
+
+
+def thumbnail_root():
+    return Path(settings.THUMBNAIL_ROOT)
+
+
+def thumbnail_path(image_hash, variant, extension):
+    # Two-level fan-out keeps directories small
+    return thumbnail_root() / image_hash[:2] / f'{image_hash}-{variant}.{extension}'
+
+
+def preferred_extension(accept_header):
+    """WebP for browsers that accept it, JPEG otherwise"""
+    return 'webp' if 'image/webp' in (accept_header or '') else 'jpg'
+
+
+def fetch_image(url):
+    """
+    Download an image (at most MAX_IMAGE_BYTES) from a public address.
+    Returns bytes or None.
+    """
+    try:
+        with public_session(max_redirects=MAX_REDIRECTS) as session, session.get(
+            url,
+            stream=True,
+            timeout=FETCH_TIMEOUT,
+            headers={'User-Agent': 'Mozilla/5.0'}
+        ) as response:
+            response.raise_for_status()
+            if not response.headers.get('Content-Type', '').startswith('image/'):
+                return None
+            data = b''
+            for block in response.iter_content(chunk_size=65536):
+                data += block
+                if len(data) > MAX_IMAGE_BYTES:
+                    logger.warning(f"Thumbnail source too large: {url}")
+                    return None
+            return data
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch thumbnail source {url}: {e}")
+        return None
+
+
+def placeholder_color(image):
+    """Average color as #rrggbb"""
+    red, green, blue = image.convert('RGB').resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def build_thumbnails(data):
+    """
+    Decode image bytes and write every variant/format under THUMBNAIL_ROOT.
+    Returns (content_hash, placeholder_color), or None if the data isn't a usable image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception as e:  # Pillow raises a variety of errors for broken files
+        logger.warning(f"Could not decode thumbnail source: {e}")
+        return None
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image_hash = hashlib.sha256(data).hexdigest()[:20]
+
+    for variant, size in THUMBNAIL_VARIANTS.items():
+        resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        for extension, (format_name, _, options) in FORMATS.items():
+            path = thumbnail_path(image_hash, variant, extension)
+            if path.exists():
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent requests never serve a partial file
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as temporary:
+                resized.save(temporary, format_name, **options)
+            os.replace(temporary.name, path)
+
+    return image_hash, placeholder_color(image)
+
+
+def ensure_thumbnails(article):
+    """
+    Make sure the article's thumbnails exist, fetching and resizing the image once.
+    Stores image_hash/image_placeholder on the article. Returns True when available.
+
+    A failure sets image_retry_after, and until then the image isn't fetched again.
+    """
+    if not thumbnails_enabled() or not article.image_url:
+        return False
+
+    if article.image_hash and all(
+        thumbnail_path(article.image_hash, variant, extension).exists()
+        for variant in THUMBNAIL_VARIANTS for extension in FORMATS
+    ):
+        return True
+
+    if article.image_retry_after and article.image_retry_after > timezone.now():
+        return False
+
+    data = fetch_image(article.image_url)
+    result = build_thumbnails(data) if data else None
+    if not result:
+        article.image_retry_after = timezone.now() + FAILURE_RETRY_DELAY
+        Article.objects.filter(pk=article.pk).update(image_retry_after=article.image_retry_after)
+        return False
+
+    article.image_hash, article.image_placeholder = result
+    article.image_retry_after = None
+    Article.objects.filter(pk=article.pk).update(
+        image_hash=article.image_hash,
+        image_placeholder=article.image_placeholder,
+        image_retry_after=None,
+        updated_at=timezone.now()
+    )
+    bump_content_version()
+    return True
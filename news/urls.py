@@ -6,11 +6,17 @@ app_name = 'news'
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('saved/', views.saved_articles, name='saved_articles'),
+    path('search/', views.search, name='search'),
     path('refresh/', views.refresh_feeds, name='refresh_feeds'),
+    path('events/', views.article_events, name='article_events'),
+    path('new/', views.new_articles, name='new_articles'),
     path('context/<int:context_id>/switch/', views.switch_context, name='switch_context'),
     path('category/<slug:slug>/', views.category_detail, name='category_detail'),
+    path('articles/read/', views.mark_read_bulk, name='mark_read_bulk'),
+    path('actions/', views.sync_actions, name='sync_actions'),
     path('article/<int:article_id>/read/', views.mark_read, name='mark_read'),
     path('article/<int:article_id>/bookmark/', views.toggle_bookmark, name='toggle_bookmark'),
     path('article/<int:article_id>/feedback/<str:action>/', views.handle_feedback, name='handle_feedback'),
     path('article/<int:article_id>/export-obsidian/', views.export_obsidian, name='export_obsidian'),
+    path('article/<int:article_id>/thumbnail/<slug:variant>/', views.article_thumbnail, name='article_thumbnail'),
 ]
@@ -1,43 +1,113 @@
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from urllib.parse import quote
 from django.views.decorators.http import require_POST
-from django.core.paginator import Paginator
-from django.db.models import F, Q
-from .models import Article, Category, Source, ReadingContext, UserPreference
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import (
+    Article, ArticleInteraction, Category, Source, ReadingContext, UserPreference,
+    final_score_expression, user_state_annotations
+)
+from . import counters, events
+from .conditional import conditional_view
+from .pagination import CursorPage
+from .search import search_articles
+from .thumbnails import THUMBNAIL_VARIANTS, FORMATS, ensure_thumbnails, preferred_extension, thumbnail_path
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Most article ids one bulk mark-read request may list
+MARK_READ_MAX_IDS = 500
+
+# Most queued offline actions one sync_actions request may replay
+SYNC_MAX_ACTIONS = 500
+
+SEARCH_PAGE_SIZE = 20
+
+# Held while a background fetch_feeds run (refresh_feeds) is in progress
+_fetch_lock = threading.Lock()
+
+
+def _user_articles(user):
+    """Articles annotated with this user's is_read/is_saved/feedback_score"""
+    return Article.objects.annotate(**user_state_annotations(user))
+
+
+def _sidebar_categories(user):
+    """Categories with the user's unread_count, read from the materialized counters"""
+    categories = list(Category.objects.all())
+    unread = counters.unread_by_category(user, categories)
+    for category in categories:
+        category.unread_count = unread[category.pk]
+    return categories
+
+
+def _mark_read(user, articles):
+    """
+    Mark a queryset of articles read for the user: one upsert per batch of
+    interactions and one counter update, in a single transaction.
+    Returns how many articles were newly marked.
+    """
+    already_read = ArticleInteraction.objects.filter(user=user, article=OuterRef('pk'), is_read=True)
+    with transaction.atomic():
+        # Concurrent mark-reads for the user queue here, so the upsert never counts an article twice
+        User.objects.select_for_update().get(pk=user.pk)
+        unread = list(articles.exclude(Exists(already_read)).values_list('id', 'source_id', 'source__category_id'))
+        if not unread:
+            return 0
+        ArticleInteraction.objects.bulk_create(
+            [ArticleInteraction(user=user, article_id=article_id, is_read=True) for article_id, _, _ in unread],
+            update_conflicts=True,
+            unique_fields=['user', 'article'],
+            update_fields=['is_read', 'updated_at'],
+            batch_size=500
+        )
+        counters.record_reads(user, [(source_id, category_id) for _, source_id, category_id in unread])
+    return len(unread)
+
+
+def _rank_articles(queryset, active_context):
+    """
+    Order articles by their final score under the active reading context
+    (see final_score_expression). The id tie-breaker makes the order total,
+    which CursorPage relies on.
+    """
+    return queryset.annotate(
+        final_score=final_score_expression(active_context)
+    ).order_by('-final_score', '-pub_date', '-id')
+
 @login_required
+@conditional_view
 def dashboard(request):
     """
     Main view: shows unread articles and sidebar categories.
     """
-    categories = Category.objects.all()
+    categories = _sidebar_categories(request.user)
 
     # Get active reading context
     active_context = ReadingContext.objects.filter(user=request.user, is_active=True).first()
     all_contexts = ReadingContext.objects.filter(user=request.user)
 
-    # Get unread articles, sorted by personalization score (descending)
-    all_articles = Article.objects.filter(is_read=False).select_related('source', 'source__category')
-
-    # Sort by personalization_score if available, otherwise by pub_date
-    all_articles = all_articles.order_by(
-        F('personalization_score').desc(nulls_last=True),
-        '-pub_date'
-    )
+    # Get unread articles, ranked by the active context's final score
+    all_articles = _user_articles(request.user).filter(is_read=False).select_related('source', 'source__category')
+    all_articles = _rank_articles(all_articles, active_context)
 
-    # Pagination (20 per page)
-    paginator = Paginator(all_articles, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination (20 per page): no COUNT(*) or OFFSET on scroll requests
+    page_obj = CursorPage(all_articles, request.GET.get('cursor'), per_page=20)
 
     context = {
         'categories': categories,
         'articles': page_obj,
         'page_title': 'Dashboard',
+        'latest_event_id': events.latest_event_id(),
         'active_context': active_context,
         'all_contexts': all_contexts,
     }
@@ -49,30 +119,29 @@ def dashboard(request):
     return render(request, 'news/dashboard.html', context)
 
 @login_required
+@conditional_view
 def category_detail(request, slug):
-    categories = Category.objects.all()
+    categories = _sidebar_categories(request.user)
     category = get_object_or_404(Category, slug=slug)
-    all_articles = Article.objects.filter(source__category=category, is_read=False).select_related('source')
+    all_articles = _user_articles(request.user).filter(
+        source__category=category, is_read=False
+    ).select_related('source')
 
     # Get active reading context
     active_context = ReadingContext.objects.filter(user=request.user, is_active=True).first()
     all_contexts = ReadingContext.objects.filter(user=request.user)
 
-    # Sort by personalization score
-    all_articles = all_articles.order_by(
-        F('personalization_score').desc(nulls_last=True),
-        '-pub_date'
-    )
+    # Rank by the active context's final score
+    all_articles = _rank_articles(all_articles, active_context)
 
-    paginator = Paginator(all_articles, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = CursorPage(all_articles, request.GET.get('cursor'), per_page=20)
 
     context = {
         'categories': categories,
         'current_category': category,
         'articles': page_obj,
         'page_title': category.name,
+        'latest_event_id': events.latest_event_id(),
         'active_context': active_context,
         'all_contexts': all_contexts,
     }
@@ -83,26 +152,24 @@ def category_detail(request, slug):
     return render(request, 'news/dashboard.html', context)
 
 @login_required
+@conditional_view
 def saved_articles(request):
     """
     Shows all bookmarked articles.
     """
-    categories = Category.objects.all()
-    all_articles = Article.objects.filter(is_saved=True).select_related('source', 'source__category')
+    categories = _sidebar_categories(request.user)
+    # Driven from the user's (few) saved interactions rather than a scan of all articles
+    saved_ids = ArticleInteraction.objects.filter(user=request.user, is_saved=True).values('article_id')
+    all_articles = _user_articles(request.user).filter(pk__in=saved_ids).select_related('source', 'source__category')
 
     # Get active reading context
     active_context = ReadingContext.objects.filter(user=request.user, is_active=True).first()
     all_contexts = ReadingContext.objects.filter(user=request.user)
 
-    # Sort by personalization score
-    all_articles = all_articles.order_by(
-        F('personalization_score').desc(nulls_last=True),
-        '-pub_date'
-    )
+    # Rank by the active context's final score
+    all_articles = _rank_articles(all_articles, active_context)
 
-    paginator = Paginator(all_articles, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = CursorPage(all_articles, request.GET.get('cursor'), per_page=20)
 
     context = {
         'categories': categories,
@@ -117,28 +184,217 @@ def saved_articles(request):
 
     return render(request, 'news/dashboard.html', context)
 
+@login_required
+@conditional_view
+def search(request):
+    """
+    Full-text search over titles, descriptions, AI summaries and authors,
+    best matches first, optionally filtered by category, source and date.
+    """
+    query = request.GET.get('q', '').strip()
+    filters = {name: request.GET.get(name) or None for name in ('category', 'source', 'since', 'until')}
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    articles = []
+    search_error = None
+    if query:
+        try:
+            articles = search_articles(
+                _user_articles(request.user).select_related('source', 'source__category'),
+                query,
+                limit=SEARCH_PAGE_SIZE + 1,
+                offset=(page - 1) * SEARCH_PAGE_SIZE,
+                **filters
+            )
+        except ValueError as e:
+            search_error = str(e)
+
+    next_query = None
+    if len(articles) > SEARCH_PAGE_SIZE:
+        articles = articles[:SEARCH_PAGE_SIZE]
+        params = request.GET.copy()
+        params['page'] = page + 1
+        next_query = params.urlencode()
+
+    context = {
+        'categories': _sidebar_categories(request.user),
+        'articles': articles,
+        'query': query,
+        'filters': filters,
+        'next_query': next_query,
+        'search_error': search_error,
+        'page_title': f'Search: {query}' if query else 'Search',
+    }
+
+    if request.headers.get('HX-Request'):
+        return render(request, 'news/partials/search_results.html', context)
+
+    return render(request, 'news/search.html', context)
+
+@login_required
+async def article_events(request):
+    """
+    Server-sent event stream announcing newly ingested articles (news.events).
+    `since` is the ingest event id the page was rendered at; reconnects
+    resume from the Last-Event-ID header.
+    """
+    since = _event_id(request.GET.get('since'))
+    last_event_id = max(since, _event_id(request.headers.get('Last-Event-ID')))
+    category = None
+    if request.GET.get('category'):
+        category = await Category.objects.filter(slug=request.GET['category']).afirst()
+
+    response = StreamingHttpResponse(
+        events.event_stream(since, last_event_id, category), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+
+def _event_id(value):
+    return int(value) if value and value.isdigit() else 0
+
+
+@login_required
+def new_articles(request):
+    """
+    Cards for the articles ingested between two event ids (the SSE banner's
+    button), plus an out-of-band stream element that reconnects from `until`.
+    """
+    since = _event_id(request.GET.get('since'))
+    until = _event_id(request.GET.get('until'))
+    category = None
+    if request.GET.get('category'):
+        category = get_object_or_404(Category, slug=request.GET['category'])
+
+    article_ids = events.new_article_events(since, until, category.pk if category else None).values('article_id')
+    articles = _user_articles(request.user).filter(pk__in=article_ids, is_read=False).select_related(
+        'source', 'source__category'
+    )
+    active_context = ReadingContext.objects.filter(user=request.user, is_active=True).first()
+
+    return render(request, 'news/partials/new_articles.html', {
+        'articles': _rank_articles(articles, active_context),
+        'latest_event_id': until,
+        'current_category': category,
+        'oob': True,
+    })
+
 @login_required
 @require_POST
 def mark_read(request, article_id):
     """
     HTMX endpoint to mark an article as read.
     """
-    article = get_object_or_404(Article, pk=article_id)
-    article.is_read = True
-    article.save()
+    article = get_object_or_404(Article.objects.select_related('source'), pk=article_id)
+    with transaction.atomic():
+        interaction, _ = ArticleInteraction.objects.get_or_create(user=request.user, article=article)
+        # Conditional update, so only the request that actually flips the flag is counted
+        if ArticleInteraction.objects.filter(pk=interaction.pk, is_read=False).update(
+            is_read=True, updated_at=timezone.now()
+        ):
+            counters.record_read(request.user, article)
     # Return empty response or checkmark
     return render(request, 'components/mark_read_success.html')
 
+@login_required
+@require_POST
+def mark_read_bulk(request):
+    """
+    Marks many articles read at once: the given `ids` (visible cards, or
+    single clicks the frontend coalesced), everything published up to
+    `before`, and/or a whole `category`. Filters combine.
+    """
+    articles = Article.objects.all()
+    ids = request.POST.getlist('ids')
+    before = request.POST.get('before')
+    slug = request.POST.get('category')
+    if not (ids or before or slug):
+        return HttpResponseBadRequest("Give ids, before or category")
+
+    if ids:
+        if len(ids) > MARK_READ_MAX_IDS or not all(article_id.isdigit() for article_id in ids):
+            return HttpResponseBadRequest("Invalid ids")
+        articles = articles.filter(pk__in=ids)
+    if before:
+        before = parse_datetime(before)
+        if before is None:
+            return HttpResponseBadRequest("Invalid before timestamp")
+        articles = articles.filter(pub_date__lte=before)
+    if slug:
+        articles = articles.filter(source__category=get_object_or_404(Category, slug=slug))
+
+    return JsonResponse({'marked': _mark_read(request.user, articles)})
+
+@login_required
+@require_POST
+def sync_actions(request):
+    """
+    Replays actions the service worker queued while offline, in one request:
+    a JSON body {"actions": [{"type": "read" | "saved" | "feedback",
+    "article": id, "value": ...}, ...]} in the order they were taken.
+    Later actions on the same article win; invalid entries and deleted
+    articles are skipped and counted as ignored rather than failing the batch.
+    """
+    try:
+        actions = json.loads(request.body)['actions']
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest("Expected a JSON body with an actions list")
+    if not isinstance(actions, list) or len(actions) > SYNC_MAX_ACTIONS:
+        return HttpResponseBadRequest("Invalid actions")
+
+    reads = set()
+    states = {}  # (type, article id) -> latest value
+    ignored = 0
+    for action in actions:
+        kind = action.get('type') if isinstance(action, dict) else None
+        article_id = action.get('article') if kind else None
+        value = action.get('value') if kind else None
+        if not isinstance(article_id, int):
+            ignored += 1
+        elif kind == 'read':
+            reads.add(article_id)
+        elif (kind == 'saved' and isinstance(value, bool)) or (kind == 'feedback' and value in (-1, 0, 1)):
+            states[kind, article_id] = value
+        else:
+            ignored += 1
+
+    articles = Article.objects.select_related('source__category').in_bulk(
+        reads | {article_id for _, article_id in states}
+    )
+    missing = {key for key in states if key[1] not in articles}
+    ignored += len(reads - articles.keys()) + len(missing)
+    with transaction.atomic():
+        marked = _mark_read(request.user, Article.objects.filter(pk__in=reads & articles.keys()))
+        for (kind, article_id), value in states.items():
+            if (kind, article_id) in missing:
+                continue
+            if kind == 'saved':
+                _set_saved(request.user, articles[article_id], value)
+            else:
+                _set_feedback(request.user, articles[article_id], value)
+
+    return JsonResponse({'marked': marked, 'updated': len(states) - len(missing), 'ignored': ignored})
+
 @login_required
 @require_POST
 def toggle_bookmark(request, article_id):
     """
-    Toggles the internal bookmark state.
+    Toggles the internal bookmark state, or sets it when the button sends
+    `saved` (so a replayed offline click can't toggle twice).
     """
     article = get_object_or_404(Article, pk=article_id)
-    article.is_saved = not article.is_saved
-    article.save()
-    
+    if 'saved' in request.POST:
+        saved = request.POST['saved'] == 'true'
+    else:
+        interaction = ArticleInteraction.objects.filter(user=request.user, article=article).first()
+        saved = not (interaction and interaction.is_saved)
+    article.is_saved = _set_saved(request.user, article, saved)
+
     # Return button state
     context = {'article': article}
     # We return the "bookmark success" button if saved, or the normal button (rendered inline) if unsaved. 
@@ -151,6 +407,17 @@ def toggle_bookmark(request, article_id):
         # Return the original grey button state (hardcoded for speed here, or use a template partial)
         return render(request, 'components/bookmark_inactive.html', context)
 
+
+def _set_saved(user, article, saved):
+    """Set the user's bookmark on an article, counting only an actual change"""
+    with transaction.atomic():
+        interaction, _ = ArticleInteraction.objects.get_or_create(user=user, article=article)
+        if ArticleInteraction.objects.filter(pk=interaction.pk, is_saved=not saved).update(
+            is_saved=saved, updated_at=timezone.now()
+        ):
+            counters.record_saved(user, 1 if saved else -1)
+    return saved
+
 @login_required
 @require_POST
 def export_obsidian(request, article_id):
@@ -169,19 +436,58 @@ def export_obsidian(request, article_id):
     }
     return render(request, 'components/obsidian_success.html', context)
 
+@login_required
+def article_thumbnail(request, article_id, variant):
+    """
+    Resized local copy of an article's image (see news.thumbnails).
+    Keyed by article and variant rather than by URL, so it can't be used as an open proxy.
+    """
+    if variant not in THUMBNAIL_VARIANTS:
+        raise Http404
+    article = get_object_or_404(
+        Article.objects.only('id', 'image_url', 'image_hash', 'image_placeholder', 'image_retry_after'), pk=article_id
+    )
+    if not article.image_url or not article.image_url.startswith(('http://', 'https://')):
+        raise Http404
+
+    if not ensure_thumbnails(article):
+        # Pillow missing, or the source isn't a usable image or failed recently: use the original
+        response = redirect(article.image_url)
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
+
+    extension = preferred_extension(request.headers.get('Accept'))
+    path = thumbnail_path(article.image_hash, variant, extension)
+    response = FileResponse(open(path, 'rb'), content_type=FORMATS[extension][1])
+    if request.GET.get('v') == article.image_hash:
+        # Versioned URL: this content never changes
+        patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+    else:
+        patch_cache_control(response, private=True, max_age=24 * 3600)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
 @login_required
 @require_POST
 def refresh_feeds(request):
     """
-    Triggers the fetch_feeds command and returns a success status.
+    Starts fetch_feeds in the background (one run at a time) and returns at once.
+    New articles reach open dashboards over the SSE stream as they're committed.
     """
+    if _fetch_lock.acquire(blocking=False):
+        threading.Thread(target=_fetch_feeds_in_background, daemon=True).start()
+    return render(request, 'components/refresh_success.html', status=202)
+
+
+def _fetch_feeds_in_background():
     from django.core.management import call_command
     try:
         call_command('fetch_feeds')
-        return render(request, 'components/refresh_success.html') # We'll create this or just return 200
     except Exception as e:
         logger.error(f"Error fetching feeds: {e}", exc_info=True)
-        return render(request, 'components/refresh_error.html', status=500)
+    finally:
+        connection.close()
+        _fetch_lock.release()
 
 @login_required
 @require_POST
@@ -206,34 +512,42 @@ def switch_context(request, context_id):
 def handle_feedback(request, article_id, action):
     """
     Handle like/dislike feedback. Action key: 'like' (1) or 'dislike' (-1).
-    Toggles the score if already selected.
+    Toggles the score if already selected, unless the buttons send the
+    resulting `score` (so a replayed offline click can't toggle twice).
     """
-    from news.models import UserPreference
-
-    article = get_object_or_404(Article, pk=article_id)
+    article = get_object_or_404(Article.objects.select_related('source__category'), pk=article_id)
 
     score_map = {'like': 1, 'dislike': -1}
     new_score = score_map.get(action, 0)
 
-    # Toggle logic: if clicking "like" and it's already liked, reset to 0
-    if article.feedback_score == new_score:
-        article.feedback_score = 0
+    if request.POST.get('score') in ('-1', '0', '1'):
+        score = int(request.POST['score'])
     else:
-        article.feedback_score = new_score
-
-    article.save()
-
-    # Update user preferences periodically (every 10 feedbacks)
-    try:
-        prefs, _ = UserPreference.objects.get_or_create(user=request.user)
-        feedback_count = Article.objects.filter(feedback_score__in=[-1, 1]).count()
-
-        # Update preferences every 10 feedbacks
-        if feedback_count % 10 == 0:
-            prefs.update_from_feedback()
-    except Exception as e:
-        logger.error(f"Error updating preferences: {e}", exc_info=True)
+        # Toggle logic: if clicking "like" and it's already liked, reset to 0
+        interaction = ArticleInteraction.objects.filter(user=request.user, article=article).first()
+        score = 0 if interaction and interaction.feedback_score == new_score else new_score
+    article.feedback_score = _set_feedback(request.user, article, score)
 
     # Return the updated buttons
     context = {'article': article}
     return render(request, 'components/feedback_buttons.html', context)
+
+
+def _set_feedback(user, article, score):
+    """
+    Set the user's feedback score on an article and learn from the change.
+    The interaction row stays locked until the preferences are updated, so
+    rapid clicks are learned one after the other, and a failed preference
+    update rolls the score back with it.
+    """
+    with transaction.atomic():
+        ArticleInteraction.objects.get_or_create(user=user, article=article)
+        interaction = ArticleInteraction.objects.select_for_update().get(user=user, article=article)
+        previous_score = interaction.feedback_score
+        interaction.feedback_score = score
+        interaction.save(update_fields=['feedback_score', 'updated_at'])
+
+        # Learn from this click incrementally (keeps preferences always current)
+        prefs, _ = UserPreference.objects.get_or_create(user=user)
+        prefs.record_feedback(article, previous_score, score)
+    return score
@@ -140,6 +140,15 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+
+def add_service_worker_headers(headers, path, url):
+    # static/sw.js is registered with scope '/', to work offline on every page
+    if url.endswith('/sw.js'):
+        headers['Service-Worker-Allowed'] = '/'
+
+
+WHITENOISE_ADD_HEADERS_FUNCTION = add_service_worker_headers
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -168,6 +177,30 @@ REST_FRAMEWORK = {
     }
 }
 
+# Caches: rendered article cards get their own bounded store, keyed by content
+# version and per-user state (see templates/components/card.html)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cards',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Preference learning: half-life (days) for time-decayed feedback weights.
+# Leave unset to weigh all feedback equally.
+PREFERENCE_HALF_LIFE_DAYS = float(os.environ.get('PREFERENCE_HALF_LIFE_DAYS', 0)) or None
+
+# Media metadata cache: title/author/duration rarely change, view counts do
+MEDIA_METADATA_TTL_DAYS = int(os.environ.get('MEDIA_METADATA_TTL_DAYS', 30))
+MEDIA_VIEW_COUNT_TTL_HOURS = int(os.environ.get('MEDIA_VIEW_COUNT_TTL_HOURS', 24))
+
+# Resized article thumbnails (news.thumbnails); needs Pillow
+THUMBNAIL_ROOT = Path(os.environ.get('THUMBNAIL_ROOT', BASE_DIR / 'media' / 'thumbnails'))
+
 # API Token for n8n (stored in .env)
 N8N_API_TOKEN = os.environ.get('N8N_API_TOKEN', '')
 
@@ -1,41 +1,364 @@
-const CACHE_NAME = 'newsdeck-v1';
-const ASSETS_TO_CACHE = [
+// NewsDeck service worker: offline reading and offline actions.
+//
+// - Article pages (full pages and htmx fragments) are cached as they load,
+//   and the next PREFETCH_PAGES cursor pages are fetched ahead of the reader,
+//   with their thumbnails. Page and image caches are bounded LRU caches; the
+//   last-use times live in IndexedDB.
+// - Mark-read, bookmark and feedback POSTs that can't reach the server are
+//   queued in IndexedDB and replayed in order as ONE request to /actions/
+//   (views.sync_actions), via Background Sync where the browser has it and
+//   otherwise when a page reports it is back online.
+//
+// Registered from base.html with scope '/'; static/sw.js is served with a
+// Service-Worker-Allowed header for that (settings.WHITENOISE_ADD_HEADERS_FUNCTION).
+
+const VERSION = 'newsdeck-v2';
+const SHELL_CACHE = `${VERSION}-shell`;
+const PAGES_CACHE = `${VERSION}-pages`;
+const IMAGES_CACHE = `${VERSION}-images`;
+const SHELL_ASSETS = [
     '/',
     '/static/manifest.json',
     '/static/images/icon-192.png',
     '/static/images/icon-512.png'
-    // Add other static assets like CSS/JS here if they were local files
 ];
 
-self.addEventListener('install', (event) => {
+// Most entries kept per LRU cache
+const CACHE_LIMITS = { [PAGES_CACHE]: 60, [IMAGES_CACHE]: 300 };
+// Cursor pages fetched ahead of the one being read
+const PREFETCH_PAGES = 2;
+// A prefetched page older than this is refetched when online
+const PREFETCH_MAX_AGE_MS = 15 * 60 * 1000;
+
+// Pages worth reading offline: dashboard, categories, saved
+const PAGE_PATH = /^\/(category\/[\w-]+\/|saved\/)?$/;
+const THUMBNAIL_PATH = /^\/article\/\d+\/thumbnail\/[\w-]+\/$/;
+const NEXT_PAGE = /hx-get="(\?cursor=[^"]+)"/;
+const THUMBNAIL_SRC = /src="(\/article\/\d+\/thumbnail\/[^"]+)"/g;
+
+// Action endpoints (news/urls.py) and the batched replay endpoint
+const MARK_READ_BULK_PATH = '/articles/read/';
+const MARK_READ_PATH = /^\/article\/(\d+)\/read\/$/;
+const BOOKMARK_PATH = /^\/article\/(\d+)\/bookmark\/$/;
+const FEEDBACK_PATH = /^\/article\/(\d+)\/feedback\/\w+\/$/;
+const SYNC_URL = '/actions/';
+const SYNC_TAG = 'replay-actions';
+// Matches views.SYNC_MAX_ACTIONS
+const SYNC_MAX_ACTIONS = 500;
+// Replay responses worth retrying later, besides 5xx; other failures drop the batch
+const RETRY_STATUSES = [408, 429];
+
+
+// --- IndexedDB: LRU bookkeeping and the action queue ---
+
+let dbPromise = null;
+
+function db() {
+    dbPromise = dbPromise || new Promise((resolve, reject) => {
+        const request = indexedDB.open('newsdeck', 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore('lru', { keyPath: 'url' });
+            request.result.createObjectStore('queue', { keyPath: 'id', autoIncrement: true });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+    return dbPromise;
+}
+
+// Run fn(store) in one transaction; resolves with the result of the request fn returns
+async function withStore(name, mode, fn) {
+    const database = await db();
+    return new Promise((resolve, reject) => {
+        const transaction = database.transaction(name, mode);
+        const request = fn(transaction.objectStore(name));
+        transaction.oncomplete = () => resolve(request && request.result);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+
+// --- Bounded LRU caches ---
+
+function touch(cacheName, key) {
+    return withStore('lru', 'readwrite', store => store.put({ url: key, cache: cacheName, used: Date.now() }));
+}
+
+async function cacheMatch(cacheName, key) {
+    const response = await (await caches.open(cacheName)).match(key, { ignoreVary: true });
+    if (response) touch(cacheName, key).catch(() => {});
+    return response;
+}
+
+async function cachePut(cacheName, key, response) {
+    await (await caches.open(cacheName)).put(key, response);
+    await touch(cacheName, key);
+    await evict(cacheName);
+}
+
+async function evict(cacheName) {
+    const entries = (await withStore('lru', 'readonly', store => store.getAll()))
+        .filter(entry => entry.cache === cacheName)
+        .sort((a, b) => a.used - b.used);
+    const excess = entries.slice(0, Math.max(0, entries.length - CACHE_LIMITS[cacheName]));
+    if (!excess.length) return;
+    const cache = await caches.open(cacheName);
+    await Promise.all(excess.map(entry => cache.delete(entry.url)));
+    await withStore('lru', 'readwrite', store => excess.forEach(entry => store.delete(entry.url)));
+}
+
+// The same URL serves a full page and, to htmx, a fragment: cache them apart
+function pageKey(request) {
+    if (!request.headers.get('HX-Request')) return request.url;
+    const url = new URL(request.url);
+    url.searchParams.set('_fragment', '1');
+    return url.href;
+}
+
+function isFresh(response) {
+    const date = Date.parse(response.headers.get('Date'));
+    return Date.now() - date < PREFETCH_MAX_AGE_MS;
+}
+
+function offline() {
+    return new Response('Offline', { status: 503, headers: { 'Content-Type': 'text/plain' } });
+}
+
+
+// --- Pages and prefetching ---
+
+async function page(event) {
+    const request = event.request;
+    const key = pageKey(request);
+
+    // Cursor pages were usually prefetched: serve them without a round trip
+    if (new URL(request.url).searchParams.has('cursor')) {
+        const cached = await cacheMatch(PAGES_CACHE, key);
+        if (cached && isFresh(cached)) {
+            event.waitUntil(prefetchAfter(cached.clone(), request.url, PREFETCH_PAGES));
+            return cached;
+        }
+    }
+
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) {
+            const forCache = response.clone();
+            const forPrefetch = response.clone();
+            event.waitUntil(
+                cachePut(PAGES_CACHE, key, forCache)
+                    .then(() => prefetchAfter(forPrefetch, request.url, PREFETCH_PAGES))
+            );
+        }
+        return response;
+    } catch (error) {
+        const cached = await cacheMatch(PAGES_CACHE, key);
+        if (cached) return cached;
+        if (request.mode === 'navigate') {
+            return (await cacheMatch(PAGES_CACHE, new URL('/', request.url).href))
+                || (await caches.match('/')) || offline();
+        }
+        return offline();
+    }
+}
+
+// Follow a page's next-cursor link `depth` pages ahead, caching each page and its thumbnails
+async function prefetchAfter(response, baseUrl, depth) {
+    if (!navigator.onLine || navigator.connection?.saveData) return;
+    try {
+        const html = await response.text();
+        await prefetchThumbnails(html, baseUrl);
+        const next = html.match(NEXT_PAGE);
+        if (!next || depth <= 0) return;
+
+        const url = new URL(next[1].replace(/&amp;/g, '&'), baseUrl).href;
+        const request = new Request(url, { headers: { 'HX-Request': 'true' }, credentials: 'same-origin' });
+        const key = pageKey(request);
+        let cached = await cacheMatch(PAGES_CACHE, key);
+        if (!cached || !isFresh(cached)) {
+            const fetched = await fetch(request);
+            if (!fetched.ok || fetched.redirected) return;
+            await cachePut(PAGES_CACHE, key, fetched.clone());
+            cached = fetched;
+        }
+        await prefetchAfter(cached, url, depth - 1);
+    } catch (error) {
+        // Prefetching is best effort
+    }
+}
+
+async function prefetchThumbnails(html, baseUrl) {
+    const cache = await caches.open(IMAGES_CACHE);
+    for (const [, src] of html.matchAll(THUMBNAIL_SRC)) {
+        const url = new URL(src.replace(/&amp;/g, '&'), baseUrl).href;
+        if (await cache.match(url, { ignoreVary: true })) continue;
+        const response = await fetch(url, { credentials: 'same-origin' }).catch(() => null);
+        if (response && response.ok && !response.redirected) await cachePut(IMAGES_CACHE, url, response);
+    }
+}
+
+async function thumbnail(event) {
+    const cached = await cacheMatch(IMAGES_CACHE, event.request.url);
+    if (cached) return cached;
+    const response = await fetch(event.request);
+    if (response.ok && response.type === 'basic' && !response.redirected) {
+        event.waitUntil(cachePut(IMAGES_CACHE, event.request.url, response.clone()));
+    }
+    return response;
+}
+
+// Stale-while-revalidate for static files and the CDN scripts and styles
+async function asset(event) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(event.request);
+    const fetched = fetch(event.request).then(response => {
+        if (response.ok || response.type === 'opaque') cache.put(event.request, response.clone());
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(fetched.catch(() => {}));
+        return cached;
+    }
+    return fetched;
+}
+
+
+// --- Offline actions ---
+
+// The queued form of an action request, or null if it can't be queued
+async function toActions(request) {
+    const path = new URL(request.url).pathname;
+    const form = await request.formData();
+    let match;
+    if (path === MARK_READ_BULK_PATH) {
+        // Mark-all filters depend on the server's view of the feed: online only
+        if (form.has('before') || form.has('category')) return null;
+        return form.getAll('ids').map(id => ({ type: 'read', article: Number(id) }));
+    }
+    if ((match = path.match(MARK_READ_PATH))) {
+        return [{ type: 'read', article: Number(match[1]) }];
+    }
+    if ((match = path.match(BOOKMARK_PATH)) && form.has('saved')) {
+        return [{ type: 'saved', article: Number(match[1]), value: form.get('saved') === 'true' }];
+    }
+    if ((match = path.match(FEEDBACK_PATH)) && form.has('score')) {
+        return [{ type: 'feedback', article: Number(match[1]), value: Number(form.get('score')) }];
+    }
+    return null;
+}
+
+async function action(event) {
+    const request = event.request;
+    const copy = request.clone();
+    // Earlier queued actions go first, so they can't override this one. A failed
+    // replay keeps its batch for later and never holds this action back.
+    await replay().catch(() => {});
+    try {
+        return await fetch(request);
+    } catch (error) {
+        // fetch rejects with a TypeError only when the network is unreachable
+        if (!(error instanceof TypeError)) throw error;
+        const actions = await toActions(copy);
+        if (!actions) return offline();
+        const csrfToken = request.headers.get('X-CSRFToken');
+        await withStore('queue', 'readwrite', store => actions.forEach(queued => store.add({ action: queued, csrfToken })));
+        event.waitUntil(scheduleReplay());
+        // 204: htmx leaves the button as it is; the page marks it as queued
+        return new Response(null, { status: 204, headers: { 'X-Offline-Queued': '1' } });
+    }
+}
+
+async function scheduleReplay() {
+    try {
+        await self.registration.sync.register(SYNC_TAG);
+    } catch (error) {
+        // No Background Sync: pages post 'replay' when they come back online
+    }
+}
+
+let replaying = null;
+
+// Send the queue as one batch; concurrent callers share the request in flight
+function replay() {
+    replaying = replaying || replayQueue().finally(() => { replaying = null; });
+    return replaying;
+}
+
+async function replayQueue() {
+    const queued = await withStore('queue', 'readonly', store => store.getAll());
+    if (!queued.length) return;
+    const batch = queued.slice(0, SYNC_MAX_ACTIONS);
+    const response = await fetch(SYNC_URL, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {
+            'Content-Type': 'application/json',
+            // The newest token is the one most likely to match the session
+            'X-CSRFToken': batch[batch.length - 1].csrfToken
+        },
+        body: JSON.stringify({ actions: batch.map(entry => entry.action) })
+    });
+    if (!response.ok || response.redirected) {
+        if (RETRY_STATUSES.includes(response.status) || response.status >= 500) {
+            throw new Error(`Replay failed: ${response.status}`);
+        }
+        // A malformed batch (400), a stale CSRF token (403) or a redirect to the
+        // login page fails the same way every time: drop the batch
+        console.warn(`Dropped ${batch.length} queued actions: ${response.status}`);
+    }
+    await withStore('queue', 'readwrite', store => batch.forEach(entry => store.delete(entry.id)));
+    if (queued.length > batch.length) await replayQueue();
+}
+
+
+// --- Lifecycle and routing ---
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(SHELL_CACHE).then(cache => cache.addAll(SHELL_ASSETS)));
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
     event.waitUntil(
-        caches.open(CACHE_NAME).then((cache) => {
-            return cache.addAll(ASSETS_TO_CACHE);
-        })
+        caches.keys()
+            .then(names => Promise.all(names.filter(name => !name.startsWith(VERSION)).map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
     );
 });
 
-self.addEventListener('fetch', (event) => {
-    // Network-first strategy for HTML pages (we want fresh news)
-    if (event.request.mode === 'navigate') {
-        event.respondWith(
-            fetch(event.request).catch(() => {
-                return caches.match('/'); // Fallback to cached dashboard if offline
-            })
-        );
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) event.waitUntil(replay());
+});
+
+self.addEventListener('message', event => {
+    if (event.data === 'replay') event.waitUntil(replay().catch(() => {}));
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        // CDN scripts, styles and fonts; external article images are left to the browser
+        if (request.method === 'GET' && ['script', 'style', 'font'].includes(request.destination)) {
+            event.respondWith(asset(event));
+        }
         return;
     }
+    if (request.method === 'POST') {
+        if (url.pathname === MARK_READ_BULK_PATH || [MARK_READ_PATH, BOOKMARK_PATH, FEEDBACK_PATH].some(path => path.test(url.pathname))) {
+            event.respondWith(action(event));
+        }
+        return;
+    }
+    if (request.method !== 'GET') return;
 
-    // Stale-while-revalidate for static assets
-    event.respondWith(
-        caches.match(event.request).then((cachedResponse) => {
-            const fetchPromise = fetch(event.request).then((networkResponse) => {
-                caches.open(CACHE_NAME).then((cache) => {
-                    cache.put(event.request, networkResponse.clone());
-                });
-                return networkResponse;
-            });
-            return cachedResponse || fetchPromise;
-        })
-    );
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(asset(event));
+    } else if (THUMBNAIL_PATH.test(url.pathname)) {
+        event.respondWith(thumbnail(event));
+    } else if (PAGE_PATH.test(url.pathname) && (request.mode === 'navigate' || request.headers.get('HX-Request'))) {
+        event.respondWith(page(event));
+    }
+    // Everything else (SSE stream, API, admin, search) goes straight to the network
 });